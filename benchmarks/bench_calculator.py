@@ -0,0 +1,194 @@
+"""
+Микро-бенчмарки горячих путей расчета: пошлины, полный расчет, форматирование,
+разбор объема двигателя, кэш расчетов и пакетный расчет.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_calculator                       # сравнить с benchmarks/baseline.json
+    python -m benchmarks.bench_calculator --json results.json   # сохранить результаты
+    python -m benchmarks.bench_calculator --save-baseline       # обновить эталон
+    python -m benchmarks.bench_calculator --fail-on-regression  # код выхода 1 при замедлении
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot_handlers.calculator import parse_engine_volume  # noqa: E402
+from core.calculation_cache import calculate_and_format, calculation_cache  # noqa: E402
+from core.calculator_logic import (  # noqa: E402
+    _calculate_customs_for_individual,
+    calculate_total_cost,
+    calculate_total_cost_batch,
+    format_result_for_user,
+)
+from core.config import settings  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Замедление больше этой доли относительно эталона считается регрессией
+DEFAULT_THRESHOLD = 0.15
+
+CURRENT_YEAR = datetime.date.today().year
+# Возрастные категории пошлины: до 3 лет, 3-5 лет, старше 5 лет
+AGE_BRACKETS = {"under_3": CURRENT_YEAR - 1, "3_5": CURRENT_YEAR - 4, "over_5": CURRENT_YEAR - 8}
+# Объемы по всем ступеням таблиц пошлин
+VOLUME_BRACKETS = (998, 1499, 1800, 2300, 2999, 3500)
+# Так объем пишут пользователи
+VOLUME_STRINGS = ("1.5", "1,5", "2.0л", "1998", "2.4 T", "1.6 turbo", "3.0", "1500 см3", "2,5 л", "0.9", "abc")
+
+
+def _user_data(year: int, volume: int, fuel: str = "Бензин", price: float = 150_000) -> dict:
+    return {
+        "car_price_cny": price,
+        "year": year,
+        "engine_volume": volume,
+        "engine_power": 0,
+        "fuel_type": fuel,
+        "payer_type": "Физическое лицо",
+    }
+
+
+def build_cases() -> dict:
+    """Набор бенчмарков: имя -> функция без аргументов."""
+    cases = {}
+    for age_name, year in AGE_BRACKETS.items():
+        for volume in VOLUME_BRACKETS:
+            data = _user_data(year, volume)
+            cases[f"customs/{age_name}/{volume}"] = (lambda d=data: _calculate_customs_for_individual(d, settings))
+        data = _user_data(year, 1998)
+        cases[f"total_cost/{age_name}"] = (lambda d=data: calculate_total_cost(d, settings))
+    electric = _user_data(AGE_BRACKETS["under_3"], 0, fuel="Электро")
+    cases["total_cost/electric"] = lambda: calculate_total_cost(electric, settings)
+
+    result = calculate_total_cost(_user_data(AGE_BRACKETS["3_5"], 1998), settings)
+    cases["format_result"] = lambda: format_result_for_user(result)
+
+    cases["parse_engine_volume/mixed"] = lambda: [parse_engine_volume(text) for text in VOLUME_STRINGS]
+
+    # Повторный расчет из кэша (типичный случай для поста в канале) и промах кэша
+    cached = _user_data(AGE_BRACKETS["under_3"], 1499)
+    calculate_and_format(cached, settings)
+    cases["calculate_and_format/hit"] = lambda: calculate_and_format(cached, settings)
+    counter = itertools.count()
+
+    def cache_miss():
+        # Каждый вызов - новая цена, поэтому всегда промах (с вытеснением из LRU)
+        calculate_and_format(_user_data(AGE_BRACKETS["3_5"], 1998, price=100_000 + next(counter)), settings)
+    cases["calculate_and_format/miss"] = cache_miss
+
+    size = 1000
+    years = [list(AGE_BRACKETS.values())[i % 3] for i in range(size)]
+    volumes = [VOLUME_BRACKETS[i % len(VOLUME_BRACKETS)] for i in range(size)]
+    prices = [100_000 + i * 100 for i in range(size)]
+    cases["batch/1000_rows"] = lambda: calculate_total_cost_batch(
+        prices, years, volumes, ["Бензин"] * size, ["Физическое лицо"] * size, settings
+    )
+    return cases
+
+
+def measure(fn, repeat: int, min_time: float) -> float:
+    """Лучшее из repeat время одного вызова, наносекунды."""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    # autorange набирает ~0.2 с; растягиваем до min_time
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def run(cases: dict, repeat: int, min_time: float) -> dict:
+    results = {name: round(measure(fn, repeat, min_time), 1) for name, fn in cases.items()}
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        },
+        "results_ns": results,
+    }
+
+
+def recheck(cases: dict, current: dict, baseline: dict, threshold: float, repeat: int, min_time: float):
+    """
+    Повторно замеряет бенчмарки, превысившие порог, и оставляет лучший результат:
+    одиночный выброс из-за соседней нагрузки на машине не должен считаться регрессией.
+    """
+    base_results = baseline.get("results_ns", {})
+    results = current["results_ns"]
+    for name, value in results.items():
+        base = base_results.get(name)
+        if base and value / base - 1 > threshold:
+            results[name] = min(value, round(measure(cases[name], repeat * 2, min_time), 1))
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Печатает сравнение и возвращает имена бенчмарков с регрессией."""
+    base_results = baseline.get("results_ns", {})
+    regressions = []
+    print(f"{'бенчмарк':<34} {'сейчас, нс':>12} {'эталон, нс':>12} {'изменение':>10}")
+    for name, value in current["results_ns"].items():
+        base = base_results.get(name)
+        if base is None:
+            print(f"{name:<34} {value:>12.1f} {'—':>12} {'новый':>10}")
+            continue
+        change = value / base - 1
+        flag = ""
+        if change > threshold:
+            flag = "  ⚠ регрессия"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  ускорение"
+        print(f"{name:<34} {value:>12.1f} {base:>12.1f} {change:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", help="запускать только бенчмарки, в имени которых есть эта строка")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="минимальная длительность одного замера, с")
+    parser.add_argument("--json", help="сохранить результаты в файл")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как новый эталон")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    # Кэш общего экземпляра не должен зависеть от предыдущих запусков в процессе
+    calculation_cache.clear()
+    cases = {name: fn for name, fn in build_cases().items() if not args.filter or args.filter in name}
+    current = run(cases, args.repeat, args.min_time)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("python") != current["meta"]["python"]:
+            print(f"Внимание: эталон снят на Python {baseline.get('meta', {}).get('python')}, "
+                  f"сейчас {current['meta']['python']} - сравнение приблизительное.")
+        recheck(cases, current, baseline, args.threshold, args.repeat, args.min_time)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"Эталон сохранен: {args.baseline}")
+
+    regressions = compare(current, baseline, args.threshold)
+
+    if regressions:
+        print(f"\nРегрессии (> {args.threshold:.0%}): {', '.join(regressions)}")
+        if args.fail_on_regression:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Сравнение разбора XML_daily.asp: полное дерево ElementTree против потокового парсера.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_cbr_parse [--repeat 2000] [--codes CNY,EUR]
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+import xml.etree.ElementTree as ET
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.currency_updater import CHUNK_SIZE, CbrDailyStreamParser  # noqa: E402
+
+SAMPLE_FEED = os.path.join(os.path.dirname(__file__), "data", "cbr_daily_sample.xml")
+
+
+def parse_full_tree(data: bytes, codes) -> dict:
+    """Прежний способ: строим все дерево и ищем валюты через XPath."""
+    root = ET.fromstring(data)
+    rates = {}
+    for code in codes:
+        element = root.find(f".//Valute[CharCode='{code}']")
+        if element is not None:
+            value = Decimal(element.find('Value').text.replace(',', '.'))
+            rates[code] = value / Decimal(element.find('Nominal').text)
+    return rates
+
+
+def parse_streaming(data: bytes, codes) -> dict:
+    """Новый способ: подаем документ кусками, как он приходит из сети."""
+    parser = CbrDailyStreamParser(codes)
+    for start in range(0, len(data), CHUNK_SIZE):
+        if parser.feed(data[start:start + CHUNK_SIZE]):
+            break
+    else:
+        parser.close()
+    return parser.rates
+
+
+def measure(fn, data: bytes, codes, repeat: int) -> tuple[float, int]:
+    """Возвращает (среднее время в мкс, пиковое выделение памяти в байтах)."""
+    seconds = min(timeit.repeat(lambda: fn(data, codes), number=repeat, repeat=3)) / repeat
+    tracemalloc.start()
+    fn(data, codes)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds * 1e6, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--codes", default="CNY,EUR")
+    parser.add_argument("--feed", default=SAMPLE_FEED)
+    args = parser.parse_args()
+
+    codes = tuple(code.strip() for code in args.codes.split(",") if code.strip())
+    with open(args.feed, "rb") as f:
+        data = f.read()
+
+    if parse_full_tree(data, codes) != parse_streaming(data, codes):
+        raise SystemExit("Результаты разбора не совпадают!")
+
+    print(f"Документ: {len(data)} байт, валюты: {', '.join(codes)}")
+    print(f"{'способ':<12} {'время, мкс':>12} {'пик памяти, КБ':>16}")
+    results = {}
+    for name, fn in (("full_tree", parse_full_tree), ("streaming", parse_streaming)):
+        micros, peak = measure(fn, data, codes, args.repeat)
+        results[name] = (micros, peak)
+        print(f"{name:<12} {micros:>12.1f} {peak / 1024:>16.1f}")
+
+    (full_us, full_peak), (stream_us, stream_peak) = results["full_tree"], results["streaming"]
+    print(f"Ускорение: x{full_us / stream_us:.2f}, память: x{full_peak / max(stream_peak, 1):.2f} меньше")
+
+
+if __name__ == "__main__":
+    main()
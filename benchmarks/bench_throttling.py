@@ -0,0 +1,86 @@
+"""
+Память и скорость ограничения частоты: сколько байт занимает состояние одного
+пользователя в ThrottlingMiddleware, сколько стоит один апдейт и сколько
+памяти освобождает вытеснение неактивных пользователей.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_throttling [--users 100000] [--limit 12] [--window 5]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.types import CallbackQuery, Chat, Message, User  # noqa: E402
+
+from core.config import runtime  # noqa: E402
+from middlewares.throttling import ThrottlingMiddleware  # noqa: E402
+
+
+async def _handler(event, data):
+    return None
+
+
+def _events(user_id: int) -> tuple[Message, CallbackQuery, dict]:
+    """Сообщение и нажатие кнопки от пользователя (model_construct - без дорогой валидации полей)."""
+    user = User.model_construct(id=user_id, is_bot=False, first_name="user")
+    message = Message.model_construct(message_id=1, date=0, chat=Chat.model_construct(id=user_id, type="private"))
+    callback = CallbackQuery.model_construct(id=str(user_id), from_user=user, chat_instance="0", data="calc:start")
+    return message, callback, {"event_from_user": user}
+
+
+async def feed(throttling: ThrottlingMiddleware, users: int, first_id: int = 1) -> float:
+    """Одно сообщение и одно нажатие от каждого пользователя. Возвращает секунды внутри middleware."""
+    seconds = 0.0
+    for user_id in range(first_id, first_id + users):
+        message, callback, data = _events(user_id)
+        started = time.perf_counter()
+        await throttling(_handler, message, data)
+        await throttling(_handler, callback, data)
+        seconds += time.perf_counter() - started
+    return seconds
+
+
+async def run(users: int, limit: int, window: float, debounce: float):
+    # Время меряем отдельно: tracemalloc замедляет каждое выделение памяти
+    seconds = await feed(ThrottlingMiddleware(limit, window, debounce), users)
+
+    throttling = ThrottlingMiddleware(limit, window, debounce)
+    # События создаются и выбрасываются внутри цикла, поэтому после него
+    # в памяти остается только то, что удержал middleware
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    await feed(throttling, users)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    retained -= before
+
+    evicted = throttling.evict(time.monotonic() + 3 * window)
+    gc.collect()
+    after_evict, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Пользователей: {users}, лимит: {limit} за {window:g} с, debounce: {debounce:g} с")
+    print(f"Память после апдейтов:   {retained / 1024 / 1024:8.2f} МБ ({retained / users:.0f} байт на пользователя)")
+    print(f"Время на апдейт:         {seconds / (2 * users) * 1e6:8.2f} мкс")
+    print(f"Вытеснено неактивных:    {evicted:8d}, осталось {max(after_evict - before, 0) / 1024:.1f} КБ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=runtime.throttling.limit or 12)
+    parser.add_argument("--window", type=float, default=runtime.throttling.window)
+    parser.add_argument("--debounce", type=float, default=runtime.throttling.debounce)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.limit, args.window, args.debounce))
+
+
+if __name__ == "__main__":
+    main()
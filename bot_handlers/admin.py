@@ -8,8 +8,10 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message
 from aiogram.filters.command import Command
 
 from core.config import settings
-from core.faq_manager import load_faq_data, save_faq_data
-from core.settings_manager import save_settings
+from core.faq_manager import faq_store, load_faq_data, save_faq_data
+from core.calculation_cache import calculation_cache
+from core.settings_manager import save_settings_and_wait
+from bot_handlers.faq import rebuild_faq_render_cache
 import keyboards as kb
 
 class AdminFilter(Filter):
@@ -22,6 +24,11 @@ class AdminFilter(Filter):
         return False
 
 router = Router()
+
+SETTINGS_NOT_SAVED = (
+    "⚠️ Изменения уже действуют, но не записались в файл настроек и пропадут после перезапуска. "
+    "Подробности в логе."
+)
 # УБИРАЕМ ГЛОБАЛЬНЫЙ ФИЛЬТР, ТАК КАК ОН МЕШАЕТ channel_post
 # router.message.filter(AdminFilter())
 # router.callback_query.filter(AdminFilter())
@@ -51,6 +58,7 @@ def get_admin_main_keyboard() -> InlineKeyboardMarkup:
     buttons = [
         [InlineKeyboardButton(text="💰 Управление калькулятором", callback_data="admin_calculator_menu")],
         [InlineKeyboardButton(text="📝 Управление FAQ", callback_data="admin_faq_menu")],
+        [InlineKeyboardButton(text="📄 Расчет прайс-листа (CSV)", callback_data="admin_price_list")],
         # [InlineKeyboardButton(text="📢 Рассылки", callback_data="admin_broadcast_menu")],
         # [InlineKeyboardButton(text="👥 Управление пользователями", callback_data="admin_users_menu")]
     ]
@@ -79,7 +87,7 @@ def get_faq_management_keyboard() -> InlineKeyboardMarkup:
 
 def get_faq_delete_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура для выбора FAQ для удаления."""
-    faq_data = load_faq_data()
+    faq_data = faq_store.get_all()
     buttons = []
     for key, data in faq_data.items():
         # Ограничиваем длину текста на кнопке
@@ -237,7 +245,8 @@ async def process_recycling_fee_over_3_and_save(message: Message, state: FSMCont
         settings.customs.recycling.under_3_years = fee_under_3
         settings.customs.recycling.over_3_years = fee_over_3
         
-        save_settings()
+        if not await save_settings_and_wait():
+            await message.answer(SETTINGS_NOT_SAVED)
         await state.clear()
 
         await message.answer("✅ <b>Ставки утилизационного сбора успешно обновлены!</b>", parse_mode="HTML")
@@ -308,7 +317,8 @@ async def process_duty_rates(message: Message, state: FSMContext):
         age_attr_key = age_category_key.replace("-", "_") + "_years"
         setattr(settings.customs.duty, age_attr_key, new_rates_dict)
         
-        save_settings()
+        if not await save_settings_and_wait():
+            await message.answer(SETTINGS_NOT_SAVED)
         await state.clear()
         
         await message.answer("✅ <b>Ставки таможенных пошлин успешно обновлены!</b>", parse_mode="HTML")
@@ -363,8 +373,7 @@ async def cancel_admin_action(callback: types.CallbackQuery, state: FSMContext):
 
     # Простое перенаправление для возврата в нужное меню
     if current_state and 'faq' in current_state:
-        faq_data = load_faq_data()
-        count = len(faq_data)
+        count = len(faq_store.get_all())
         await callback.message.edit_text(
             f"Управление FAQ. Всего вопросов: {count}.\n\nВыберите действие:",
             reply_markup=get_faq_management_keyboard()
@@ -431,7 +440,8 @@ async def process_eur_rate_and_save(message: Message, state: FSMContext):
         settings.rates.eur_to_rub = new_eur_rate
         
         # Сохраняем настройки в файл
-        save_settings()
+        if not await save_settings_and_wait():
+            await message.answer(SETTINGS_NOT_SAVED)
 
         await state.clear()
         
@@ -539,7 +549,8 @@ async def process_china_expenses_and_save(message: Message, state: FSMContext):
         settings.fees.china_expenses_rub = new_expenses
         
         # Сохраняем настройки в файл
-        save_settings()
+        if not await save_settings_and_wait():
+            await message.answer(SETTINGS_NOT_SAVED)
 
         await state.clear()
         
@@ -566,8 +577,7 @@ async def process_china_expenses_and_save(message: Message, state: FSMContext):
 async def show_faq_management_menu(callback: types.CallbackQuery, state: FSMContext):
     """Показывает меню управления FAQ."""
     await state.clear()
-    faq_data = load_faq_data()
-    count = len(faq_data)
+    count = len(faq_store.get_all())
     await callback.message.edit_text(
         f"Управление FAQ. Всего вопросов: {count}.\n\nВыберите действие:",
         reply_markup=get_faq_management_keyboard()
@@ -612,6 +622,8 @@ async def process_faq_answer(message: Message, state: FSMContext):
     new_key = str(uuid.uuid4())
     faq_data[new_key] = {"question": question, "answer": answer}
     save_faq_data(faq_data)
+    # Сразу пересобираем готовые клавиатуры и ответы для пользователей
+    rebuild_faq_render_cache()
 
     await state.clear()
     await message.answer(
@@ -630,8 +642,7 @@ async def process_faq_answer(message: Message, state: FSMContext):
 @router.callback_query(F.data == "faq_delete_list", AdminFilter())
 async def show_faq_delete_list(callback: types.CallbackQuery):
     """Показывает клавиатуру для выбора вопроса для удаления."""
-    faq_data = load_faq_data()
-    if not faq_data:
+    if not faq_store.get_all():
         await callback.answer("Список FAQ пуст. Нечего удалять.", show_alert=True)
         return
 
@@ -650,12 +661,12 @@ async def confirm_faq_deletion(callback: types.CallbackQuery, state: FSMContext)
     if question_id in faq_data:
         del faq_data[question_id]
         save_faq_data(faq_data)
+        rebuild_faq_render_cache()
         await callback.answer("Вопрос удален.", show_alert=True)
     else:
         await callback.answer("Ошибка: вопрос не найден.", show_alert=True)
 
-    faq_data = load_faq_data()
-    if not faq_data:
+    if not faq_store.get_all():
         await callback.message.edit_text(
             f"Управление FAQ. Всего вопросов: 0.\n\nБольше вопросов нет. Выберите действие:",
             reply_markup=get_faq_management_keyboard()
@@ -666,6 +677,25 @@ async def confirm_faq_deletion(callback: types.CallbackQuery, state: FSMContext)
             reply_markup=get_faq_delete_keyboard()
         ) 
 
+# --- Статистика кэшей ---
+
+@router.message(Command("cache_stats"), AdminFilter())
+async def show_cache_stats(message: types.Message):
+    """Показывает размер и эффективность кэшей расчетов и FAQ."""
+    calc = calculation_cache.stats()
+    faq = faq_store.stats()
+    await message.answer(
+        "📊 <b>Кэши</b>\n\n"
+        f"<b>Расчеты:</b> {calc['size']}/{calc['maxsize']} записей\n"
+        f"Попадания: {calc['hits']}, промахи: {calc['misses']} ({calc['hit_ratio']:.0%})\n"
+        f"Сбросов после изменения настроек: {calc['invalidations']}\n\n"
+        f"<b>FAQ:</b> {faq['items']} вопросов, версия {faq['version']}\n"
+        f"Попадания: {faq['hits']}, промахи: {faq['misses']} ({faq['hit_ratio']:.0%}), "
+        f"перезагрузок: {faq['reloads']}",
+        parse_mode="HTML"
+    )
+
+
 # --- Handler for sending a welcome message to a channel ---
 
 @router.message(Command("send_welcome"))
@@ -0,0 +1,98 @@
+import datetime
+
+from aiogram import Router, types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import CommandObject
+from aiogram.filters.command import Command
+
+from core.broadcast import broadcast_engine
+from core.scheduler import SCHEDULER_TIMEZONE
+from core.user_registry import user_registry
+from bot_handlers.admin import AdminFilter
+
+router = Router()
+
+
+def _command_html(message: types.Message, skip_words: int = 0) -> str:
+    """
+    Текст после команды с сохранением форматирования (жирный, ссылки и т.д.).
+    skip_words - сколько слов после команды относятся к параметрам.
+    """
+    parts = message.html_text.split(maxsplit=1 + skip_words)
+    return parts[1 + skip_words].strip() if len(parts) > 1 + skip_words else ""
+
+
+@router.message(Command("broadcast_preview"), AdminFilter())
+async def preview_broadcast(message: types.Message):
+    """Показывает сообщение рассылки так, как его увидят пользователи."""
+    text = _command_html(message)
+    if not text:
+        await message.answer("Формат: <code>/broadcast_preview текст</code>", parse_mode="HTML")
+        return
+    try:
+        await message.answer(text, parse_mode="HTML", disable_web_page_preview=True)
+    except TelegramBadRequest as e:
+        await message.answer(f"❌ Telegram не принимает это сообщение: {e.message}")
+        return
+    recipients = await user_registry.count_recipients()
+    await message.answer(
+        f"👆 Так будет выглядеть рассылка. Получателей: {recipients}.\n"
+        "Отправить: <code>/broadcast текст</code>, запланировать: "
+        "<code>/broadcast_schedule ДД.ММ.ГГГГ ЧЧ:ММ текст</code>",
+        parse_mode="HTML"
+    )
+
+
+@router.message(Command("broadcast"), AdminFilter())
+async def start_broadcast(message: types.Message):
+    """Немедленная рассылка всем пользователям: /broadcast текст"""
+    text = _command_html(message)
+    if not text:
+        await message.answer(
+            "Формат: <code>/broadcast текст</code>\nСначала проверьте сообщение командой /broadcast_preview.",
+            parse_mode="HTML"
+        )
+        return
+    campaign = await broadcast_engine.create(text, message.chat.id)
+    await message.answer(f"🚀 Рассылка №{campaign.id} запущена. Отменить: /broadcast_cancel {campaign.id}")
+
+
+@router.message(Command("broadcast_schedule"), AdminFilter())
+async def schedule_broadcast(message: types.Message, command: CommandObject):
+    """Отложенная рассылка: /broadcast_schedule 20.10.2026 12:00 текст"""
+    text = _command_html(message, skip_words=2)
+    try:
+        date_str, time_str = (command.args or "").split()[:2]
+        naive = datetime.datetime.strptime(f"{date_str} {time_str}", "%d.%m.%Y %H:%M")
+        scheduled_at = naive.replace(tzinfo=SCHEDULER_TIMEZONE)
+        if not text:
+            raise ValueError
+    except ValueError:
+        await message.answer(
+            "Формат: <code>/broadcast_schedule ДД.ММ.ГГГГ ЧЧ:ММ текст</code> (время московское)",
+            parse_mode="HTML"
+        )
+        return
+    if scheduled_at <= datetime.datetime.now(SCHEDULER_TIMEZONE):
+        await message.answer("Это время уже прошло. Для немедленной отправки используйте /broadcast.")
+        return
+
+    campaign = await broadcast_engine.create(text, message.chat.id, scheduled_at=scheduled_at)
+    await message.answer(
+        f"🗓 Рассылка №{campaign.id} запланирована на {naive:%d.%m.%Y %H:%M}. "
+        f"Отменить: /broadcast_cancel {campaign.id}"
+    )
+
+
+@router.message(Command("broadcast_cancel"), AdminFilter())
+async def cancel_broadcast(message: types.Message, command: CommandObject):
+    """Отмена рассылки: /broadcast_cancel 3"""
+    try:
+        campaign_id = int((command.args or "").strip().lstrip("№"))
+    except ValueError:
+        await message.answer("Формат: <code>/broadcast_cancel номер</code>", parse_mode="HTML")
+        return
+    if await broadcast_engine.cancel(campaign_id):
+        await message.answer(f"⛔️ Рассылка №{campaign_id} отменена.")
+    else:
+        await message.answer(f"Рассылка №{campaign_id} не найдена или уже завершена.")
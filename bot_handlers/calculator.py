@@ -5,8 +5,12 @@ from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemo
 import logging
 import re
 
-from core.calculator_logic import calculate_total_cost, format_result_for_user
+from core.calculation_cache import calculate_and_format
+from core.calculator_session import ELECTRIC, FUEL_TYPES, CalculatorSession, pack_session
+from core.lead_store import lead_store
+from core.analytics import EVENT_CALC_COMPLETED, EVENT_CALC_FAILED, EVENT_CALC_STARTED, analytics
 from core.config import settings
+from bot_handlers.request import cancel_phone_keyboard
 import keyboards as kb
 
 router = Router()
@@ -84,9 +88,11 @@ async def start_calculation(message: types.Message | types.CallbackQuery, state:
     else:
         msg = message
 
-    await state.clear()  # Очищаем предыдущее состояние на случай, если оно было
-    # Сразу устанавливаем плательщика по умолчанию
-    await state.update_data(payer_type='Физическое лицо')
+    analytics.record(EVENT_CALC_STARTED, message.from_user.id)
+    # Калькулятор могли открыть посреди заявки - кнопка телефона больше не нужна
+    cancel_phone_keyboard(msg.chat.id)
+    # Данные прошлого диалога заменяются пустыми (плательщик и кузов подставляются при расчете)
+    await state.set_data({})
     await msg.answer(
         "Вы начали расчет стоимости автомобиля из Китая. Укажите стоимость авто в Китае (юани)",
         reply_markup=get_cancel_keyboard(placeholder="Введите стоимость в юанях (CNY)...")
@@ -100,6 +106,7 @@ async def cancel_calculation(message: types.Message, state: FSMContext):
     if current_state is None:
         return
 
+    cancel_phone_keyboard(message.chat.id)
     await state.clear()
     is_admin = message.from_user.id in settings.bot.admin_ids
     await message.answer(
@@ -118,7 +125,7 @@ async def process_car_price(message: types.Message, state: FSMContext):
         price = float(message.text.replace(',', '.').strip())
         if price <= 0:
             raise ValueError("Стоимость должна быть положительной.")
-        await state.update_data(car_price_cny=price)
+        await state.update_data(pack_session(car_price_cny=price))
         await message.answer(
             "Стоимость принята. Теперь нужен год выпуска.",
             reply_markup=get_cancel_keyboard(placeholder="Введите год выпуска (например, 2023)...")
@@ -135,9 +142,7 @@ async def process_year(message: types.Message, state: FSMContext):
         # Простое ограничение для валидации
         if not (1980 < year < 2026):
             raise ValueError("Некорректный год.")
-        await state.update_data(year=year)
-        # Тип кузова устанавливаем по умолчанию
-        await state.update_data(car_body_type='Легковой')
+        await state.update_data(pack_session(year=year))
         await message.answer(
             "Выберите тип топлива:",
             reply_markup=get_fuel_type_keyboard()
@@ -150,18 +155,20 @@ async def process_year(message: types.Message, state: FSMContext):
 async def process_fuel_type(callback: types.CallbackQuery, state: FSMContext):
     """Обрабатывает тип топлива и запрашивает объем двигателя."""
     fuel_type = callback.data.split(":")[1]
-    await state.update_data(fuel_type=fuel_type)
+    if fuel_type not in FUEL_TYPES:
+        await callback.answer()
+        return
 
     # ИЗМЕНЕНИЕ: Удаляем исходное сообщение с кнопками, чтобы не засорять чат.
     await callback.message.delete()
 
     # Для электромобилей не нужен объем двигателя
-    if fuel_type == "Электро":
-        await state.update_data(engine_volume=0) # Ставим 0, чтобы не было ошибок в расчетах
-        await state.update_data(engine_power=0)  # Мощность не запрашиваем
-        # Сразу переходим к расчету
-        await process_and_calculate(callback.message, state)
+    if fuel_type == ELECTRIC:
+        # Объем 0, чтобы не было ошибок в расчетах; сразу переходим к расчету
+        data = await state.update_data(pack_session(fuel_type=fuel_type, engine_volume=0))
+        await process_and_calculate(callback.message, state, data, callback.from_user.id)
     else:
+        await state.update_data(pack_session(fuel_type=fuel_type))
         # Отправляем новое сообщение, которое является и подтверждением, и следующим вопросом.
         await callback.message.answer(
             f"Тип топлива: {fuel_type}. Теперь нужен объем двигателя (например: 1500, 1.5 или 2.0л).",
@@ -170,18 +177,36 @@ async def process_fuel_type(callback: types.CallbackQuery, state: FSMContext):
         await state.set_state(CarCalculationStates.waiting_for_engine_volume)
     await callback.answer() # Отвечаем на колбэк, чтобы убрать "часики" на кнопке
 
-async def process_and_calculate(message: types.Message, state: FSMContext):
-    """Общая функция для выполнения расчета и отправки результата."""
-    user_data = await state.get_data()
+async def process_and_calculate(message: types.Message, state: FSMContext, data: dict, user_id: int):
+    """
+    Общая функция для выполнения расчета и отправки результата.
+    data - данные диалога, которые вернул последний state.update_data();
+    user_id передается явно: после нажатия кнопки message - это сообщение бота.
+    """
     await state.clear()
+    session = CalculatorSession.unpack(data)
+    if session is None:
+        # Диалог начат до обновления бота или данные потеряны
+        await message.answer(
+            "Не удалось продолжить расчет. Пожалуйста, начните его заново: /start",
+            reply_markup=ReplyKeyboardRemove()
+        )
+        return
+    user_data = session.as_user_data()
 
     # Сообщаем пользователю, что начали расчет
     calculating_msg = await message.answer("⏳ Выполняю расчет...", reply_markup=ReplyKeyboardRemove())
 
     try:
-        result = calculate_total_cost(user_data=user_data, settings=settings)
-        response_text = format_result_for_user(result)
-        is_admin = message.from_user.id in settings.bot.admin_ids
+        # Одинаковые расчеты (например, из одного поста в канале) берутся из кэша
+        result, response_text = calculate_and_format(user_data, settings)
+        try:
+            lead_store.record_calculation(user_id, user_data, result.total_cost_rub)
+        except RuntimeError as e:
+            # История расчетов не должна мешать показать готовый расчет
+            logging.error(f"Расчет не сохранен в историю: {e}")
+        analytics.record(EVENT_CALC_COMPLETED, user_id)
+        is_admin = user_id in settings.bot.admin_ids
         await message.answer(
             response_text,
             parse_mode="HTML",
@@ -189,7 +214,8 @@ async def process_and_calculate(message: types.Message, state: FSMContext):
         )
     except Exception as e:
         logging.error(f"Ошибка в расчете: {e}", exc_info=True)
-        is_admin = message.from_user.id in settings.bot.admin_ids
+        analytics.record(EVENT_CALC_FAILED, user_id)
+        is_admin = user_id in settings.bot.admin_ids
         await message.answer(
             "Извините, при расчете произошла ошибка. Попробуйте позже или свяжитесь с поддержкой.",
             reply_markup=kb.get_main_inline_keyboard(is_admin)
@@ -207,8 +233,7 @@ async def process_engine_volume_and_calculate(message: types.Message, state: FSM
         await message.answer("Пожалуйста, введите корректный объем.\nНапример: 1500, 1.5, 2.0л, 2.4 T")
         return
 
-    await state.update_data(engine_volume=volume)
-    await state.update_data(engine_power=0)  # Мощность не запрашиваем
+    data = await state.update_data(pack_session(engine_volume=volume))
 
     # Запускаем расчет
-    await process_and_calculate(message, state)
\ No newline at end of file
+    await process_and_calculate(message, state, data, message.from_user.id)
\ No newline at end of file
@@ -4,10 +4,13 @@ from aiogram.filters.command import CommandStart
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 
+from core.analytics import EVENT_DEEP_LINK, analytics
 from bot_handlers import calculator, faq, request
 
 router = Router()
 
+DEEP_LINK_PAYLOADS = ("calculator", "faq", "application")
+
 @router.message(CommandStart(deep_link=True))
 async def handle_deep_link(message: Message, command: CommandObject, state: FSMContext):
     """
@@ -16,9 +19,13 @@ async def handle_deep_link(message: Message, command: CommandObject, state: FSMC
     """
     # Очищаем состояние на случай, если пользователь был в каком-то диалоге
     await state.clear()
+    request.cancel_phone_keyboard(message.chat.id)
     
     payload = command.args
-    
+    # Набор ссылок ограничен, чтобы произвольный payload не раздувал статистику
+    link_name = payload if payload in DEEP_LINK_PAYLOADS else "other"
+    analytics.record(EVENT_DEEP_LINK + link_name, message.from_user.id)
+
     # В aiogram 3 payload передается в command.args
     if payload:
         if payload == "calculator":
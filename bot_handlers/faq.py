@@ -1,18 +1,74 @@
+from dataclasses import dataclass
+
 from aiogram import Router, F, types
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from core.faq_manager import load_faq_data
+from core.analytics import EVENT_FAQ_MENU, EVENT_FAQ_VIEW, analytics
+from core.faq_manager import faq_store
 
 router = Router()
 
-# --- Клавиатуры для FAQ ---
+FAQ_MENU_TEXT = "Часто задаваемые вопросы. Выберите вопрос, чтобы увидеть ответ:"
 
-def get_faq_keyboard() -> InlineKeyboardMarkup:
-    """Генерирует клавиатуру с вопросами из FAQ_DATA."""
+# Кнопка "Назад" одинакова для всех ответов, поэтому создаем ее один раз
+BACK_TO_FAQ_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[[InlineKeyboardButton(text="⬅️ Назад к вопросам", callback_data="back_to_faq")]]
+)
+
+
+@dataclass(frozen=True)
+class FaqRenderCache:
+    """Готовые к отправке клавиатура и ответы FAQ для конкретной версии данных."""
+    version: int
+    keyboard: InlineKeyboardMarkup
+    answers: dict[str, tuple[str, InlineKeyboardMarkup]]
+
+
+_render_cache: FaqRenderCache | None = None
+
+
+def _build_render_cache(faq_data: dict, version: int) -> FaqRenderCache:
+    """Строит клавиатуру с вопросами и пары (текст, разметка) для каждого ответа."""
     buttons = []
-    faq_data = load_faq_data()
+    answers = {}
     for key, data in faq_data.items():
         buttons.append([InlineKeyboardButton(text=data["question"], callback_data=f"faq_{key}")])
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
+        answers[key] = (
+            f"<b>Вопрос:</b> {data['question']}\n\n<b>Ответ:</b>\n{data['answer']}",
+            BACK_TO_FAQ_KEYBOARD,
+        )
+    return FaqRenderCache(
+        version=version,
+        keyboard=InlineKeyboardMarkup(inline_keyboard=buttons),
+        answers=answers,
+    )
+
+
+def rebuild_faq_render_cache() -> FaqRenderCache:
+    """
+    Пересобирает кэш отрисовки по текущим данным FAQ.
+    Новый снимок подменяет старый одной операцией присваивания.
+    """
+    global _render_cache
+    faq_data = faq_store.get_all()
+    _render_cache = _build_render_cache(faq_data, faq_store.version)
+    return _render_cache
+
+
+def get_faq_render_cache() -> FaqRenderCache:
+    """Возвращает актуальный кэш отрисовки, пересобирая его при смене версии FAQ."""
+    cache = _render_cache
+    # get_all() нужен, чтобы хранилище заметило изменение файла на диске
+    faq_store.get_all()
+    if cache is None or cache.version != faq_store.version:
+        cache = rebuild_faq_render_cache()
+    return cache
+
+
+# --- Клавиатуры для FAQ ---
+
+def get_faq_keyboard() -> InlineKeyboardMarkup:
+    """Возвращает готовую клавиатуру с вопросами из FAQ."""
+    return get_faq_render_cache().keyboard
 
 
 # --- Обработчики FAQ ---
@@ -21,17 +77,18 @@ def get_faq_keyboard() -> InlineKeyboardMarkup:
 @router.callback_query(F.data == "main_menu:faq")
 async def show_faq_menu(message: types.Message | types.CallbackQuery):
     """Отправляет меню с вопросами FAQ."""
+    analytics.record(EVENT_FAQ_MENU, message.from_user.id)
     if isinstance(message, types.CallbackQuery):
         # Если это колбэк, редактируем текущее сообщение, чтобы было красивее
         await message.message.edit_text(
-            "Часто задаваемые вопросы. Выберите вопрос, чтобы увидеть ответ:",
+            FAQ_MENU_TEXT,
             reply_markup=get_faq_keyboard()
         )
         await message.answer()
     else:
         # Если это текстовая команда, отправляем новое сообщение
         await message.answer(
-            "Часто задаваемые вопросы. Выберите вопрос, чтобы увидеть ответ:",
+            FAQ_MENU_TEXT,
             reply_markup=get_faq_keyboard()
         )
 
@@ -39,19 +96,11 @@ async def show_faq_menu(message: types.Message | types.CallbackQuery):
 async def show_faq_answer(callback: types.CallbackQuery):
     """Показывает ответ на выбранный вопрос и кнопку 'Назад'."""
     faq_key = callback.data.split("_", 1)[1]
-    faq_data = load_faq_data()
+    rendered = get_faq_render_cache().answers.get(faq_key)
     
-    if faq_key in faq_data:
-        question = faq_data[faq_key]["question"]
-        answer = faq_data[faq_key]["answer"]
-        
-        # Создаем кнопку "Назад к вопросам"
-        back_button = InlineKeyboardButton(text="⬅️ Назад к вопросам", callback_data="back_to_faq")
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[[back_button]])
-        
-        # Формируем текст сообщения
-        response_text = f"<b>Вопрос:</b> {question}\n\n<b>Ответ:</b>\n{answer}"
-        
+    if rendered is not None:
+        analytics.record(EVENT_FAQ_VIEW + faq_key, callback.from_user.id)
+        response_text, keyboard = rendered
         await callback.message.edit_text(response_text, reply_markup=keyboard, parse_mode="HTML")
     
     await callback.answer()
@@ -60,7 +109,7 @@ async def show_faq_answer(callback: types.CallbackQuery):
 async def back_to_faq_menu(callback: types.CallbackQuery):
     """Обрабатывает нажатие кнопки 'Назад к вопросам'."""
     await callback.message.edit_text(
-        "Часто задаваемые вопросы. Выберите вопрос, чтобы увидеть ответ:",
+        FAQ_MENU_TEXT,
         reply_markup=get_faq_keyboard()
     )
     await callback.answer() 
\ No newline at end of file
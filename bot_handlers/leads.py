@@ -0,0 +1,143 @@
+import datetime
+import html
+import logging
+import os
+
+from aiogram import Router, types
+from aiogram.filters import CommandObject
+from aiogram.filters.command import Command
+from aiogram.types import FSInputFile
+
+from core.csv_export import export_calculations, export_leads
+from core.lead_store import LEAD_STATUSES, Lead, lead_store
+from bot_handlers.admin import AdminFilter
+
+router = Router()
+
+REQUESTS_PAGE_SIZE = 20
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%d.%m.%Y %H:%M")
+
+
+def _format_lead_line(lead: Lead) -> str:
+    comment = (lead.comment or "").replace("\n", " ")
+    if len(comment) > 40:
+        comment = comment[:40] + "…"
+    return (f"<b>№{lead.id}</b> {_format_time(lead.created_at)} — "
+            f"{html.escape(lead.phone)} {html.escape(comment)}")
+
+
+def format_lead(lead: Lead) -> str:
+    """Подробная карточка заявки для менеджера. Поля от пользователя экранируются (parse_mode HTML)."""
+    tg_link = f"@{html.escape(lead.username)}" if lead.username else "не указан"
+    text = (
+        f"📋 <b>Заявка №{lead.id}</b> — {lead.status_title}\n\n"
+        f"👤 Имя: {html.escape(lead.full_name or '—')}\n"
+        f"📞 Телефон: {html.escape(lead.phone)}\n"
+        f"💬 Комментарий: {html.escape(lead.comment or '—')}\n"
+        f"TG: {tg_link} (ID: {lead.user_id})\n"
+        f"Создана: {_format_time(lead.created_at)}, изменена: {_format_time(lead.updated_at)}"
+    )
+    calc = lead.calculation
+    if calc:
+        total = f"{calc['total_rub']:,.0f}".replace(',', ' ') if calc['total_rub'] is not None else "—"
+        text += (
+            f"\n\n🧮 <b>Расчет перед заявкой</b> ({_format_time(calc['created_at'])}):\n"
+            f"Цена: {calc['car_price_cny']:,.0f} ¥, год: {calc['year']}, "
+            f"объем: {calc['engine_volume']}, топливо: {calc['fuel_type']}\n"
+            f"Итого: {total} ₽"
+        )
+    return text
+
+
+@router.message(Command("requests_new"), AdminFilter())
+async def show_new_requests(message: types.Message, command: CommandObject):
+    """Последние новые заявки: /requests_new [количество]"""
+    try:
+        limit = int(command.args) if command.args else REQUESTS_PAGE_SIZE
+    except ValueError:
+        limit = REQUESTS_PAGE_SIZE
+    limit = max(1, min(limit, 50))
+
+    leads = await lead_store.list_by_status("new", limit)
+    counts = await lead_store.count_by_status()
+    if not leads:
+        await message.answer("Новых заявок нет.")
+        return
+
+    summary = ", ".join(f"{LEAD_STATUSES[status]}: {counts.get(status, 0)}" for status in LEAD_STATUSES)
+    lines = "\n".join(_format_lead_line(lead) for lead in leads)
+    await message.answer(
+        f"{summary}\n\n{lines}\n\nПодробнее: <code>/request_info номер</code>",
+        parse_mode="HTML"
+    )
+
+
+@router.message(Command("request_info"), AdminFilter())
+async def show_request_info(message: types.Message, command: CommandObject):
+    """Карточка заявки: /request_info 123"""
+    try:
+        lead_id = int((command.args or "").strip().lstrip("№"))
+    except ValueError:
+        await message.answer("Формат: <code>/request_info номер</code>", parse_mode="HTML")
+        return
+
+    lead = await lead_store.get(lead_id)
+    if lead is None:
+        await message.answer(f"Заявка №{lead_id} не найдена.")
+        return
+    await message.answer(format_lead(lead), parse_mode="HTML")
+
+
+@router.message(Command("request_status"), AdminFilter())
+async def change_request_status(message: types.Message, command: CommandObject):
+    """Смена статуса заявки: /request_status 123 in_progress"""
+    statuses = ", ".join(f"<code>{status}</code>" for status in LEAD_STATUSES)
+    try:
+        lead_id_str, status = (command.args or "").split()
+        lead_id = int(lead_id_str.lstrip("№"))
+        if status not in LEAD_STATUSES:
+            raise ValueError
+    except ValueError:
+        await message.answer(
+            f"Формат: <code>/request_status номер статус</code>\nСтатусы: {statuses}",
+            parse_mode="HTML"
+        )
+        return
+
+    if not await lead_store.set_status(lead_id, status):
+        await message.answer(f"Заявка №{lead_id} не найдена.")
+        return
+    await message.answer(f"Статус заявки №{lead_id}: {LEAD_STATUSES[status]}")
+
+
+async def _send_export(message: types.Message, export, filename: str, title: str):
+    await message.answer("⏳ Готовлю выгрузку...")
+    try:
+        path, rows = await export()
+    except Exception as e:
+        logging.error(f"Ошибка выгрузки {filename}: {e}", exc_info=True)
+        await message.answer("❌ Не удалось подготовить выгрузку.")
+        return
+    try:
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M")
+        await message.answer_document(
+            FSInputFile(path, filename=f"{filename}_{stamp}.csv"),
+            caption=f"📄 {title}: {rows} строк."
+        )
+    finally:
+        os.remove(path)
+
+
+@router.message(Command("requests_export"), AdminFilter())
+async def export_requests(message: types.Message):
+    """Выгрузка всех заявок в CSV."""
+    await _send_export(message, export_leads, "requests", "Заявки")
+
+
+@router.message(Command("stats_export"), AdminFilter())
+async def export_stats(message: types.Message):
+    """Выгрузка всех расчетов в CSV."""
+    await _send_export(message, export_calculations, "calculations", "Расчеты")
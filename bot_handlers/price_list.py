@@ -0,0 +1,167 @@
+import asyncio
+import csv
+import io
+import logging
+import math
+
+from aiogram import Router, F, types
+from aiogram.filters.command import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.types import BufferedInputFile
+
+from core.calculator_logic import calculate_total_cost_batch
+from core.config import settings
+from bot_handlers.admin import AdminFilter, get_admin_cancel_keyboard
+from bot_handlers.calculator import parse_engine_volume
+
+router = Router()
+
+# Колонки входного файла; fuel_type и payer_type необязательны
+PRICE_LIST_COLUMNS = ("price_cny", "year", "engine_volume", "fuel_type", "payer_type")
+RESULT_COLUMNS = (
+    "car_price_rub",
+    "bank_commission_rub",
+    "company_commission_rub",
+    "china_expenses_rub",
+    "duty_rub",
+    "customs_fee_rub",
+    "recycling_fee_rub",
+    "total_customs_rub",
+    "total_cost_rub",
+)
+DEFAULT_FUEL_TYPE = "Бензин"
+DEFAULT_PAYER_TYPE = "Физическое лицо"
+# Лимит Telegram на скачивание файлов ботом
+MAX_FILE_SIZE = 20 * 1024 * 1024
+
+
+class PriceListStates(StatesGroup):
+    waiting_for_file = State()
+
+
+def _decode(data: bytes) -> str:
+    """Excel в русской локали часто сохраняет CSV в cp1251."""
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1251")
+
+
+def price_csv(data: bytes) -> tuple[bytes, int, int]:
+    """
+    Рассчитывает стоимость для каждой строки CSV-прайса.
+    Возвращает (csv с результатами, количество рассчитанных строк, количество строк с ошибками).
+    """
+    text = _decode(data)
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+    fieldnames = [name.strip() for name in (reader.fieldnames or [])]
+    reader.fieldnames = fieldnames
+    missing = [name for name in PRICE_LIST_COLUMNS[:3] if name not in fieldnames]
+    if missing:
+        raise ValueError(f"В файле нет колонок: {', '.join(missing)}")
+
+    rows, errors = [], []
+    price_cny, year, engine_volume, fuel_type, payer_type = [], [], [], [], []
+    valid_rows = []
+    for row in reader:
+        rows.append(row)
+        try:
+            # Сначала разбираем всю строку и только потом добавляем в колонки,
+            # иначе ошибка в середине строки оставит колонки разной длины
+            fuel = (row.get("fuel_type") or DEFAULT_FUEL_TYPE).strip()
+            volume = parse_engine_volume(row["engine_volume"] or "") if fuel != "Электро" else 0
+            if volume is None:
+                raise ValueError("некорректный объем")
+            price = float(row["price_cny"].replace(",", ".").strip())
+            if not math.isfinite(price) or price <= 0:
+                raise ValueError("некорректная стоимость")
+            try:
+                car_year = int(row["year"].strip())
+            except ValueError:
+                raise ValueError("некорректный год") from None
+            payer = (row.get("payer_type") or DEFAULT_PAYER_TYPE).strip()
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append(str(e) or "ошибка формата")
+            continue
+        price_cny.append(price)
+        year.append(car_year)
+        engine_volume.append(volume)
+        fuel_type.append(fuel)
+        payer_type.append(payer)
+        valid_rows.append(len(rows) - 1)
+        errors.append("")
+
+    result = calculate_total_cost_batch(price_cny, year, engine_volume, fuel_type, payer_type, settings)
+
+    output = io.StringIO()
+    writer = csv.writer(output, dialect=dialect)
+    writer.writerow(fieldnames + list(RESULT_COLUMNS) + ["error"])
+    computed = {row_index: i for i, row_index in enumerate(valid_rows)}
+    for row_index, row in enumerate(rows):
+        values = [row.get(name, "") for name in fieldnames]
+        i = computed.get(row_index)
+        if i is None:
+            values += [""] * len(RESULT_COLUMNS)
+        else:
+            values += [f"{getattr(result, name)[i]:.2f}" for name in RESULT_COLUMNS]
+        writer.writerow(values + [errors[row_index]])
+
+    return output.getvalue().encode("utf-8-sig"), len(valid_rows), len(rows) - len(valid_rows)
+
+
+@router.message(Command("price_list"), AdminFilter())
+@router.callback_query(F.data == "admin_price_list", AdminFilter())
+async def start_price_list(message: types.Message | types.CallbackQuery, state: FSMContext):
+    """Просит администратора загрузить CSV-прайс."""
+    if isinstance(message, types.CallbackQuery):
+        msg = message.message
+        await message.answer()
+    else:
+        msg = message
+    await state.set_state(PriceListStates.waiting_for_file)
+    await msg.answer(
+        "Отправьте CSV-файл с колонками:\n"
+        "<code>price_cny, year, engine_volume, fuel_type, payer_type</code>\n\n"
+        "Колонки fuel_type и payer_type необязательны. В ответ придет файл с рассчитанной стоимостью.",
+        reply_markup=get_admin_cancel_keyboard(),
+        parse_mode="HTML"
+    )
+
+
+@router.message(PriceListStates.waiting_for_file, F.document, AdminFilter())
+async def process_price_list(message: types.Message, state: FSMContext):
+    """Рассчитывает присланный прайс и отправляет файл с результатами."""
+    document = message.document
+    if document.file_size and document.file_size > MAX_FILE_SIZE:
+        await message.answer("❌ Файл слишком большой (максимум 20 МБ).")
+        return
+
+    buffer = io.BytesIO()
+    await message.bot.download(document, destination=buffer)
+    try:
+        # Разбор и расчет выполняем в потоке, чтобы не блокировать бота на больших файлах
+        priced, computed, failed = await asyncio.to_thread(price_csv, buffer.getvalue())
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        await message.answer(f"❌ Не удалось обработать файл: {e}", reply_markup=get_admin_cancel_keyboard())
+        return
+    except Exception as e:
+        logging.error(f"Ошибка при расчете прайса: {e}", exc_info=True)
+        await message.answer("❌ При расчете прайса произошла ошибка.")
+        return
+
+    await state.clear()
+    filename = (document.file_name or "price_list.csv").rsplit(".", 1)[0] + "_priced.csv"
+    await message.answer_document(
+        BufferedInputFile(priced, filename=filename),
+        caption=f"✅ Рассчитано строк: {computed}. Строк с ошибками: {failed}."
+    )
+
+
+@router.message(PriceListStates.waiting_for_file, AdminFilter())
+async def price_list_wrong_input(message: types.Message):
+    await message.answer("Пожалуйста, отправьте CSV-файл документом.", reply_markup=get_admin_cancel_keyboard())
@@ -0,0 +1,80 @@
+import datetime
+import logging
+
+from aiogram import Bot, Router, types
+from aiogram.filters import CommandObject
+from aiogram.filters.command import Command
+from aiogram.types import BufferedInputFile
+
+from core.profiler import CPROFILE_MAX_SECONDS, profiler
+from bot_handlers.admin import AdminFilter
+
+router = Router()
+
+PROFILE_USAGE = (
+    "Использование:\n"
+    "/profile start — включить профилирование обработчиков\n"
+    "/profile start 60 — на 60 секунд, затем прислать отчет\n"
+    f"/profile start 60 cprofile — то же с cProfile (не дольше {CPROFILE_MAX_SECONDS} с)\n"
+    "/profile stop — выключить и прислать отчет\n"
+    "/profile report — отчет без остановки"
+)
+
+
+async def _send_report(bot: Bot, chat_id: int, report: str, caption: str):
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    try:
+        await bot.send_document(
+            chat_id,
+            BufferedInputFile(report.encode("utf-8"), filename=f"profile_{stamp}.txt"),
+            caption=caption,
+        )
+    except Exception as e:
+        logging.error(f"Не удалось отправить отчет профилирования: {e}")
+
+
+@router.message(Command("profile"), AdminFilter())
+async def profile_command(message: types.Message, command: CommandObject, bot: Bot):
+    """Включение и выключение профилирования обработчиков."""
+    args = (command.args or "").split()
+    action = args[0].lower() if args else ""
+
+    if action == "start":
+        duration = None
+        with_cprofile = "cprofile" in (arg.lower() for arg in args[1:])
+        for arg in args[1:]:
+            if arg.isdigit() and int(arg) > 0:
+                duration = int(arg)
+
+        chat_id = message.chat.id
+
+        async def on_timeout(report: str):
+            await _send_report(bot, chat_id, report, "⏱ Профилирование завершено по таймеру.")
+
+        if not profiler.start(duration, with_cprofile, on_timeout):
+            await message.answer("Профилирование уже идет. Остановить: /profile stop")
+            return
+        text = "▶️ Профилирование включено"
+        if profiler.cprofile_active:
+            text += " вместе с cProfile (процесс работает заметно медленнее)"
+        if profiler.duration:
+            text += f". Отчет придет через {profiler.duration:.0f} с."
+        else:
+            text += ". Остановить: /profile stop"
+        await message.answer(text)
+
+    elif action == "stop":
+        if not profiler.stop():
+            await message.answer("Профилирование не было включено.")
+            return
+        await _send_report(bot, message.chat.id, profiler.report(), "⏹ Профилирование остановлено.")
+
+    elif action == "report":
+        if profiler.started_at is None:
+            await message.answer("Профилирование еще не запускалось.")
+            return
+        await _send_report(bot, message.chat.id, profiler.report(), "📊 Текущий отчет профилирования.")
+
+    else:
+        state = "включено" if profiler.active else "выключено"
+        await message.answer(f"Профилирование {state}.\n\n{PROFILE_USAGE}")
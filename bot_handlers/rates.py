@@ -0,0 +1,83 @@
+import datetime
+import logging
+
+from aiogram import Router, types
+from aiogram.filters import CommandObject
+from aiogram.filters.command import Command
+
+from core.calculator_logic import calculate_total_cost, format_result_for_user
+from core.config import settings
+from core.currency_updater import backfill_rate_history
+from core.rate_history import rate_history
+from bot_handlers.admin import AdminFilter
+from bot_handlers.calculator import parse_engine_volume
+
+router = Router()
+
+
+def _parse_date(text: str) -> datetime.date:
+    return datetime.datetime.strptime(text.strip(), "%d.%m.%Y").date()
+
+
+@router.message(Command("rates_backfill"), AdminFilter())
+async def backfill_rates(message: types.Message, command: CommandObject):
+    """Загружает историю курсов ЦБ за период: /rates_backfill 01.01.2024 31.12.2024"""
+    try:
+        date_from, date_to = (_parse_date(part) for part in (command.args or "").split())
+        if date_from > date_to:
+            raise ValueError
+    except ValueError:
+        await message.answer("Формат: <code>/rates_backfill ДД.ММ.ГГГГ ДД.ММ.ГГГГ</code>", parse_mode="HTML")
+        return
+
+    await message.answer("⏳ Загружаю историю курсов ЦБ...")
+    added = await backfill_rate_history(date_from, date_to)
+    date_range = rate_history.date_range()
+    stored = f"{date_range[0]:%d.%m.%Y} – {date_range[1]:%d.%m.%Y}" if date_range else "нет данных"
+    await message.answer(
+        f"✅ Добавлено дат: {added}.\n"
+        f"В истории: {len(rate_history)} дат ({stored})."
+    )
+
+
+@router.message(Command("quote_asof"), AdminFilter())
+async def quote_as_of(message: types.Message, command: CommandObject):
+    """Расчет по курсам на дату: /quote_asof 15.09.2026 150000 2020 1.5"""
+    try:
+        date_str, price_str, year_str, volume_str = (command.args or "").split()
+        as_of = _parse_date(date_str)
+        user_data = {
+            'car_price_cny': float(price_str.replace(',', '.')),
+            'year': int(year_str),
+            'engine_volume': parse_engine_volume(volume_str),
+            'engine_power': 0,
+            'payer_type': 'Физическое лицо',
+        }
+        if user_data['engine_volume'] is None or user_data['car_price_cny'] <= 0:
+            raise ValueError
+    except ValueError:
+        await message.answer(
+            "Формат: <code>/quote_asof ДД.ММ.ГГГГ цена_юани год объем</code>\n"
+            "Например: <code>/quote_asof 15.09.2026 150000 2020 1.5</code>",
+            parse_mode="HTML"
+        )
+        return
+
+    try:
+        result = calculate_total_cost(user_data, settings, as_of=as_of)
+    except ValueError as e:
+        await message.answer(f"❌ {e} Загрузите историю командой /rates_backfill.")
+        return
+    except Exception as e:
+        logging.error(f"Ошибка в расчете на дату: {e}", exc_info=True)
+        await message.answer("Извините, при расчете произошла ошибка.")
+        return
+
+    rates = rate_history.rates_on(as_of)
+    await message.answer(
+        f"📅 Расчет по курсам на {as_of:%d.%m.%Y} "
+        f"(1 ¥ = {rates.cny_to_rub} ₽, 1 € = {rates.eur_to_rub} ₽)\n"
+        f"Возраст авто считается на {as_of.year} год, ставки пошлин и сборов - текущие.\n\n"
+        + format_result_for_user(result),
+        parse_mode="HTML"
+    )
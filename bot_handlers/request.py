@@ -1,13 +1,28 @@
+import asyncio
+import logging
+
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 
 from core.config import settings
+from core.deferred import cancel_message, schedule_message
+from core.analytics import EVENT_REQUEST_CREATED, EVENT_REQUEST_PHONE, EVENT_REQUEST_STARTED, analytics
+from core.lead_store import lead_store
+from core.notifier import notifier
 from keyboards import get_main_inline_keyboard
 
 router = Router()
 
+# Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора
+_report_tasks: set[asyncio.Task] = set()
+
+# Через сколько секунд после приглашения показывать кнопку "Поделиться номером"
+PHONE_KEYBOARD_DELAY = 4
+# Сколько ждать номер заявки от базы, прежде чем уведомить админов без него
+LEAD_SAVE_TIMEOUT = 5
+
 class RequestState(StatesGroup):
     waiting_for_phone = State()
     waiting_for_comment = State()
@@ -22,11 +37,19 @@ def get_phone_request_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(keyboard=[[button]], resize_keyboard=True, one_time_keyboard=True)
 
 
+def _phone_keyboard_key(chat_id: int) -> str:
+    return f"phone_keyboard:{chat_id}"
+
+
+def cancel_phone_keyboard(chat_id: int):
+    """Отменяет отложенную кнопку "Поделиться номером", если пользователь ушел из заявки."""
+    cancel_message(_phone_keyboard_key(chat_id))
+
+
 @router.callback_query(F.data == "main_menu:application")
 async def start_request(message: Message | CallbackQuery, state: FSMContext):
     """Начинает процесс создания заявки, может вызываться и по deep-link."""
-    import asyncio
-    
+    analytics.record(EVENT_REQUEST_STARTED, message.from_user.id)
     if isinstance(message, CallbackQuery):
         msg = message.message
         await message.answer()  # Закрываем "часики" на кнопке
@@ -39,13 +62,15 @@ async def start_request(message: Message | CallbackQuery, state: FSMContext):
         "Или нажмите на кнопку, которая появится ниже.",
         reply_markup=ReplyKeyboardRemove()
     )
-    
-    # Делаем асинхронную паузу
-    await asyncio.sleep(4)
-    
-    # Затем отправляем клавиатуру с подсказкой
-    await msg.answer(
+
+    # Клавиатуру с подсказкой отправит планировщик через паузу, обработчик не ждет.
+    # Если пользователь ответит раньше, отправка отменяется.
+    schedule_message(
+        msg.bot,
+        _phone_keyboard_key(msg.chat.id),
+        msg.chat.id,
         "Нажмите на кнопку ниже 👇",
+        PHONE_KEYBOARD_DELAY,
         reply_markup=get_phone_request_keyboard()
     )
 
@@ -55,6 +80,8 @@ async def start_request(message: Message | CallbackQuery, state: FSMContext):
 @router.message(RequestState.waiting_for_phone, F.contact)
 async def process_phone_from_contact(message: Message, state: FSMContext):
     """Обрабатывает номер телефона, полученный через кнопку."""
+    cancel_message(_phone_keyboard_key(message.chat.id))
+    analytics.record(EVENT_REQUEST_PHONE, message.from_user.id)
     await state.update_data(phone=message.contact.phone_number)
     await message.answer(
         "Спасибо! Ваш номер принят.",
@@ -67,6 +94,8 @@ async def process_phone_from_contact(message: Message, state: FSMContext):
 @router.message(RequestState.waiting_for_phone, F.text)
 async def process_phone_from_text(message: Message, state: FSMContext):
     """Обрабатывает номер телефона, введенный как текст."""
+    cancel_message(_phone_keyboard_key(message.chat.id))
+    analytics.record(EVENT_REQUEST_PHONE, message.from_user.id)
     await state.update_data(phone=message.text)
     await message.answer(
         "Спасибо! Ваш номер принят.",
@@ -76,6 +105,16 @@ async def process_phone_from_text(message: Message, state: FSMContext):
     await state.set_state(RequestState.waiting_for_comment)
 
 
+async def _report_admin_deliveries(deliveries: list[asyncio.Future]):
+    """Дожидается доставки уведомлений о заявке и логирует неудачи."""
+    reports = await asyncio.gather(*deliveries)
+    failed = [report for report in reports if not report.ok]
+    for report in failed:
+        logging.error(f"Не удалось отправить уведомление админу {report.chat_id}: {report.error}")
+    if reports and len(failed) == len(reports):
+        logging.critical("Заявка не доставлена ни одному администратору!")
+
+
 @router.message(RequestState.waiting_for_comment)
 async def process_comment(message: Message, state: FSMContext):
     """Обрабатывает комментарий, отправляет заявку и завершает процесс."""
@@ -85,22 +124,41 @@ async def process_comment(message: Message, state: FSMContext):
     # ИСПРАВЛЕНИЕ: Корректно обрабатываем случай, когда у пользователя нет username
     user_tg_link = f"@{message.from_user.username}" if message.from_user.username else "не указан"
 
+    # Номер заявке присваивает база, запись идет вместе с ближайшей пачкой.
+    # Если база недоступна, заявку все равно получают админы - просто без номера
+    # (при таймауте запись остается в очереди и попадет в базу, когда та освободится)
+    try:
+        lead = await asyncio.wait_for(lead_store.create_lead(
+            user_id=message.from_user.id,
+            phone=user_data['phone'],
+            comment=user_data['comment'],
+            full_name=message.from_user.full_name,
+            username=message.from_user.username,
+        ), LEAD_SAVE_TIMEOUT)
+        title = f"🔔 Новая заявка №{lead.id}!"
+    except asyncio.TimeoutError:
+        logging.error(f"База заявок не ответила за {LEAD_SAVE_TIMEOUT} с, заявка отправлена админам без номера")
+        title = "🔔 Новая заявка (номер не присвоен: база заявок не ответила вовремя)!"
+    except Exception as e:
+        logging.error(f"Заявка не сохранена в базу, отправлена админам без номера: {e}", exc_info=True)
+        title = "🔔 Новая заявка (не сохранена в базе!)"
+    analytics.record(EVENT_REQUEST_CREATED, message.from_user.id)
+
     # Формируем сообщение для администратора
     admin_message = (
-        f"🔔 Новая заявка!\n\n"
+        f"{title}\n\n"
         f"👤 Имя: {message.from_user.full_name}\n"
         f"📞 Телефон: {user_data['phone']}\n"
         f"💬 Комментарий: {user_data['comment']}\n"
         f"TG: {user_tg_link} (ID: {message.from_user.id})"
     )
     
-    # Отправляем уведомление всем администраторам
-    for admin_id in settings.bot.admin_ids:
-        try:
-            await message.bot.send_message(admin_id, admin_message)
-        except Exception as e:
-            # В реальном проекте здесь лучше использовать логирование
-            print(f"Не удалось отправить уведомление админу {admin_id}: {e}")
+    # Уведомления администраторам отправляются в фоне через очередь с учетом лимитов Telegram,
+    # пользователь получает подтверждение сразу
+    deliveries = notifier.submit_many(settings.bot.admin_ids, admin_message)
+    task = asyncio.create_task(_report_admin_deliveries(deliveries))
+    _report_tasks.add(task)
+    task.add_done_callback(_report_tasks.discard)
 
     # Благодарим пользователя и возвращаем в главное меню
     await message.answer(
@@ -0,0 +1,130 @@
+import datetime
+import time
+
+from aiogram import Router, types
+from aiogram.filters import CommandObject
+from aiogram.filters.command import Command
+
+from core.analytics import (
+    EVENT_CALC_COMPLETED,
+    EVENT_CALC_FAILED,
+    EVENT_CALC_STARTED,
+    EVENT_DEEP_LINK,
+    EVENT_FAQ_MENU,
+    EVENT_FAQ_VIEW,
+    EVENT_REQUEST_CREATED,
+    EVENT_REQUEST_PHONE,
+    EVENT_REQUEST_STARTED,
+    analytics,
+)
+from core.faq_manager import faq_store
+from core.scheduler import SCHEDULER_TIMEZONE
+from core.user_registry import user_registry
+from middlewares import user_tracking
+from bot_handlers.admin import AdminFilter
+
+router = Router()
+
+
+@router.message(Command("stats_users"), AdminFilter())
+async def show_user_stats(message: types.Message):
+    """Сводка по пользователям бота."""
+    # Чтобы в статистику попали и самые свежие визиты
+    await user_tracking.flush()
+    stats = await user_registry.stats()
+    new, active = stats["new"], stats["active"]
+    languages = ", ".join(f"{language}: {count}" for language, count in stats["languages"]) or "—"
+    await message.answer(
+        "👥 <b>Пользователи</b>\n\n"
+        f"Всего: {stats['total']} (заблокировали бота: {stats['blocked']})\n\n"
+        f"<b>Новые:</b> за сутки {new['day']}, за неделю {new['week']}, за месяц {new['month']}\n"
+        f"<b>Активные:</b> за сутки {active['day']}, за неделю {active['week']}, за месяц {active['month']}\n\n"
+        f"<b>Языки:</b> {languages}",
+        parse_mode="HTML"
+    )
+
+
+# --- Активность и воронки (из агрегатов аналитики) ---
+
+STATS_PERIODS = {
+    "day": 1, "сутки": 1, "день": 1,
+    "week": 7, "неделя": 7,
+    "month": 30, "месяц": 30,
+}
+
+
+def _day_range(days: int) -> tuple[str, str]:
+    today = datetime.datetime.now(SCHEDULER_TIMEZONE).date()
+    return (today - datetime.timedelta(days=days - 1)).isoformat(), today.isoformat()
+
+
+def _percent(part: int, whole: int) -> str:
+    return f"{part / whole:.0%}" if whole else "—"
+
+
+@router.message(Command("stats_activity"), AdminFilter())
+async def show_activity_stats(message: types.Message):
+    """Активность за последние сутки и неделю."""
+    week_start, today = _day_range(7)
+    daily_users = await analytics.active_users(week_start, today)
+    week_users = await analytics.unique_users(week_start, today)
+    week_events = await analytics.daily_totals(week_start, today)
+
+    current_hour = int(time.time()) // 3600
+    hourly = await analytics.hourly_totals(current_hour - 23, current_hour)
+    hours = "\n".join(
+        f"{datetime.datetime.fromtimestamp(hour * 3600, SCHEDULER_TIMEZONE):%H:%M} — {hourly[hour]}"
+        for hour in range(current_hour - 23, current_hour + 1) if hour in hourly
+    ) or "нет событий"
+
+    faq_views = sorted(
+        ((event[len(EVENT_FAQ_VIEW):], count) for event, count in week_events.items() if event.startswith(EVENT_FAQ_VIEW)),
+        key=lambda item: item[1], reverse=True
+    )[:5]
+    faq_questions = faq_store.get_all()
+    faq_lines = "\n".join(
+        f"{faq_questions.get(key, {}).get('question', key)} — {count}" for key, count in faq_views
+    ) or "нет просмотров"
+
+    days = "\n".join(f"{day[8:10]}.{day[5:7]} — {count}" for day, count in sorted(daily_users.items()))
+    await message.answer(
+        "📈 <b>Активность</b>\n\n"
+        f"Пользователей сегодня: {daily_users.get(today, 0)}, за 7 дней: {week_users}\n\n"
+        f"<b>По дням:</b>\n{days or 'нет данных'}\n\n"
+        f"<b>События за 24 часа по часам:</b>\n{hours}\n\n"
+        f"<b>Популярные вопросы FAQ (7 дней):</b>\n{faq_lines}",
+        parse_mode="HTML"
+    )
+
+
+@router.message(Command("stats_requests"), AdminFilter())
+async def show_request_stats(message: types.Message, command: CommandObject):
+    """Воронки расчетов и заявок: /stats_requests [day|week|month|число дней]"""
+    arg = (command.args or "week").strip().lower()
+    days = STATS_PERIODS.get(arg) or (int(arg) if arg.isdigit() and 0 < int(arg) <= 366 else None)
+    if days is None:
+        await message.answer(
+            "Формат: <code>/stats_requests [day|week|month|число дней]</code>", parse_mode="HTML"
+        )
+        return
+
+    first_day, last_day = _day_range(days)
+    totals = await analytics.daily_totals(first_day, last_day)
+    calc_started, calc_done = totals[EVENT_CALC_STARTED], totals[EVENT_CALC_COMPLETED]
+    req_started, req_phone, req_created = totals[EVENT_REQUEST_STARTED], totals[EVENT_REQUEST_PHONE], totals[EVENT_REQUEST_CREATED]
+    links = ", ".join(
+        f"{event[len(EVENT_DEEP_LINK):]}: {count}"
+        for event, count in sorted(totals.items()) if event.startswith(EVENT_DEEP_LINK)
+    ) or "нет переходов"
+
+    await message.answer(
+        f"📊 <b>Воронки за {days} дн.</b>\n\n"
+        f"<b>Калькулятор:</b> начато {calc_started}, выполнено {calc_done} ({_percent(calc_done, calc_started)}), "
+        f"ошибок {totals[EVENT_CALC_FAILED]}\n"
+        f"<b>Заявки:</b> начато {req_started} → телефон {req_phone} ({_percent(req_phone, req_started)}) "
+        f"→ отправлено {req_created} ({_percent(req_created, req_started)})\n"
+        f"Заявок на выполненный расчет: {_percent(req_created, calc_done)}\n"
+        f"<b>FAQ:</b> открытий меню {totals[EVENT_FAQ_MENU]}\n"
+        f"<b>Переходы по ссылкам:</b> {links}",
+        parse_mode="HTML"
+    )
@@ -0,0 +1,179 @@
+import asyncio
+import datetime
+import logging
+import sqlite3
+import time
+from collections import Counter
+
+from .config import runtime
+from .scheduler import SCHEDULER_TIMEZONE
+from .sqlite_db import SQLiteDatabase
+
+ANALYTICS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events_hourly (
+    hour INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (hour, event)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS events_daily (
+    day TEXT NOT NULL,
+    event TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, event)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS active_users_daily (
+    day TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    PRIMARY KEY (day, user_id)
+) WITHOUT ROWID;
+"""
+
+# События, по которым строятся воронки
+EVENT_CALC_STARTED = "calc_started"
+EVENT_CALC_COMPLETED = "calc_completed"
+EVENT_CALC_FAILED = "calc_failed"
+EVENT_FAQ_MENU = "faq_menu"
+EVENT_FAQ_VIEW = "faq_view:"  # + ключ вопроса
+EVENT_REQUEST_STARTED = "request_started"
+EVENT_REQUEST_PHONE = "request_phone"
+EVENT_REQUEST_CREATED = "request_created"
+EVENT_DEEP_LINK = "deep_link:"  # + payload
+
+ROLLUP_INTERVAL = 60.0
+
+
+class Analytics:
+    """
+    Счетчики событий для статистики.
+    Запись события - увеличение счетчика в памяти за O(1) без обращений к базе.
+    Раз в минуту накопленное добавляется в почасовые и дневные агрегаты,
+    по которым и строятся отчеты (сырые события не хранятся).
+    """
+
+    def __init__(self, path: str):
+        self.db = SQLiteDatabase(path, ANALYTICS_SCHEMA)
+        # (час, событие) -> количество
+        self._counts: Counter = Counter()
+        # Уникальные пользователи текущего дня и еще не записанные из них
+        self._day = ""
+        self._day_users: set[int] = set()
+        self._new_users: list[tuple[str, int]] = []
+        self._hour = -1
+        self._rollup_task: asyncio.Task | None = None
+        self._rollup_lock = asyncio.Lock()
+
+    def _current_hour(self) -> int:
+        hour = int(time.time()) // 3600
+        if hour != self._hour:
+            self._hour = hour
+            day = day_of_hour(hour)
+            if day != self._day:
+                self._day = day
+                self._day_users = set()
+        return hour
+
+    def record(self, event: str, user_id: int | None = None):
+        """Учитывает событие (и активность пользователя за день)."""
+        self._counts[(self._current_hour(), event)] += 1
+        if user_id is not None and user_id not in self._day_users:
+            self._day_users.add(user_id)
+            self._new_users.append((self._day, user_id))
+
+    # --- Сброс в базу ---
+
+    @staticmethod
+    def _rollup_sync(conn: sqlite3.Connection, counts: Counter, new_users: list[tuple[str, int]]):
+        daily: Counter = Counter()
+        for (hour, event), count in counts.items():
+            daily[(day_of_hour(hour), event)] += count
+        with conn:
+            conn.executemany(
+                "INSERT INTO events_hourly (hour, event, count) VALUES (?, ?, ?) "
+                "ON CONFLICT(hour, event) DO UPDATE SET count = count + excluded.count",
+                [(hour, event, count) for (hour, event), count in counts.items()]
+            )
+            conn.executemany(
+                "INSERT INTO events_daily (day, event, count) VALUES (?, ?, ?) "
+                "ON CONFLICT(day, event) DO UPDATE SET count = count + excluded.count",
+                [(day, event, count) for (day, event), count in daily.items()]
+            )
+            conn.executemany("INSERT OR IGNORE INTO active_users_daily (day, user_id) VALUES (?, ?)", new_users)
+
+    async def flush(self):
+        """Переносит накопленные счетчики в агрегаты."""
+        async with self._rollup_lock:
+            if not self._counts and not self._new_users:
+                return
+            counts, self._counts = self._counts, Counter()
+            new_users, self._new_users = self._new_users, []
+            try:
+                await self.db.run(self._rollup_sync, counts, new_users)
+            except Exception as e:
+                logging.error(f"Ошибка записи статистики: {e}")
+                # Вернем счетчики, чтобы не потерять их до следующей попытки
+                self._counts.update(counts)
+                self._new_users.extend(new_users)
+
+    async def _rollup_loop(self):
+        while True:
+            await asyncio.sleep(ROLLUP_INTERVAL)
+            await self.flush()
+
+    async def start(self):
+        await self.db.open()
+        if self._rollup_task is None:
+            self._rollup_task = asyncio.create_task(self._rollup_loop(), name="analytics-rollup")
+
+    async def stop(self):
+        if self._rollup_task is not None:
+            self._rollup_task.cancel()
+            await asyncio.gather(self._rollup_task, return_exceptions=True)
+            self._rollup_task = None
+        await self.flush()
+        await self.db.close()
+
+    # --- Отчеты ---
+
+    async def daily_totals(self, first_day: str, last_day: str) -> Counter:
+        """Суммы событий за дни first_day..last_day включительно (ГГГГ-ММ-ДД)."""
+        await self.flush()
+        rows = await self.db.run(lambda conn: conn.execute(
+            "SELECT event, SUM(count) FROM events_daily WHERE day BETWEEN ? AND ? GROUP BY event",
+            (first_day, last_day)
+        ).fetchall())
+        return Counter(dict(rows))
+
+    async def active_users(self, first_day: str, last_day: str) -> dict[str, int]:
+        """Количество уникальных пользователей по дням."""
+        await self.flush()
+        rows = await self.db.run(lambda conn: conn.execute(
+            "SELECT day, COUNT(*) FROM active_users_daily WHERE day BETWEEN ? AND ? GROUP BY day",
+            (first_day, last_day)
+        ).fetchall())
+        return dict(rows)
+
+    async def unique_users(self, first_day: str, last_day: str) -> int:
+        """Количество уникальных пользователей за период."""
+        await self.flush()
+        return await self.db.run(lambda conn: conn.execute(
+            "SELECT COUNT(DISTINCT user_id) FROM active_users_daily WHERE day BETWEEN ? AND ?",
+            (first_day, last_day)
+        ).fetchone()[0])
+
+    async def hourly_totals(self, first_hour: int, last_hour: int) -> dict[int, int]:
+        """Количество всех событий по часам."""
+        await self.flush()
+        rows = await self.db.run(lambda conn: conn.execute(
+            "SELECT hour, SUM(count) FROM events_hourly WHERE hour BETWEEN ? AND ? GROUP BY hour",
+            (first_hour, last_hour)
+        ).fetchall())
+        return dict(rows)
+
+
+def day_of_hour(hour: int) -> str:
+    """Дата (по Москве) часа, заданного номером часа от начала эпохи."""
+    return datetime.datetime.fromtimestamp(hour * 3600, SCHEDULER_TIMEZONE).strftime("%Y-%m-%d")
+
+
+analytics = Analytics(runtime.storage.analytics_db_path)
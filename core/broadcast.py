@@ -0,0 +1,319 @@
+import asyncio
+import datetime
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from .rate_limit import TELEGRAM_GLOBAL_RATE, TokenBucket, telegram_global_bucket
+from .scheduler import scheduler
+from .user_registry import UserRegistry, user_registry
+
+BROADCAST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL,
+    admin_chat_id INTEGER NOT NULL,
+    progress_message_id INTEGER,
+    scheduled_at REAL,
+    last_user_id INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    sent INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    blocked INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+"""
+
+# Чуть ниже общего лимита Telegram: часть пропускной способности оставляем
+# ответам пользователям и уведомлениям администраторов
+BROADCAST_RATE = TELEGRAM_GLOBAL_RATE * 0.8
+BROADCAST_CONCURRENCY = 8
+BROADCAST_PAGE_SIZE = 100
+BROADCAST_MAX_ATTEMPTS = 3
+PROGRESS_INTERVAL = 5.0
+
+
+@dataclass
+class Campaign:
+    id: int
+    text: str
+    status: str
+    admin_chat_id: int
+    progress_message_id: int | None
+    scheduled_at: float | None
+    last_user_id: int
+    total: int
+    sent: int
+    failed: int
+    blocked: int
+    created_at: float
+    started_at: float | None
+    finished_at: float | None
+
+
+CAMPAIGN_COLUMNS = (
+    "id, text, status, admin_chat_id, progress_message_id, scheduled_at, last_user_id, "
+    "total, sent, failed, blocked, created_at, started_at, finished_at"
+)
+
+
+class BroadcastEngine:
+    """
+    Рассылка сообщения всем пользователям из реестра.
+    Получатели читаются страницами, отправка идет параллельно, но не быстрее
+    BROADCAST_RATE сообщений в секунду и в пределах общего с уведомлениями лимита бота. После каждой страницы сохраняется
+    контрольная точка, поэтому после перезапуска рассылка продолжается с места остановки.
+    """
+
+    def __init__(
+        self,
+        registry: UserRegistry,
+        rate: float = BROADCAST_RATE,
+        global_bucket: TokenBucket = telegram_global_bucket,
+    ):
+        self.registry = registry
+        # Собственный лимит рассылки плюс общий лимит бота, который делится с уведомлениями
+        self.bucket = TokenBucket(rate)
+        self.global_bucket = global_bucket
+        self._bot: Bot | None = None
+        self._tasks: dict[int, asyncio.Task] = {}
+
+    @property
+    def db(self):
+        return self.registry.db
+
+    async def start(self, bot: Bot):
+        """Создает таблицу, продолжает прерванные и восстанавливает запланированные рассылки."""
+        self._bot = bot
+        await self.db.run(lambda conn: conn.executescript(BROADCAST_SCHEMA))
+        for campaign in await self._select("status IN ('running', 'scheduled')"):
+            if campaign.status == "running":
+                logging.info(f"Продолжаем рассылку №{campaign.id} с пользователя {campaign.last_user_id}")
+                self._launch(campaign.id)
+            else:
+                self._schedule_job(campaign)
+
+    async def stop(self):
+        """Останавливает активные рассылки; прогресс уже сохранен в контрольных точках."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- Работа с базой ---
+
+    async def _select(self, where: str, *params) -> list[Campaign]:
+        rows = await self.db.run(lambda conn: conn.execute(
+            f"SELECT {CAMPAIGN_COLUMNS} FROM broadcasts WHERE {where} ORDER BY id", params
+        ).fetchall())
+        return [Campaign(*row) for row in rows]
+
+    async def get(self, campaign_id: int) -> Campaign | None:
+        campaigns = await self._select("id = ?", campaign_id)
+        return campaigns[0] if campaigns else None
+
+    async def _update(self, campaign_id: int, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+
+        def update(conn: sqlite3.Connection):
+            with conn:
+                conn.execute(f"UPDATE broadcasts SET {assignments} WHERE id = ?", (*fields.values(), campaign_id))
+
+        await self.db.run(update)
+
+    async def create(self, text: str, admin_chat_id: int, scheduled_at: datetime.datetime | None = None) -> Campaign:
+        """Создает рассылку: сразу запускает ее или планирует на scheduled_at."""
+        status = "scheduled" if scheduled_at else "running"
+        timestamp = scheduled_at.timestamp() if scheduled_at else None
+
+        def insert(conn: sqlite3.Connection) -> int:
+            with conn:
+                return conn.execute(
+                    "INSERT INTO broadcasts (text, status, admin_chat_id, scheduled_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (text, status, admin_chat_id, timestamp, time.time())
+                ).lastrowid
+
+        campaign = await self.get(await self.db.run(insert))
+        if scheduled_at:
+            self._schedule_job(campaign)
+        else:
+            self._launch(campaign.id)
+        return campaign
+
+    async def cancel(self, campaign_id: int) -> bool:
+        """Отменяет запланированную или идущую рассылку."""
+        campaign = await self.get(campaign_id)
+        if campaign is None or campaign.status not in ("running", "scheduled"):
+            return False
+        job = scheduler.get_job(f"broadcast:{campaign_id}")
+        if job is not None:
+            job.remove()
+        task = self._tasks.get(campaign_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self._update(campaign_id, status="cancelled", finished_at=time.time())
+        return True
+
+    # --- Запуск ---
+
+    def _schedule_job(self, campaign: Campaign):
+        run_date = datetime.datetime.fromtimestamp(campaign.scheduled_at, scheduler.timezone)
+        scheduler.add_job(
+            self._start_scheduled,
+            'date',
+            run_date=run_date,
+            id=f"broadcast:{campaign.id}",
+            replace_existing=True,
+            # Если бот был выключен в назначенное время, рассылка начнется при запуске
+            misfire_grace_time=None,
+            args=[campaign.id],
+        )
+
+    async def _start_scheduled(self, campaign_id: int):
+        await self._update(campaign_id, status="running")
+        self._launch(campaign_id)
+
+    def _launch(self, campaign_id: int):
+        if campaign_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(campaign_id), name=f"broadcast-{campaign_id}")
+        self._tasks[campaign_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(campaign_id, None))
+
+    # --- Отправка ---
+
+    async def _send(self, user_id: int, text: str) -> str:
+        """Отправляет одно сообщение. Возвращает "sent", "blocked" или "failed"."""
+        for attempt in range(1, BROADCAST_MAX_ATTEMPTS + 1):
+            await self.bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                await self._bot.send_message(user_id, text, parse_mode="HTML", disable_web_page_preview=True)
+                return "sent"
+            except TelegramRetryAfter as e:
+                # Лимит превышен для всего бота: притормаживаем всех отправителей
+                self.bucket.penalize(e.retry_after)
+                self.global_bucket.penalize(e.retry_after)
+            except TelegramForbiddenError:
+                return "blocked"
+            except TelegramBadRequest as e:
+                # Например, "chat not found" - пользователь удалил аккаунт
+                logging.debug(f"Рассылка: пользователь {user_id} недоступен: {e}")
+                return "blocked" if "chat not found" in str(e).lower() else "failed"
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logging.warning(f"Рассылка: ошибка отправки пользователю {user_id} (попытка {attempt}): {e}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+        return "failed"
+
+    async def _run(self, campaign_id: int):
+        campaign = await self.get(campaign_id)
+        if campaign is None or campaign.status != "running":
+            return
+        if campaign.started_at is None:
+            campaign.started_at = time.time()
+            campaign.total = await self.registry.count_recipients()
+            await self._update(campaign_id, started_at=campaign.started_at, total=campaign.total)
+
+        progress = _Progress(self, campaign)
+        await progress.report(force=True)
+        semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+
+        async def send_limited(user_id: int) -> str:
+            async with semaphore:
+                return await self._send(user_id, campaign.text)
+
+        try:
+            async for page in self.registry.iter_recipient_pages(campaign.last_user_id, BROADCAST_PAGE_SIZE):
+                results = await asyncio.gather(*(send_limited(user_id) for user_id in page))
+                blocked_ids = [user_id for user_id, result in zip(page, results) if result == "blocked"]
+                await self.registry.mark_blocked(blocked_ids)
+
+                campaign.sent += results.count("sent")
+                campaign.failed += results.count("failed")
+                campaign.blocked += len(blocked_ids)
+                campaign.last_user_id = page[-1]
+                progress.done += len(page)
+                # Контрольная точка: страница полностью обработана
+                await self._update(
+                    campaign_id,
+                    last_user_id=campaign.last_user_id,
+                    sent=campaign.sent,
+                    failed=campaign.failed,
+                    blocked=campaign.blocked,
+                )
+                await progress.report()
+
+            campaign.status = "done"
+            campaign.finished_at = time.time()
+            await self._update(campaign_id, status="done", finished_at=campaign.finished_at)
+            await progress.report(force=True)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Рассылка №{campaign_id} прервана: {e}", exc_info=True)
+            await self._update(campaign_id, status="failed", finished_at=time.time())
+
+
+class _Progress:
+    """Редактирует сообщение администратора с прогрессом рассылки не чаще PROGRESS_INTERVAL."""
+
+    def __init__(self, engine: BroadcastEngine, campaign: Campaign):
+        self.engine = engine
+        self.campaign = campaign
+        # Скорость считаем только по этому запуску (после перезапуска - заново)
+        self.done = 0
+        self.started = time.monotonic()
+        self.reported_at = 0.0
+
+    def _text(self) -> str:
+        c = self.campaign
+        processed = c.sent + c.failed + c.blocked
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        speed = self.done / elapsed
+        remaining = max(c.total - processed, 0)
+        title = "✅ Рассылка завершена" if c.status == "done" else "📤 Идет рассылка"
+        text = (
+            f"{title} №{c.id}\n\n"
+            f"Обработано: {processed} из {c.total}\n"
+            f"Доставлено: {c.sent}, ошибок: {c.failed}, заблокировали бота: {c.blocked}\n"
+            f"Скорость: {speed:.1f} сообщ./с"
+        )
+        if c.status != "done" and speed > 0:
+            text += f", осталось примерно {remaining / speed / 60:.0f} мин."
+        return text
+
+    async def report(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self.reported_at < PROGRESS_INTERVAL:
+            return
+        self.reported_at = now
+        c = self.campaign
+        bot = self.engine._bot
+        try:
+            if c.progress_message_id is None:
+                message = await bot.send_message(c.admin_chat_id, self._text())
+                c.progress_message_id = message.message_id
+                await self.engine._update(c.id, progress_message_id=c.progress_message_id)
+            else:
+                await bot.edit_message_text(self._text(), chat_id=c.admin_chat_id, message_id=c.progress_message_id)
+        except Exception as e:
+            # Прогресс - вспомогательная информация, рассылку из-за него не останавливаем
+            logging.debug(f"Не удалось обновить прогресс рассылки №{c.id}: {e}")
+
+
+broadcast_engine = BroadcastEngine(user_registry)
@@ -0,0 +1,100 @@
+import datetime
+import time
+from collections import OrderedDict
+
+from .calculator_logic import CalculationResult, calculate_total_cost, format_result_for_user
+from .config import Settings
+from .tariff_tables import get_tariff_tables
+
+# Сколько разных расчетов держать в памяти и сколько секунд они живут
+CALCULATION_CACHE_SIZE = 2048
+CALCULATION_CACHE_TTL = 3600.0
+
+
+class CalculationCache:
+    """
+    LRU-кэш с ограничением по времени жизни для готовых расчетов.
+    Ключ включает версию настроек: после обновления курсов или ставок
+    кэш целиком сбрасывается при первом же обращении.
+    """
+
+    def __init__(self, maxsize: int = CALCULATION_CACHE_SIZE, ttl: float = CALCULATION_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, tuple[float, CalculationResult, str]] = OrderedDict()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: int):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: tuple, version: int) -> tuple[CalculationResult, str] | None:
+        self._check_version(version)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, result, text = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result, text
+
+    def put(self, key: tuple, version: int, result: CalculationResult, text: str):
+        self._check_version(version)
+        self._entries[key] = (time.monotonic() + self.ttl, result, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+calculation_cache = CalculationCache()
+
+
+def make_cache_key(user_data: dict) -> tuple:
+    """Нормализованный набор входных данных, от которых зависит результат."""
+    return (
+        float(user_data['car_price_cny']),
+        int(user_data['year']),
+        int(user_data['engine_volume']),
+        int(user_data.get('engine_power', 0) or 0),
+        user_data.get('payer_type'),
+        # Возраст авто считается от текущего года
+        datetime.date.today().year,
+    )
+
+
+def calculate_and_format(user_data: dict, settings: Settings) -> tuple[CalculationResult, str]:
+    """Возвращает результат расчета и готовый текст, используя кэш."""
+    version = get_tariff_tables(settings).version
+    key = make_cache_key(user_data)
+    cached = calculation_cache.get(key, version)
+    if cached is not None:
+        return cached
+    result = calculate_total_cost(user_data=user_data, settings=settings)
+    text = format_result_for_user(result)
+    calculation_cache.put(key, version, result, text)
+    return result, text
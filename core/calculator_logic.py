@@ -1,6 +1,11 @@
 import datetime
 from dataclasses import dataclass, field
-from .config import Settings
+
+import numpy as np
+
+from .config import CurrencyRates, Settings
+from .rate_history import rate_history
+from .tariff_tables import DUTY_AGE_BOUNDS, DUTY_AGE_UNDER_3, RECYCLING_AGE_BOUNDS, get_tariff_tables
 
 @dataclass
 class CustomsResult:
@@ -21,50 +26,50 @@ class CalculationResult:
     total_cost_rub: float = 0.0
     # ... здесь будут поля для таможенных платежей
 
-def _calculate_customs_for_individual(user_data: dict, settings: Settings) -> CustomsResult:
+def _calculate_customs_for_individual(
+    user_data: dict,
+    settings: Settings,
+    rates: CurrencyRates | None = None,
+    current_year: int | None = None,
+) -> CustomsResult:
     """
     Рассчитывает таможенные платежи для физического лица.
+    current_year - год, от которого считается возраст авто (по умолчанию текущий).
     ВНИМАНИЕ: Ставки являются примерными и должны обновляться в конфиге!
     """
+    rates = rates or settings.rates
     customs_result = CustomsResult()
-    current_year = datetime.datetime.now().year
+    current_year = current_year or datetime.datetime.now().year
     car_age = current_year - user_data['year']
     engine_volume = user_data['engine_volume']
     engine_power = user_data.get('engine_power', 0)
-    car_price_eur = (user_data['car_price_cny'] * settings.rates.cny_to_rub) / settings.rates.eur_to_rub
+    car_price_eur = (user_data['car_price_cny'] * rates.cny_to_rub) / rates.eur_to_rub
+
+    # Таблицы ставок скомпилированы заранее (при загрузке/сохранении настроек)
+    tariffs = get_tariff_tables(settings)
 
     # --- 1. Расчет пошлины ---
     duty_eur = 0.0
-    duty_rate_map = {}
-    if car_age < 3:
+    age_category = tariffs.duty_category(car_age)
+    if age_category == DUTY_AGE_UNDER_3:
         # Для авто до 3 лет: % от стоимости, но не менее €/см3
         # TODO: Вынести 0.48 и 2.5 в конфиг
         duty_from_price = car_price_eur * 0.48
         duty_from_volume = 2.5 * engine_volume
         duty_eur = max(duty_from_price, duty_from_volume)
     else:
-        if 3 <= car_age <= 5:
-            duty_rate_map = settings.customs.duty.age_3_5_years
-        else: # Старше 5 лет
-            duty_rate_map = settings.customs.duty.age_older_5_years
-        
-        # Находим подходящую ставку из словаря
-        # ИСПРАВЛЕНИЕ: Преобразуем ключ (max_volume) в int для корректного сравнения
-        for max_volume_str, rate in sorted(duty_rate_map.items(), key=lambda item: int(item[0])):
-            if engine_volume <= int(max_volume_str):
-                duty_eur = rate * engine_volume
-                break
+        # Находим подходящую ставку бинарным поиском по границам объема
+        rate = tariffs.duty_by_age[age_category].rate_for(engine_volume)
+        if rate is not None:
+            duty_eur = rate * engine_volume
     
-    customs_result.duty_rub = duty_eur * settings.rates.eur_to_rub
+    customs_result.duty_rub = duty_eur * rates.eur_to_rub
 
     # --- 2. Таможенный сбор ---
     customs_result.customs_fee_rub = settings.customs.base_customs_fee_rub
     
     # --- 3. Утилизационный сбор (базовые ставки для физлиц) ---
-    if car_age <= 3:
-        customs_result.recycling_fee_rub = settings.customs.recycling.under_3_years
-    else:
-        customs_result.recycling_fee_rub = settings.customs.recycling.over_3_years
+    customs_result.recycling_fee_rub = tariffs.recycling_fee(car_age)
         
     # --- 4. Итого таможенные платежи ---
     customs_result.total_customs_rub = (
@@ -75,18 +80,25 @@ def _calculate_customs_for_individual(user_data: dict, settings: Settings) -> Cu
     
     return customs_result
 
-def calculate_total_cost(user_data: dict, settings: Settings) -> CalculationResult:
+def calculate_total_cost(user_data: dict, settings: Settings, as_of: datetime.date | None = None) -> CalculationResult:
     """
     Выполняет расчет итоговой стоимости автомобиля.
     
     :param user_data: Словарь с данными, собранными от пользователя.
     :param settings: Объект с текущими настройками (курсы, комиссии).
+    :param as_of: Дата, по курсам ЦБ на которую нужно считать (по умолчанию - текущие курсы).
+                  Возраст авто при этом тоже считается на эту дату.
     :return: Объект с детализированным результатом расчета.
     """
     result = CalculationResult()
+    rates = settings.rates
+    if as_of is not None:
+        rates = rate_history.rates_on(as_of)
+        if rates is None:
+            raise ValueError(f"Нет сохраненных курсов на {as_of:%d.%m.%Y}.")
     
     # 1. Стоимость авто в рублях
-    result.car_price_rub = user_data['car_price_cny'] * settings.rates.cny_to_rub
+    result.car_price_rub = user_data['car_price_cny'] * rates.cny_to_rub
     
     # 2. Комиссия банка
     result.bank_commission_rub = result.car_price_rub * settings.fees.bank_commission_percent
@@ -99,7 +111,9 @@ def calculate_total_cost(user_data: dict, settings: Settings) -> CalculationResu
     
     # 5. Расчет таможенных платежей
     if user_data['payer_type'] == 'Физическое лицо':
-        result.customs = _calculate_customs_for_individual(user_data, settings)
+        result.customs = _calculate_customs_for_individual(
+            user_data, settings, rates, current_year=as_of.year if as_of is not None else None
+        )
     else:
         # TODO: Добавить логику для юридических лиц
         pass
@@ -142,4 +156,132 @@ def format_result_for_user(result: CalculationResult) -> str:
         "🚧 <i>Расчет поможет вам ориентироваться в ценах, но не забывайте об актуальности курсов валют на день покупки. "
         "Уточнить таможенные платежи можете на сайте <a href=\"https://www.tks.ru/auto/calc/\">tks.ru</a></i>"
     )
-    return text
\ No newline at end of file
+    return text
+
+# --- Пакетный расчет (прайс-листы дилеров) ---
+
+@dataclass
+class BatchCalculationResult:
+    """Результаты пакетного расчета: по одному массиву на каждое поле CalculationResult."""
+    car_price_rub: np.ndarray
+    bank_commission_rub: np.ndarray
+    company_commission_rub: np.ndarray
+    china_expenses_rub: np.ndarray
+    duty_rub: np.ndarray
+    customs_fee_rub: np.ndarray
+    recycling_fee_rub: np.ndarray
+    total_customs_rub: np.ndarray
+    total_cost_rub: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.total_cost_rub)
+
+    def to_results(self) -> list[CalculationResult]:
+        """Преобразует массивы в список обычных CalculationResult."""
+        return [
+            CalculationResult(
+                car_price_rub=float(self.car_price_rub[i]),
+                bank_commission_rub=float(self.bank_commission_rub[i]),
+                company_commission_rub=float(self.company_commission_rub[i]),
+                china_expenses_rub=float(self.china_expenses_rub[i]),
+                customs=CustomsResult(
+                    duty_rub=float(self.duty_rub[i]),
+                    customs_fee_rub=float(self.customs_fee_rub[i]),
+                    recycling_fee_rub=float(self.recycling_fee_rub[i]),
+                    total_customs_rub=float(self.total_customs_rub[i]),
+                ),
+                total_cost_rub=float(self.total_cost_rub[i]),
+            )
+            for i in range(len(self))
+        ]
+
+
+def calculate_total_cost_batch(
+    price_cny,
+    year,
+    engine_volume,
+    fuel_type,
+    payer_type,
+    settings: Settings,
+) -> BatchCalculationResult:
+    """
+    Векторизованный расчет стоимости для списка автомобилей.
+    Принимает колонки одинаковой длины и повторяет calculate_total_cost()
+    операция в операцию, поэтому результаты совпадают с поштучным расчетом.
+    """
+    price_cny = np.asarray(price_cny, dtype=np.float64)
+    year = np.asarray(year, dtype=np.int64)
+    engine_volume = np.asarray(engine_volume, dtype=np.float64)
+    fuel_type = np.asarray(fuel_type, dtype=object)
+    payer_type = np.asarray(payer_type, dtype=object)
+    size = len(price_cny)
+    if not (len(year) == len(engine_volume) == len(fuel_type) == len(payer_type) == size):
+        raise ValueError("Все колонки должны быть одинаковой длины.")
+
+    rates = settings.rates
+    fees = settings.fees
+
+    # Для электромобилей объем не запрашивается и считается нулевым (как в диалоге)
+    engine_volume = np.where(fuel_type == "Электро", 0.0, engine_volume)
+
+    # 1-4. Платежи по инвойсу
+    car_price_rub = price_cny * rates.cny_to_rub
+    bank_commission_rub = car_price_rub * fees.bank_commission_percent
+    company_commission_rub = np.full(size, fees.company_commission_rub, dtype=np.float64)
+    china_expenses_rub = np.full(size, fees.china_expenses_rub, dtype=np.float64)
+
+    # 5. Таможенные платежи (только для физлиц)
+    tariffs = get_tariff_tables(settings)
+    car_age = datetime.datetime.now().year - year
+    car_price_eur = (price_cny * rates.cny_to_rub) / rates.eur_to_rub
+    age_category = np.searchsorted(DUTY_AGE_BOUNDS, car_age, side="left")
+
+    duty_eur = np.zeros(size, dtype=np.float64)
+    under_3 = age_category == DUTY_AGE_UNDER_3
+    duty_eur[under_3] = np.maximum(car_price_eur[under_3] * 0.48, 2.5 * engine_volume[under_3])
+    for category, table in enumerate(tariffs.duty_by_age):
+        if table is None or not table.max_volumes:
+            continue
+        mask = age_category == category
+        if not mask.any():
+            continue
+        volumes = engine_volume[mask]
+        index = np.searchsorted(np.asarray(table.max_volumes), volumes, side="left")
+        found = index < len(table.rates)
+        rate = np.asarray(table.rates, dtype=np.float64)[np.minimum(index, len(table.rates) - 1)]
+        duty_eur[mask] = np.where(found, rate * volumes, 0.0)
+
+    recycling_fee_rub = np.asarray(tariffs.recycling_by_age, dtype=np.float64)[
+        np.searchsorted(RECYCLING_AGE_BOUNDS, car_age, side="left")
+    ]
+    duty_rub = duty_eur * rates.eur_to_rub
+    customs_fee_rub = np.full(size, settings.customs.base_customs_fee_rub, dtype=np.float64)
+
+    individual = payer_type == 'Физическое лицо'
+    duty_rub = np.where(individual, duty_rub, 0.0)
+    customs_fee_rub = np.where(individual, customs_fee_rub, 0.0)
+    recycling_fee_rub = np.where(individual, recycling_fee_rub, 0.0)
+    total_customs_rub = np.where(
+        individual, duty_rub + customs_fee_rub + recycling_fee_rub, 0.0
+    )
+
+    # 6. Итоговая сумма (в том же порядке сложения, что и в calculate_total_cost)
+    total_cost_rub = (
+        car_price_rub +
+        bank_commission_rub +
+        company_commission_rub +
+        china_expenses_rub +
+        total_customs_rub
+    )
+
+    return BatchCalculationResult(
+        car_price_rub=car_price_rub,
+        bank_commission_rub=bank_commission_rub,
+        company_commission_rub=company_commission_rub,
+        china_expenses_rub=china_expenses_rub,
+        duty_rub=duty_rub,
+        customs_fee_rub=customs_fee_rub,
+        recycling_fee_rub=recycling_fee_rub,
+        total_customs_rub=total_customs_rub,
+        total_cost_rub=total_cost_rub,
+    )
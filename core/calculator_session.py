@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+
+# Порядок важен: в хранилище FSM топливо записывается номером в этом списке
+FUEL_TYPES = ("Бензин", "Дизель", "Гибрид", "Электро")
+ELECTRIC = "Электро"
+
+# Короткие ключи данных диалога в хранилище FSM
+_PACKED_KEYS = {"car_price_cny": "p", "year": "y", "fuel_type": "f", "engine_volume": "v"}
+# Параметры, которые бот не спрашивает, а подставляет сам
+DEFAULT_PAYER_TYPE = "Физическое лицо"
+DEFAULT_BODY_TYPE = "Легковой"
+
+
+def pack_session(**fields) -> dict:
+    """
+    Компактное представление ответов для state.update_data(): короткие ключи
+    и номер типа топлива вместо строки. Постоянные параметры не хранятся.
+    """
+    packed = {}
+    for name, value in fields.items():
+        if name == "fuel_type":
+            value = FUEL_TYPES.index(value)
+        packed[_PACKED_KEYS[name]] = value
+    return packed
+
+
+@dataclass(slots=True)
+class CalculatorSession:
+    """Ответы пользователя в диалоге калькулятора."""
+    car_price_cny: float
+    year: int
+    fuel_type: str
+    engine_volume: int = 0
+
+    @classmethod
+    def unpack(cls, data: dict) -> "CalculatorSession | None":
+        """Восстанавливает ответы из данных FSM. None - если диалог заполнен не до конца."""
+        try:
+            return cls(
+                car_price_cny=data["p"],
+                year=data["y"],
+                fuel_type=FUEL_TYPES[data["f"]],
+                engine_volume=data.get("v", 0),
+            )
+        except (KeyError, IndexError, TypeError):
+            return None
+
+    def as_user_data(self) -> dict:
+        """Параметры в том виде, в котором их принимает калькулятор и журнал расчетов."""
+        return {
+            "payer_type": DEFAULT_PAYER_TYPE,
+            "car_price_cny": self.car_price_cny,
+            "year": self.year,
+            "car_body_type": DEFAULT_BODY_TYPE,
+            "fuel_type": self.fuel_type,
+            "engine_volume": self.engine_volume,
+            # Мощность не запрашиваем
+            "engine_power": 0,
+        }
@@ -83,9 +83,79 @@ class Settings:
     fees: Fees = field(default_factory=Fees)
     customs: CustomsFees = field(default_factory=CustomsFees)
 
+# --- Параметры запуска (берутся только из окружения и не сохраняются в settings.json) ---
+
+@dataclass
+class WebConfig:
+    """Настройки встроенного веб-сервера и режима получения обновлений."""
+    # "polling" - long polling, "webhook" - обновления приходят на веб-сервер
+    mode: str = field(default_factory=lambda: os.getenv("BOT_MODE", "polling").strip().lower())
+    host: str = field(default_factory=lambda: os.getenv("WEB_HOST", "0.0.0.0"))
+    # Порт для хостингов типа Replit/Render обычно берется из переменной окружения
+    port: int = field(default_factory=lambda: int(os.getenv("PORT", "8080")))
+    # Публичный адрес сервера, например https://my-bot.onrender.com
+    webhook_base_url: str = field(default_factory=lambda: os.getenv("WEBHOOK_URL", "").rstrip("/"))
+    webhook_path: str = field(default_factory=lambda: os.getenv("WEBHOOK_PATH", "/webhook"))
+    # Секрет для заголовка X-Telegram-Bot-Api-Secret-Token
+    webhook_secret: str = field(default_factory=lambda: os.getenv("WEBHOOK_SECRET", ""))
+    # Токен для /metrics (заголовок Authorization: Bearer <токен>); пустой - маршрут отключен
+    metrics_token: str = field(default_factory=lambda: os.getenv("METRICS_TOKEN", ""))
+
+    @property
+    def use_webhook(self) -> bool:
+        return self.mode == "webhook"
+
+    @property
+    def webhook_url(self) -> str:
+        return f"{self.webhook_base_url}{self.webhook_path}"
+
+@dataclass
+class StorageConfig:
+    """Настройки постоянных хранилищ."""
+    # "sqlite" - состояния диалогов переживают перезапуск, "memory" - хранятся только в памяти
+    fsm_backend: str = field(default_factory=lambda: os.getenv("FSM_STORAGE", "sqlite").strip().lower())
+    fsm_db_path: str = field(default_factory=lambda: os.getenv("FSM_DB_PATH", "fsm.sqlite3"))
+    # Через сколько секунд бездействия незавершенный диалог считается брошенным
+    fsm_ttl_seconds: float = field(default_factory=lambda: float(os.getenv("FSM_STATE_TTL", "86400")))
+    fsm_compaction_interval: float = 600.0
+    # База заявок и выполненных расчетов
+    leads_db_path: str = field(default_factory=lambda: os.getenv("LEADS_DB_PATH", "leads.sqlite3"))
+    # Пользователи бота и рассылки
+    users_db_path: str = field(default_factory=lambda: os.getenv("USERS_DB_PATH", "users.sqlite3"))
+    # Агрегированная статистика использования
+    analytics_db_path: str = field(default_factory=lambda: os.getenv("ANALYTICS_DB_PATH", "analytics.sqlite3"))
+    # Файл с историей дневных курсов ЦБ
+    rates_history_path: str = field(default_factory=lambda: os.getenv("RATES_HISTORY_PATH", "rates_history.bin"))
+
+@dataclass
+class ProfilingConfig:
+    """Профилирование обработчиков (включается и командой /profile start)."""
+    # Включить профилирование сразу при запуске
+    enabled: bool = field(default_factory=lambda: os.getenv("PROFILE_HANDLERS", "").strip().lower() in ("1", "true", "yes"))
+    # Сколько строк выводить в отчете
+    top_n: int = field(default_factory=lambda: int(os.getenv("PROFILE_TOP", "30")))
+
+@dataclass
+class ThrottlingConfig:
+    """Ограничение частоты апдейтов от одного пользователя."""
+    # Не больше limit сообщений и нажатий кнопок за window секунд (0 - без ограничения)
+    limit: int = field(default_factory=lambda: int(os.getenv("THROTTLE_LIMIT", "12")))
+    window: float = field(default_factory=lambda: float(os.getenv("THROTTLE_WINDOW", "5")))
+    # Повторное нажатие той же кнопки в течение стольких секунд игнорируется
+    debounce: float = field(default_factory=lambda: float(os.getenv("THROTTLE_DEBOUNCE", "1")))
+
+@dataclass
+class RuntimeConfig:
+    """Объединяет параметры запуска процесса."""
+    web: WebConfig = field(default_factory=WebConfig)
+    storage: StorageConfig = field(default_factory=StorageConfig)
+    profiling: ProfilingConfig = field(default_factory=ProfilingConfig)
+    throttling: ThrottlingConfig = field(default_factory=ThrottlingConfig)
+
 # Создаем единый объект с настройками, который будем использовать в расчетах
 # В будущем эти значения будут подгружаться из базы данных или админки
 settings = Settings()
+runtime = RuntimeConfig()
 
 # Пример использования:
 # from core.config import settings
@@ -0,0 +1,92 @@
+import asyncio
+import csv
+import datetime
+import os
+import tempfile
+from typing import AsyncIterator, Callable, Iterable, Sequence
+
+from .lead_store import LEAD_STATUSES, lead_store
+
+# Excel в русской локали ожидает ";" и BOM в начале файла
+CSV_DELIMITER = ";"
+CSV_ENCODING = "utf-8-sig"
+# С этих символов Excel и LibreOffice начинают формулу
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _format_time(timestamp: float | None) -> str:
+    if timestamp is None:
+        return ""
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%d.%m.%Y %H:%M:%S")
+
+
+def _text(value):
+    """Текст от пользователя: апостроф в начале не дает табличному редактору выполнить его как формулу."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _lead_row(row: Sequence) -> list:
+    lead_id, created_at, updated_at, status, user_id, full_name, username, phone, comment, calc_id = row
+    return [lead_id, _format_time(created_at), _format_time(updated_at), LEAD_STATUSES.get(status, status),
+            user_id, _text(full_name), _text(username), _text(phone), _text(comment), calc_id]
+
+
+def _calculation_row(row: Sequence) -> list:
+    calc_id, created_at, *rest = row
+    return [calc_id, _format_time(created_at), *map(_text, rest)]
+
+
+LEADS_HEADER = ["Номер", "Создана", "Изменена", "Статус", "ID пользователя", "Имя", "Username",
+                "Телефон", "Комментарий", "Номер расчета"]
+CALCULATIONS_HEADER = ["Номер", "Дата", "ID пользователя", "Цена, ¥", "Год", "Объем", "Топливо",
+                       "Плательщик", "Итого, ₽"]
+
+
+async def write_csv(
+    path: str,
+    header: list[str],
+    pages: AsyncIterator[Iterable[Sequence]],
+    convert: Callable[[Sequence], list],
+) -> int:
+    """
+    Пишет CSV постранично: в памяти одновременно только одна страница строк,
+    а форматирование и запись на диск идут в отдельном потоке.
+    Возвращает количество записанных строк.
+    """
+    written = 0
+    f = await asyncio.to_thread(open, path, "w", newline="", encoding=CSV_ENCODING)
+    try:
+        writer = csv.writer(f, delimiter=CSV_DELIMITER)
+        await asyncio.to_thread(writer.writerow, header)
+
+        def write_page(rows) -> int:
+            writer.writerows(convert(row) for row in rows)
+            return len(rows)
+
+        async for rows in pages:
+            written += await asyncio.to_thread(write_page, rows)
+    finally:
+        await asyncio.to_thread(f.close)
+    return written
+
+
+async def _export(prefix: str, header: list[str], pages, convert) -> tuple[str, int]:
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=".csv")
+    os.close(fd)
+    try:
+        return path, await write_csv(path, header, pages, convert)
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+async def export_leads() -> tuple[str, int]:
+    """Выгружает все заявки во временный файл. Возвращает (путь, строк); файл удаляет вызывающий."""
+    return await _export("leads_", LEADS_HEADER, lead_store.iter_lead_pages(), _lead_row)
+
+
+async def export_calculations() -> tuple[str, int]:
+    """Выгружает все расчеты во временный файл. Возвращает (путь, строк); файл удаляет вызывающий."""
+    return await _export("calculations_", CALCULATIONS_HEADER, lead_store.iter_calculation_pages(), _calculation_row)
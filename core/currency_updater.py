@@ -1,45 +1,320 @@
-import aiohttp
+import asyncio
+import datetime
+import logging
+import random
+import time
 import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
 from decimal import Decimal, InvalidOperation
+from zoneinfo import ZoneInfo
+
+import aiohttp
+
+from .metrics import CURRENCY_FETCH_SECONDS
+from .rate_history import rate_history
+
+CBR_DAILY_URL = "https://www.cbr.ru/scripts/XML_daily.asp"
+CBR_DYNAMIC_URL = "https://www.cbr.ru/scripts/XML_dynamic.asp"
+# Внутренние коды валют ЦБ для запроса динамики курса
+CBR_VALUTE_IDS = {"CNY": "R01375", "EUR": "R01239"}
+# Валюты, курсы которых загружаются по умолчанию
+DEFAULT_CHAR_CODES = ("CNY", "EUR")
+# Размер куска при потоковом чтении ответа
+CHUNK_SIZE = 1024
+# ЦБ публикует курсы по московскому времени
+CBR_TIMEZONE = ZoneInfo("Europe/Moscow")
+
+# Таймауты запроса к ЦБ: медленный ответ не должен задерживать запуск бота
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 10
+TOTAL_TIMEOUT = 20
+
+# Повторные попытки с экспоненциальной задержкой и случайным разбросом
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 15.0
+
+_session: aiohttp.ClientSession | None = None
+
+
+@dataclass
+class _FeedState:
+    """Результат последней успешной загрузки курсов (для условных запросов)."""
+    etag: str | None = None
+    last_modified: str | None = None
+    published_date: datetime.date | None = None
+    rates: dict = field(default_factory=dict)
+    # Когда ЦБ последний раз подтвердил курсы (загрузка или ответ 304), time.time()
+    confirmed_at: float | None = None
+
+
+_feed_state = _FeedState()
+
+
+# --- Общая HTTP-сессия ---
+
+def _create_session() -> aiohttp.ClientSession:
+    timeout = aiohttp.ClientTimeout(total=TOTAL_TIMEOUT, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=10, ttl_dns_cache=300)
+    return aiohttp.ClientSession(timeout=timeout, connector=connector)
+
+async def init_http_session() -> aiohttp.ClientSession:
+    """Создает общую HTTP-сессию (вызывается при старте бота)."""
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+    return _session
+
+async def close_http_session():
+    """Закрывает общую HTTP-сессию (вызывается при остановке бота)."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """Возвращает общую сессию, создавая ее при первом обращении."""
+    if _session is None or _session.closed:
+        return await init_http_session()
+    return _session
+
+
+# --- Разбор ответа ЦБ ---
+
+def _parse_rate(valute: ET.Element) -> Decimal:
+    value = Decimal(valute.find('Value').text.replace(',', '.'))
+    # Курс юаня часто дается за 10 единиц, нужно разделить
+    nominal = Decimal(valute.find('Nominal').text)
+    return value / nominal
+
+class CbrDailyStreamParser:
+    """
+    Потоковый разбор XML_daily.asp.
+    Документ подается кусками через feed(); разбор прекращается, как только
+    найдены все запрошенные валюты, и дерево документа целиком не строится.
+    """
+
+    def __init__(self, char_codes=DEFAULT_CHAR_CODES):
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._wanted = set(char_codes)
+        self._root = None
+        self.published_date: datetime.date | None = None
+        self.rates: dict = {}
+
+    @property
+    def done(self) -> bool:
+        return not self._wanted
+
+    def feed(self, chunk: bytes) -> bool:
+        """Передает очередной кусок документа. Возвращает True, когда все валюты найдены."""
+        self._parser.feed(chunk)
+        return self._process_events()
+
+    def close(self) -> bool:
+        """Завершает разбор (для документа, переданного полностью)."""
+        self._parser.close()
+        return self._process_events()
+
+    def _process_events(self) -> bool:
+        for event, element in self._parser.read_events():
+            if event == "end":
+                if element.tag != "Valute":
+                    continue
+                code = element.findtext('CharCode')
+                if code in self._wanted:
+                    self.rates[code] = _parse_rate(element)
+                    self._wanted.discard(code)
+                    if not self._wanted:
+                        return True
+                # Обработанные валюты сразу удаляем, чтобы дерево не росло
+                self._root.clear()
+            elif self._root is None:
+                self._root = element
+                date_str = element.get('Date')
+                if date_str:
+                    self.published_date = datetime.datetime.strptime(date_str, "%d.%m.%Y").date()
+        return False
+
+
+def parse_cbr_daily(xml_data: bytes | str, char_codes=DEFAULT_CHAR_CODES) -> tuple[datetime.date | None, dict]:
+    """
+    Разбирает документ XML_daily.asp.
+    Возвращает дату, на которую установлены курсы, и словарь {код валюты: курс за 1 единицу}.
+    """
+    if isinstance(xml_data, str):
+        xml_data = xml_data.encode('utf-8')
+    parser = CbrDailyStreamParser(char_codes)
+    if not parser.feed(xml_data):
+        parser.close()
+    return parser.published_date, parser.rates
+
+def cbr_today() -> datetime.date:
+    """Текущая дата по Москве: с ней сравнивается дата публикации курсов ЦБ."""
+    return datetime.datetime.now(CBR_TIMEZONE).date()
+
+def _round_rate(rate: Decimal | None) -> float | None:
+    # Возвращаем курсы, округленные до 4 знаков после запятой для точности
+    return float(rate.quantize(Decimal("0.0001"))) if rate else None
+
+
+# --- Загрузка ---
+
+def _backoff_delay(attempt: int) -> float:
+    """Задержка перед повтором: экспонента с полным случайным разбросом."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+async def _download_and_parse(session: aiohttp.ClientSession, url: str, char_codes) -> CbrDailyStreamParser | None:
+    """
+    Читает документ кусками с учетом ETag/Last-Modified и разбирает его на лету.
+    Чтение прекращается, как только найдены все запрошенные валюты.
+    Возвращает парсер с результатами или None, если документ не изменился (304).
+    """
+    headers = {}
+    # Условный запрос имеет смысл, только если все нужные валюты уже есть в кэше
+    if all(code in _feed_state.rates for code in char_codes):
+        if _feed_state.etag:
+            headers["If-None-Match"] = _feed_state.etag
+        if _feed_state.last_modified:
+            headers["If-Modified-Since"] = _feed_state.last_modified
+
+    async with session.get(url, headers=headers) as response:
+        if response.status == 304:
+            return None
+        response.raise_for_status()  # Проверка на ошибки HTTP (4xx, 5xx)
+        parser = CbrDailyStreamParser(char_codes)
+        finished = False
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            if parser.feed(chunk):
+                finished = True
+                break
+        if not finished:
+            parser.close()
+        _feed_state.etag = response.headers.get("ETag")
+        _feed_state.last_modified = response.headers.get("Last-Modified")
+        return parser
+
+async def fetch_rates(char_codes=DEFAULT_CHAR_CODES, url: str = CBR_DAILY_URL, force: bool = False) -> dict:
+    """
+    Получает курсы указанных валют с сайта ЦБ РФ.
+    Если уже загружены курсы на сегодня (или на завтра), запрос не выполняется.
+    Возвращает словарь {код валюты: Decimal} (пустой при ошибке).
+    """
+    cached = _feed_state.rates
+    if (
+        not force
+        and _feed_state.published_date is not None
+        and _feed_state.published_date >= cbr_today()
+        and all(code in cached for code in char_codes)
+    ):
+        # Курсы на сегодня не меняются до следующей публикации, поэтому они по-прежнему свежие
+        _feed_state.confirmed_at = time.time()
+        logging.info(f"Курсы ЦБ на {_feed_state.published_date} уже загружены, запрос пропущен.")
+        return {code: cached[code] for code in char_codes}
+
+    session = await get_http_session()
+    started = time.perf_counter()
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            parser = await _download_and_parse(session, url, char_codes)
+            _feed_state.confirmed_at = time.time()
+            if parser is None:
+                CURRENCY_FETCH_SECONDS.observe(time.perf_counter() - started, result="not_modified")
+                logging.info("Документ ЦБ не изменился (304), используются загруженные ранее курсы.")
+                return {code: cached[code] for code in char_codes if code in cached}
+            _feed_state.published_date = parser.published_date
+            _feed_state.rates = {**cached, **parser.rates}
+            CURRENCY_FETCH_SECONDS.observe(time.perf_counter() - started, result="ok")
+            return parser.rates
+        except (ET.ParseError, InvalidOperation, AttributeError, ValueError) as e:
+            # Ошибки разбора повторять бессмысленно
+            CURRENCY_FETCH_SECONDS.observe(time.perf_counter() - started, result="error")
+            logging.error(f"Ошибка разбора курсов валют: {e}")
+            return {}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt + 1 >= MAX_ATTEMPTS:
+                CURRENCY_FETCH_SECONDS.observe(time.perf_counter() - started, result="error")
+                logging.error(f"Ошибка при получении курсов валют: {e}")
+                return {}
+            delay = _backoff_delay(attempt)
+            logging.warning(f"Ошибка при получении курсов валют: {e}. Повтор через {delay:.1f} с.")
+            await asyncio.sleep(delay)
+    return {}
+
+def get_published_date() -> datetime.date | None:
+    """Дата, на которую установлены последние загруженные курсы."""
+    return _feed_state.published_date
+
+def get_rates_age() -> float | None:
+    """Сколько секунд назад ЦБ последний раз подтвердил курсы (None - еще ни разу)."""
+    if _feed_state.confirmed_at is None:
+        return None
+    return time.time() - _feed_state.confirmed_at
+
+def parse_cbr_dynamic(xml_data: bytes | str) -> dict:
+    """Разбирает документ XML_dynamic.asp в словарь {дата: курс за 1 единицу}."""
+    root = ET.fromstring(xml_data)
+    rates = {}
+    for record in root.iter('Record'):
+        date = datetime.datetime.strptime(record.get('Date'), "%d.%m.%Y").date()
+        rates[date] = _parse_rate(record)
+    return rates
+
+async def fetch_rate_dynamics(
+    char_code: str,
+    date_from: datetime.date,
+    date_to: datetime.date,
+    url: str = CBR_DYNAMIC_URL,
+) -> dict:
+    """
+    Загружает курсы одной валюты за период одним запросом.
+    Возвращает словарь {дата: Decimal} (пустой при ошибке).
+    """
+    params = {
+        "date_req1": date_from.strftime("%d/%m/%Y"),
+        "date_req2": date_to.strftime("%d/%m/%Y"),
+        "VAL_NM_RQ": CBR_VALUTE_IDS[char_code],
+    }
+    session = await get_http_session()
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            async with session.get(url, params=params) as response:
+                response.raise_for_status()
+                return parse_cbr_dynamic(await response.read())
+        except (ET.ParseError, InvalidOperation, AttributeError, ValueError, TypeError) as e:
+            logging.error(f"Ошибка разбора динамики курса {char_code}: {e}")
+            return {}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt + 1 >= MAX_ATTEMPTS:
+                logging.error(f"Ошибка при получении динамики курса {char_code}: {e}")
+                return {}
+            await asyncio.sleep(_backoff_delay(attempt))
+    return {}
+
+async def backfill_rate_history(
+    date_from: datetime.date,
+    date_to: datetime.date,
+    url: str = CBR_DYNAMIC_URL,
+) -> int:
+    """
+    Загружает историю курсов CNY и EUR за период в хранилище rate_history.
+    Возвращает количество добавленных дат.
+    """
+    cny_rates, eur_rates = await asyncio.gather(
+        fetch_rate_dynamics("CNY", date_from, date_to, url=url),
+        fetch_rate_dynamics("EUR", date_from, date_to, url=url),
+    )
+    rows = [
+        (date, _round_rate(cny_rates[date]), _round_rate(eur_rates[date]))
+        for date in sorted(cny_rates.keys() & eur_rates.keys())
+    ]
+    if not rows:
+        return 0
+    return await asyncio.to_thread(rate_history.add_many, rows)
 
-async def fetch_currency_rates():
+async def fetch_currency_rates(url: str = CBR_DAILY_URL):
     """
     Получает актуальные курсы валют (CNY, EUR) с сайта ЦБ РФ.
     Возвращает кортеж (cny_rate, eur_rate) или (None, None) в случае ошибки.
     """
-    url = "https://www.cbr.ru/scripts/XML_daily.asp"
-    cny_rate = None
-    eur_rate = None
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                response.raise_for_status()  # Проверка на ошибки HTTP (4xx, 5xx)
-                xml_text = await response.text()
-                
-                root = ET.fromstring(xml_text)
-                
-                # Ищем валюты по их кодам: R01375 для CNY, R01239 для EUR
-                cny_element = root.find(".//Valute[CharCode='CNY']")
-                eur_element = root.find(".//Valute[CharCode='EUR']")
-                
-                if cny_element is not None:
-                    value_str = cny_element.find('Value').text.replace(',', '.')
-                    # Курс юаня часто дается за 10 единиц, нужно разделить
-                    nominal_str = cny_element.find('Nominal').text
-                    cny_rate = Decimal(value_str) / Decimal(nominal_str)
-
-                if eur_element is not None:
-                    value_str = eur_element.find('Value').text.replace(',', '.')
-                    eur_rate = Decimal(value_str)
-
-                # Возвращаем курсы, округленные до 4 знаков после запятой для точности
-                return (
-                    float(cny_rate.quantize(Decimal("0.0001"))) if cny_rate else None,
-                    float(eur_rate.quantize(Decimal("0.0001"))) if eur_rate else None
-                )
-
-    except (aiohttp.ClientError, ET.ParseError, InvalidOperation, AttributeError) as e:
-        # Логирование ошибки было бы здесь очень кстати
-        print(f"Ошибка при получении курсов валют: {e}")
-        return None, None 
\ No newline at end of file
+    rates = await fetch_rates(("CNY", "EUR"), url=url)
+    return _round_rate(rates.get("CNY")), _round_rate(rates.get("EUR"))
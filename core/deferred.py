@@ -0,0 +1,45 @@
+import datetime
+import logging
+from typing import Any
+
+from aiogram import Bot
+from apscheduler.jobstores.base import JobLookupError
+
+from .scheduler import scheduler
+
+
+def _job_id(key: str) -> str:
+    return f"deferred:{key}"
+
+
+async def _send_deferred(bot: Bot, chat_id: int, text: str, kwargs: dict):
+    try:
+        await bot.send_message(chat_id, text, **kwargs)
+    except Exception as e:
+        logging.warning(f"Не удалось отправить отложенное сообщение в чат {chat_id}: {e}")
+
+
+def schedule_message(bot: Bot, key: str, chat_id: int, text: str, delay: float, **kwargs: Any):
+    """
+    Отправляет сообщение через delay секунд по таймеру планировщика.
+    Повторный вызов с тем же key заменяет ранее запланированное сообщение.
+    """
+    run_date = datetime.datetime.now(scheduler.timezone) + datetime.timedelta(seconds=delay)
+    scheduler.add_job(
+        _send_deferred,
+        'date',
+        run_date=run_date,
+        id=_job_id(key),
+        replace_existing=True,
+        misfire_grace_time=30,
+        args=[bot, chat_id, text, kwargs],
+    )
+
+
+def cancel_message(key: str) -> bool:
+    """Отменяет запланированное сообщение. Возвращает True, если оно еще не было отправлено."""
+    try:
+        scheduler.remove_job(_job_id(key))
+        return True
+    except JobLookupError:
+        return False
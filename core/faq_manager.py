@@ -1,21 +1,132 @@
 import json
 import os
+import threading
+import time
 
 FAQ_FILE = 'faq.json'
 
-def load_faq_data():
-    """Загружает данные из faq.json"""
-    if not os.path.exists(FAQ_FILE):
+# Как часто (в секундах) проверять mtime/size файла на диске.
+# Между проверками чтения обслуживаются только из памяти, без системных вызовов.
+FAQ_STAT_INTERVAL = 2.0
+
+
+def _read_faq_file(path: str) -> dict:
+    """Читает и разбирает faq.json. При ошибке возвращает пустой словарь."""
+    if not os.path.exists(path):
         return {}
     try:
-        with open(FAQ_FILE, 'r', encoding='utf-8') as f:
+        with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except (json.JSONDecodeError):
         # В случае ошибки чтения файла (например, он пустой или поврежден)
         # возвращаем пустой словарь, чтобы избежать падения бота.
         return {}
 
+
+class FaqStore:
+    """
+    Процессный кэш FAQ.
+    Файл читается один раз, дальше данные отдаются из памяти. Кэш сбрасывается,
+    когда FAQ сохраняется через `save()` или когда у файла меняются mtime/size.
+    """
+
+    def __init__(self, path: str = FAQ_FILE, stat_interval: float = FAQ_STAT_INTERVAL):
+        self.path = path
+        self.stat_interval = stat_interval
+        self._data: dict | None = None
+        self._signature = None
+        self._next_stat_check = 0.0
+        self._lock = threading.Lock()
+        # Версия содержимого: увеличивается при каждой перезагрузке/сохранении
+        self.version = 0
+        # Счетчики для мониторинга
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _file_signature(self):
+        """Возвращает (mtime_ns, size) файла или None, если файла нет."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _is_stale(self) -> bool:
+        """Проверяет, изменился ли файл на диске (не чаще раза в stat_interval)."""
+        now = time.monotonic()
+        if now < self._next_stat_check:
+            return False
+        self._next_stat_check = now + self.stat_interval
+        return self._file_signature() != self._signature
+
+    def _reload(self):
+        signature = self._file_signature()
+        self._data = _read_faq_file(self.path)
+        self._signature = signature
+        self._next_stat_check = time.monotonic() + self.stat_interval
+        self.version += 1
+        self.reloads += 1
+
+    def get_all(self) -> dict:
+        """
+        Возвращает словарь FAQ из памяти.
+        ВНИМАНИЕ: это общий объект кэша, изменять его напрямую нельзя.
+        """
+        data = self._data
+        if data is not None and not self._is_stale():
+            self.hits += 1
+            return data
+        with self._lock:
+            if self._data is None or self._signature != self._file_signature():
+                self.misses += 1
+                self._reload()
+            else:
+                self.hits += 1
+            return self._data
+
+    def get(self, key: str) -> dict | None:
+        """Возвращает одну запись FAQ по ключу или None."""
+        return self.get_all().get(key)
+
+    def save(self, data: dict):
+        """Сохраняет FAQ в файл и сразу обновляет кэш."""
+        with self._lock:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+            # Храним собственную копию, чтобы внешние изменения словаря не попадали в кэш
+            self._data = dict(data)
+            self._signature = self._file_signature()
+            self._next_stat_check = time.monotonic() + self.stat_interval
+            self.version += 1
+
+    def invalidate(self):
+        """Принудительно сбрасывает кэш: следующее чтение перечитает файл."""
+        with self._lock:
+            self._data = None
+            self._signature = None
+
+    def stats(self) -> dict:
+        """Возвращает счетчики попаданий/промахов/перезагрузок кэша."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "version": self.version,
+            "items": len(self._data) if self._data is not None else 0,
+        }
+
+
+# Единый экземпляр хранилища на процесс
+faq_store = FaqStore()
+
+
+def load_faq_data():
+    """Возвращает данные FAQ из кэша (копию верхнего уровня, ее можно изменять)."""
+    return dict(faq_store.get_all())
+
 def save_faq_data(data):
-    """Сохраняет данные в faq.json"""
-    with open(FAQ_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4) 
\ No newline at end of file
+    """Сохраняет данные в faq.json и обновляет кэш"""
+    faq_store.save(data)
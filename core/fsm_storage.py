@@ -0,0 +1,170 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from core.config import runtime
+from core.sqlite_db import SQLiteDatabase
+
+FSM_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fsm_updated_at ON fsm (updated_at);
+"""
+
+
+def _build_key(key: StorageKey) -> str:
+    """Преобразует StorageKey в строковый ключ записи."""
+    return f"{key.bot_id}:{key.chat_id}:{key.thread_id or ''}:{key.user_id}:{key.destiny}"
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Хранилище состояний FSM в SQLite (режим WAL).
+    Запросы выполняются вне цикла событий, неактивные диалоги старше `ttl` секунд
+    считаются истекшими и удаляются фоновой задачей уплотнения.
+    """
+
+    def __init__(self, path: str, ttl: float = 86400, compaction_interval: float = 600):
+        self.db = SQLiteDatabase(path, FSM_SCHEMA)
+        self.ttl = ttl
+        self.compaction_interval = compaction_interval
+        self._compaction_task: asyncio.Task | None = None
+
+    # --- Операции в потоке базы данных ---
+
+    def _expired_before(self) -> float:
+        return time.time() - self.ttl
+
+    def _select(self, conn: sqlite3.Connection, key: str):
+        return conn.execute(
+            "SELECT state, data FROM fsm WHERE key = ? AND updated_at >= ?",
+            (key, self._expired_before())
+        ).fetchone()
+
+    def _set_state_sync(self, conn: sqlite3.Connection, key: str, state: Optional[str]):
+        with conn:
+            conn.execute(
+                "INSERT INTO fsm (key, state, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at, "
+                # Данные истекшего диалога не должны "оживать" вместе с новым состоянием
+                "data = CASE WHEN fsm.updated_at < ? THEN '{}' ELSE fsm.data END",
+                (key, state, time.time(), self._expired_before())
+            )
+
+    def _set_data_sync(self, conn: sqlite3.Connection, key: str, payload: str):
+        with conn:
+            conn.execute(
+                "INSERT INTO fsm (key, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at, "
+                "state = CASE WHEN fsm.updated_at < ? THEN NULL ELSE fsm.state END",
+                (key, payload, time.time(), self._expired_before())
+            )
+
+    def _update_data_sync(self, conn: sqlite3.Connection, key: str, update: Dict[str, Any]) -> Dict[str, Any]:
+        # Чтение и запись в одной транзакции: один переход в поток вместо двух
+        with conn:
+            row = self._select(conn, key)
+            data = json.loads(row[1]) if row else {}
+            data.update(update)
+            self._set_data_sync(conn, key, json.dumps(data, ensure_ascii=False))
+        return data
+
+    def _compact_sync(self, conn: sqlite3.Connection) -> int:
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM fsm WHERE updated_at < ? OR (state IS NULL AND data = '{}')",
+                (self._expired_before(),)
+            )
+        # Переносим WAL в основной файл, чтобы журнал не рос бесконечно
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return cursor.rowcount
+
+    def _count_sync(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        rows = conn.execute(
+            "SELECT state, COUNT(*) FROM fsm WHERE state IS NOT NULL AND updated_at >= ? GROUP BY state",
+            (self._expired_before(),)
+        ).fetchall()
+        return dict(rows)
+
+    # --- Интерфейс BaseStorage ---
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self.db.run(self._set_state_sync, _build_key(key), _state_name(state))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        row = await self.db.run(self._select, _build_key(key))
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self.db.run(self._set_data_sync, _build_key(key), json.dumps(data, ensure_ascii=False))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        row = await self.db.run(self._select, _build_key(key))
+        return json.loads(row[1]) if row else {}
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        new_data = await self.db.run(self._update_data_sync, _build_key(key), data)
+        return new_data.copy()
+
+    async def close(self) -> None:
+        if self._compaction_task:
+            self._compaction_task.cancel()
+            self._compaction_task = None
+        await self.db.close()
+
+    # --- Обслуживание ---
+
+    async def compact(self) -> int:
+        """Удаляет истекшие и пустые записи. Возвращает количество удаленных строк."""
+        return await self.db.run(self._compact_sync)
+
+    async def count_states(self) -> Dict[str, int]:
+        """Возвращает количество активных диалогов по каждому состоянию."""
+        return await self.db.run(self._count_sync)
+
+    async def _compaction_loop(self):
+        while True:
+            try:
+                removed = await self.compact()
+                if removed:
+                    logging.info(f"FSM: удалено устаревших состояний: {removed}")
+            except Exception as e:
+                logging.error(f"Ошибка при уплотнении хранилища FSM: {e}")
+            await asyncio.sleep(self.compaction_interval)
+
+    def start_compaction(self):
+        """Запускает фоновую задачу уплотнения (вызывается при старте бота)."""
+        if self._compaction_task is None:
+            self._compaction_task = asyncio.create_task(self._compaction_loop())
+
+
+def create_fsm_storage() -> BaseStorage:
+    """
+    Создает хранилище FSM согласно настройке FSM_STORAGE.
+    Поддерживаются "sqlite" (по умолчанию) и "memory".
+    """
+    storage_config = runtime.storage
+    if storage_config.fsm_backend == "memory":
+        return MemoryStorage()
+    if storage_config.fsm_backend == "sqlite":
+        return SQLiteStorage(
+            storage_config.fsm_db_path,
+            ttl=storage_config.fsm_ttl_seconds,
+            compaction_interval=storage_config.fsm_compaction_interval,
+        )
+    raise ValueError(f"Неизвестный тип хранилища FSM: {storage_config.fsm_backend}")
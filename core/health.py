@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from .config import runtime
+from .currency_updater import get_rates_age
+from .notifier import notifier
+
+# Polling считается остановившимся, если getUpdates не завершался столько секунд
+# (long polling сам по себе возвращается не реже раза в 10 секунд)
+POLLING_STALE_AFTER = 120.0
+# Курсы старше этого - предупреждение (бот продолжает считать по последним известным)
+RATES_STALE_AFTER = 3 * 86400
+# Доля заполнения очереди уведомлений, после которой сервис считается неготовым
+BACKLOG_FAIL_RATIO = 0.9
+STORAGE_PROBE_INTERVAL = 30.0
+
+
+class HealthMonitor:
+    """
+    Состояние процесса для /healthz и /readyz.
+    Проверки читают только уже известные значения: время последнего апдейта и
+    опроса Telegram отмечают middleware и сессия, запись на диск проверяет фоновая
+    задача, поэтому частые запросы проверок не создают нагрузки.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.last_update_at: float | None = None
+        self.last_poll_at: float | None = None
+        self.storage_ok: bool | None = None
+        self.storage_error: str | None = None
+        self.storage_checked_at: float | None = None
+        self._probe_task: asyncio.Task | None = None
+
+    def mark_update(self):
+        self.last_update_at = time.time()
+
+    def mark_poll(self):
+        self.last_poll_at = time.time()
+
+    # --- Проверка записи на диск ---
+
+    @staticmethod
+    def storage_directories() -> list[str]:
+        storage = runtime.storage
+        paths = [
+            storage.fsm_db_path, storage.leads_db_path, storage.users_db_path,
+            storage.analytics_db_path, storage.rates_history_path, "settings.json",
+        ]
+        return sorted({os.path.dirname(os.path.abspath(path)) for path in paths})
+
+    @classmethod
+    def _probe_storage_sync(cls):
+        for directory in cls.storage_directories():
+            fd, path = tempfile.mkstemp(prefix=".health_", dir=directory)
+            try:
+                os.write(fd, b"ok")
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+                os.remove(path)
+
+    async def probe_storage(self):
+        try:
+            await asyncio.to_thread(self._probe_storage_sync)
+            self.storage_ok, self.storage_error = True, None
+        except OSError as e:
+            if self.storage_ok is not False:
+                logging.error(f"Хранилище недоступно для записи: {e}")
+            self.storage_ok, self.storage_error = False, str(e)
+        self.storage_checked_at = time.time()
+
+    async def _probe_loop(self):
+        while True:
+            await self.probe_storage()
+            await asyncio.sleep(STORAGE_PROBE_INTERVAL)
+
+    def start(self):
+        if self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop(), name="health-storage-probe")
+
+    async def stop(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+
+    # --- Отчет ---
+
+    @staticmethod
+    def _age(timestamp: float | None, now: float) -> float | None:
+        return round(now - timestamp, 1) if timestamp is not None else None
+
+    def readiness(self) -> tuple[bool, dict]:
+        """Возвращает (готов ли сервис, подробности по каждой проверке)."""
+        now = time.time()
+        checks = {}
+
+        if runtime.web.use_webhook:
+            # В режиме вебхука Telegram сам доставляет апдейты - опрашивать нечего
+            checks["updates"] = {"status": "ok", "mode": "webhook"}
+        else:
+            poll_age = self._age(self.last_poll_at, now)
+            ok = poll_age is not None and poll_age < POLLING_STALE_AFTER
+            checks["updates"] = {"status": "ok" if ok else "fail", "mode": "polling", "last_poll_age": poll_age}
+        checks["updates"]["last_update_age"] = self._age(self.last_update_at, now)
+
+        rates_age = get_rates_age()
+        checks["rates"] = {
+            "status": "ok" if rates_age is not None and rates_age < RATES_STALE_AFTER else "warn",
+            "age": round(rates_age, 1) if rates_age is not None else None,
+        }
+
+        if self.storage_ok is None:
+            # Первая фоновая проверка еще идет: это не повод снимать только что запущенный сервис
+            checks["storage"] = {"status": "pending"}
+        else:
+            checks["storage"] = {
+                "status": "ok" if self.storage_ok else "fail",
+                "checked_age": self._age(self.storage_checked_at, now),
+            }
+            if self.storage_error:
+                checks["storage"]["error"] = self.storage_error
+
+        backlog = notifier.backlog
+        checks["notifications"] = {
+            "status": "fail" if backlog >= notifier.queue_size * BACKLOG_FAIL_RATIO else "ok",
+            "backlog": backlog,
+        }
+
+        ready = all(check["status"] != "fail" for check in checks.values())
+        return ready, {"status": "ok" if ready else "fail", "uptime": round(now - self.started_at, 1), "checks": checks}
+
+
+health = HealthMonitor()
@@ -0,0 +1,348 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from .config import runtime
+from .sqlite_db import SQLiteDatabase
+
+LEADS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calculations (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    car_price_cny REAL,
+    year INTEGER,
+    engine_volume REAL,
+    fuel_type TEXT,
+    payer_type TEXT,
+    total_rub REAL
+);
+CREATE INDEX IF NOT EXISTS calculations_user ON calculations (user_id, created_at);
+CREATE INDEX IF NOT EXISTS calculations_created ON calculations (created_at);
+
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    full_name TEXT,
+    username TEXT,
+    phone TEXT NOT NULL,
+    comment TEXT,
+    calculation_id INTEGER REFERENCES calculations (id),
+    status TEXT NOT NULL DEFAULT 'new',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leads_status ON leads (status, created_at);
+CREATE INDEX IF NOT EXISTS leads_created ON leads (created_at);
+CREATE INDEX IF NOT EXISTS leads_user ON leads (user_id, created_at);
+"""
+
+# Статусы заявки и их названия для менеджеров
+LEAD_STATUSES = {
+    "new": "🆕 Новая",
+    "in_progress": "⏳ В работе",
+    "done": "✅ Выполнена",
+    "archived": "🗄 В архиве",
+}
+
+# Расчет считается "предшествующим" заявке, если сделан не раньше чем за столько секунд
+CALCULATION_LINK_WINDOW = 24 * 3600
+# Сколько строк читать из базы за один запрос при выгрузке
+EXPORT_PAGE_SIZE = 1000
+# Как долго писатель копит записи перед сбросом в базу и сколько берет за раз
+WRITE_BATCH_DELAY = 0.05
+WRITE_BATCH_SIZE = 500
+# Пауза перед повтором записи, если база была недоступна
+WRITE_RETRY_DELAY = 1.0
+
+
+@dataclass
+class Lead:
+    id: int
+    user_id: int
+    full_name: str | None
+    username: str | None
+    phone: str
+    comment: str | None
+    status: str
+    created_at: float
+    updated_at: float
+    calculation: dict | None = None
+
+    @property
+    def status_title(self) -> str:
+        return LEAD_STATUSES.get(self.status, self.status)
+
+
+LEAD_COLUMNS = "id, user_id, full_name, username, phone, comment, status, created_at, updated_at"
+
+
+def _lead_from_row(row) -> Lead:
+    return Lead(*row)
+
+
+class LeadStore:
+    """
+    Постоянное хранилище заявок и расчетов в SQLite.
+    Записи копятся в очереди и сбрасываются в базу пачками одной транзакцией
+    фоновым писателем. Номер заявки присваивает сама база при вставке, поэтому
+    номера не пересекаются, даже если с файлом работает несколько процессов.
+    """
+
+    def __init__(self, path: str):
+        self.db = SQLiteDatabase(path, LEADS_SCHEMA)
+        # Запись: функция, ее аргументы и future для результата (если его ждут)
+        self._pending: list[tuple[Callable, tuple, asyncio.Future | None]] = []
+        self._wakeup = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._writer_task: asyncio.Task | None = None
+
+    async def open(self):
+        """Открывает базу и запускает фонового писателя."""
+        await self.db.open()
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer(), name="lead-store-writer")
+
+    async def close(self):
+        """Записывает накопленное и закрывает базу."""
+        await self.flush()
+        if self._pending:
+            logging.error(f"База заявок закрывается, не записано {len(self._pending)} записей")
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+            self._writer_task = None
+        await self.db.close()
+
+    # --- Пакетная запись ---
+
+    def _enqueue(self, fn: Callable, *args: Any, future: asyncio.Future | None = None):
+        if self._writer_task is None:
+            raise RuntimeError("Хранилище заявок не открыто: сначала вызовите open()")
+        self._pending.append((fn, args, future))
+        self._wakeup.set()
+
+    @staticmethod
+    def _write_batch(conn: sqlite3.Connection, batch: list[tuple[Callable, tuple, asyncio.Future | None]]) -> list:
+        with conn:
+            return [fn(conn, *args) for fn, args, _ in batch]
+
+    async def _writer(self):
+        while True:
+            await self._wakeup.wait()
+            # Короткая пауза, чтобы одновременные записи попали в одну транзакцию
+            if len(self._pending) < WRITE_BATCH_SIZE:
+                await asyncio.sleep(WRITE_BATCH_DELAY)
+            if not await self._write_pending():
+                # База временно недоступна: повторим позже, а не в плотном цикле
+                await asyncio.sleep(WRITE_RETRY_DELAY)
+
+    async def _write_pending(self) -> bool:
+        """
+        Записывает накопленное на момент вызова. Возвращает False, если часть записей
+        пришлось оставить в очереди до следующей попытки.
+        """
+        # Блокировка нужна, чтобы flush() дождался и пачки, которая уже пишется
+        async with self._write_lock:
+            self._wakeup.clear()
+            pending, self._pending = self._pending, []
+            retry = []
+            for start in range(0, len(pending), WRITE_BATCH_SIZE):
+                batch = pending[start:start + WRITE_BATCH_SIZE]
+                try:
+                    results = await self.db.run(self._write_batch, batch)
+                except Exception as e:
+                    # Одна плохая запись не должна терять всю пачку: пишем по одной
+                    logging.warning(f"Ошибка записи пачки в базу заявок ({len(batch)} записей), пишем по одной: {e}")
+                    retry += await self._write_one_by_one(batch)
+                    continue
+                for (_, _, future), result in zip(batch, results):
+                    if future is not None and not future.done():
+                        future.set_result(result)
+            if retry:
+                # Возвращаем в начало очереди, чтобы сохранить порядок записей
+                self._pending[:0] = retry
+                self._wakeup.set()
+            return not retry
+
+    async def _write_one_by_one(self, batch: list[tuple[Callable, tuple, asyncio.Future | None]]) -> list:
+        """Пишет записи по отдельности. Возвращает те, что стоит повторить позже."""
+        retry = []
+        for item in batch:
+            future = item[2]
+            try:
+                result = (await self.db.run(self._write_batch, [item]))[0]
+            except sqlite3.OperationalError as e:
+                # Блокировка базы, нехватка места и т.п. - запись не теряем
+                logging.error(f"База заявок недоступна, запись будет повторена: {e}")
+                retry.append(item)
+                continue
+            except Exception as e:
+                logging.error(f"Запись в базу заявок отклонена и потеряна: {e}")
+                if future is not None and not future.done():
+                    future.set_exception(e)
+                continue
+            if future is not None and not future.done():
+                future.set_result(result)
+        return retry
+
+    async def flush(self):
+        """Дожидается записи всех накопленных изменений (кроме отложенных до повтора)."""
+        if self._pending or self._write_lock.locked():
+            await self._write_pending()
+
+    # --- Запись ---
+
+    @staticmethod
+    def _insert_calculation(conn: sqlite3.Connection, user_id: int, created_at: float, params: dict, total: float):
+        conn.execute(
+            "INSERT INTO calculations (user_id, created_at, car_price_cny, year, engine_volume, fuel_type, "
+            "payer_type, total_rub) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                user_id, created_at, params.get('car_price_cny'), params.get('year'),
+                params.get('engine_volume'), params.get('fuel_type'), params.get('payer_type'), total,
+            )
+        )
+
+    @staticmethod
+    def _insert_lead(conn: sqlite3.Connection, lead: Lead) -> int:
+        return conn.execute(
+            "INSERT INTO leads (user_id, full_name, username, phone, comment, status, created_at, updated_at, "
+            "calculation_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, "
+            # Последний расчет пользователя пишется в ту же очередь раньше заявки
+            "(SELECT id FROM calculations WHERE user_id = ? AND created_at >= ? "
+            "ORDER BY created_at DESC LIMIT 1)) RETURNING id",
+            (
+                lead.user_id, lead.full_name, lead.username, lead.phone, lead.comment,
+                lead.status, lead.created_at, lead.updated_at,
+                lead.user_id, lead.created_at - CALCULATION_LINK_WINDOW,
+            )
+        ).fetchone()[0]
+
+    def record_calculation(self, user_id: int, params: dict, total_rub: float):
+        """Сохраняет выполненный расчет (запись произойдет в фоне)."""
+        self._enqueue(self._insert_calculation, user_id, time.time(), params, total_rub)
+
+    async def create_lead(
+        self,
+        user_id: int,
+        phone: str,
+        comment: str | None,
+        full_name: str | None = None,
+        username: str | None = None,
+    ) -> Lead:
+        """
+        Сохраняет заявку и возвращает ее с номером, который присвоила база.
+        Заявка пишется вместе с ближайшей пачкой записей, ожидание - не дольше WRITE_BATCH_DELAY.
+        """
+        now = time.time()
+        lead = Lead(
+            id=0,
+            user_id=user_id,
+            full_name=full_name,
+            username=username,
+            phone=phone,
+            comment=comment,
+            status="new",
+            created_at=now,
+            updated_at=now,
+        )
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(self._insert_lead, lead, future=future)
+        lead.id = await future
+        return lead
+
+    async def set_status(self, lead_id: int, status: str) -> bool:
+        """Меняет статус заявки. Возвращает False, если заявки нет."""
+        if status not in LEAD_STATUSES:
+            raise ValueError(f"Неизвестный статус: {status}")
+        await self.flush()
+
+        def update(conn: sqlite3.Connection) -> bool:
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE leads SET status = ?, updated_at = ? WHERE id = ?",
+                    (status, time.time(), lead_id)
+                )
+            return cursor.rowcount > 0
+
+        return await self.db.run(update)
+
+    # --- Чтение ---
+
+    async def get(self, lead_id: int) -> Lead | None:
+        """Заявка по номеру вместе с предшествующим расчетом."""
+        await self.flush()
+
+        def select(conn: sqlite3.Connection) -> Lead | None:
+            row = conn.execute(f"SELECT {LEAD_COLUMNS}, calculation_id FROM leads WHERE id = ?", (lead_id,)).fetchone()
+            if row is None:
+                return None
+            lead = _lead_from_row(row[:-1])
+            if row[-1] is not None:
+                calc = conn.execute(
+                    "SELECT car_price_cny, year, engine_volume, fuel_type, payer_type, total_rub, created_at "
+                    "FROM calculations WHERE id = ?",
+                    (row[-1],)
+                ).fetchone()
+                if calc is not None:
+                    keys = ("car_price_cny", "year", "engine_volume", "fuel_type", "payer_type", "total_rub", "created_at")
+                    lead.calculation = dict(zip(keys, calc))
+            return lead
+
+        return await self.db.run(select)
+
+    async def list_by_status(self, status: str, limit: int = 20) -> list[Lead]:
+        """Последние заявки с указанным статусом (по индексу status, created_at)."""
+        await self.flush()
+        rows = await self.db.run(lambda conn: conn.execute(
+            f"SELECT {LEAD_COLUMNS} FROM leads WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+            (status, limit)
+        ).fetchall())
+        return [_lead_from_row(row) for row in rows]
+
+    async def count_by_status(self) -> dict[str, int]:
+        """Количество заявок в каждом статусе."""
+        await self.flush()
+        rows = await self.db.run(lambda conn: conn.execute(
+            "SELECT status, COUNT(*) FROM leads GROUP BY status"
+        ).fetchall())
+        return dict(rows)
+
+    # --- Выгрузка ---
+
+    async def _iter_pages(self, query: str, page_size: int):
+        """
+        Читает таблицу страницами по первичному ключу (WHERE id > последний),
+        поэтому каждая страница стоит одинаково независимо от размера таблицы.
+        """
+        await self.flush()
+        last_id = 0
+        while True:
+            rows = await self.db.run(lambda conn: conn.execute(query, (last_id, page_size)).fetchall())
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    def iter_lead_pages(self, page_size: int = EXPORT_PAGE_SIZE):
+        """Все заявки страницами: (id, created_at, updated_at, status, user_id, full_name, username, phone, comment, calculation_id)."""
+        return self._iter_pages(
+            "SELECT id, created_at, updated_at, status, user_id, full_name, username, phone, comment, calculation_id "
+            "FROM leads WHERE id > ? ORDER BY id LIMIT ?",
+            page_size
+        )
+
+    def iter_calculation_pages(self, page_size: int = EXPORT_PAGE_SIZE):
+        """Все расчеты страницами: (id, created_at, user_id, car_price_cny, year, engine_volume, fuel_type, payer_type, total_rub)."""
+        return self._iter_pages(
+            "SELECT id, created_at, user_id, car_price_cny, year, engine_volume, fuel_type, payer_type, total_rub "
+            "FROM calculations WHERE id > ? ORDER BY id LIMIT ?",
+            page_size
+        )
+
+
+lead_store = LeadStore(runtime.storage.leads_db_path)
@@ -0,0 +1,172 @@
+import abc
+import logging
+import math
+from bisect import bisect_left
+from typing import Awaitable, Callable
+
+# Границы корзин гистограмм задержек, секунды
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    @abc.abstractmethod
+    def _samples(self):
+        """Строки метрики: (имя, метки, значение)."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик."""
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield self.name, _format_labels(self.label_names, key), value
+
+
+class Gauge(_Metric):
+    """Текущее значение (может расти и уменьшаться)."""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def clear(self):
+        self._values.clear()
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield self.name, _format_labels(self.label_names, key), value
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам (обычно - длительность в секундах)."""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [счетчики по корзинам (без накопления) + корзина +Inf, сумма]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def _samples(self):
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket", _format_labels(self.label_names, key, le), cumulative
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """
+    Набор метрик процесса в текстовом формате Prometheus.
+    Значения, которые дорого поддерживать постоянно (размеры кэшей, число
+    диалогов), заполняются коллекторами в момент запроса /metrics.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], Awaitable[None]]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], Awaitable[None]]):
+        """Регистрирует async-функцию, обновляющую метрики перед выдачей."""
+        self._collectors.append(collector)
+
+    async def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                await collector()
+            except Exception as e:
+                logging.warning(f"Ошибка сбора метрик в {getattr(collector, '__name__', collector)}: {e}")
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# --- Метрики бота ---
+
+UPDATES_TOTAL = metrics.counter("bot_updates_total", "Received updates by type.", ("type",))
+UPDATE_SECONDS = metrics.histogram("bot_update_seconds", "Full update processing time.", ("type",))
+HANDLER_SECONDS = metrics.histogram("bot_handler_seconds", "Handler execution time.", ("handler",))
+HANDLER_ERRORS = metrics.counter("bot_handler_errors_total", "Exceptions raised by handlers.", ("handler",))
+API_REQUEST_SECONDS = metrics.histogram("bot_api_request_seconds", "Telegram Bot API call latency.", ("method",))
+API_ERRORS = metrics.counter("bot_api_errors_total", "Failed Telegram Bot API calls.", ("method", "error"))
+FSM_STATES = metrics.gauge("bot_fsm_states", "Active FSM dialogs by state.", ("state",))
+CURRENCY_FETCH_SECONDS = metrics.histogram(
+    "bot_currency_fetch_seconds", "CBR rates fetch duration.", ("result",), buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+CURRENCY_RATES_AGE = metrics.gauge("bot_currency_rates_age_seconds", "Seconds since rates were last confirmed by CBR.")
+CACHE_HIT_RATIO = metrics.gauge("bot_cache_hit_ratio", "Cache hit ratio.", ("cache",))
+CACHE_REQUESTS = metrics.gauge("bot_cache_requests", "Cache lookups by result.", ("cache", "result"))
+THROTTLED_UPDATES = metrics.counter("bot_throttled_updates_total", "Updates dropped by per-user throttling.", ("reason",))
+THROTTLE_TRACKED_USERS = metrics.gauge("bot_throttle_tracked_users", "Users currently tracked by the throttling middleware.")
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from .rate_limit import ChatRateLimiter, telegram_global_bucket
+
+NOTIFY_WORKERS = 4
+NOTIFY_QUEUE_SIZE = 1000
+NOTIFY_MAX_ATTEMPTS = 5
+
+
+@dataclass
+class DeliveryReport:
+    """Итог доставки одного уведомления."""
+    chat_id: int
+    ok: bool
+    attempts: int
+    error: str | None = None
+
+
+@dataclass
+class _Notification:
+    chat_id: int
+    text: str
+    kwargs: dict
+    future: asyncio.Future
+    attempts: int = 0
+
+
+@dataclass
+class NotifierStats:
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    dropped: int = 0
+
+
+class NotificationDispatcher:
+    """
+    Очередь исходящих уведомлений с пулом обработчиков.
+    Отправка идет с учетом лимитов Telegram (общий и на чат), при RetryAfter
+    и сетевых ошибках сообщение отправляется повторно.
+    """
+
+    def __init__(
+        self,
+        workers: int = NOTIFY_WORKERS,
+        queue_size: int = NOTIFY_QUEUE_SIZE,
+        max_attempts: int = NOTIFY_MAX_ATTEMPTS,
+        limiter: ChatRateLimiter | None = None,
+    ):
+        self.workers_count = workers
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.limiter = limiter or ChatRateLimiter(global_bucket=telegram_global_bucket)
+        self.stats = NotifierStats()
+        self._bot: Bot | None = None
+        self._queue: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def backlog(self) -> int:
+        """Количество уведомлений, ожидающих отправки."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self, bot: Bot):
+        """Запускает обработчики очереди (вызывается при старте бота)."""
+        if self._workers:
+            return
+        self._bot = bot
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"notifier-{i}")
+            for i in range(self.workers_count)
+        ]
+
+    async def stop(self, timeout: float = 10.0):
+        """Дожидается отправки очереди (не дольше timeout) и останавливает обработчики."""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Не отправлено уведомлений при остановке: {self.backlog}")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, chat_id: int, text: str, **kwargs: Any) -> asyncio.Future:
+        """
+        Ставит сообщение в очередь и сразу возвращает Future с DeliveryReport.
+        Если очередь переполнена или не запущена, Future завершается с ошибкой доставки.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if self._queue is None:
+            future.set_result(DeliveryReport(chat_id, False, 0, "dispatcher is not running"))
+            return future
+        try:
+            self._queue.put_nowait(_Notification(chat_id, text, kwargs, future))
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+            future.set_result(DeliveryReport(chat_id, False, 0, "queue is full"))
+        return future
+
+    def submit_many(self, chat_ids, text: str, **kwargs: Any) -> list[asyncio.Future]:
+        """Ставит одно и то же сообщение в очередь для нескольких чатов."""
+        return [self.submit(chat_id, text, **kwargs) for chat_id in chat_ids]
+
+    async def _worker(self):
+        while True:
+            item: _Notification = await self._queue.get()
+            try:
+                report = await self._deliver(item)
+                if not item.future.done():
+                    item.future.set_result(report)
+            except Exception as e:
+                logging.error(f"Ошибка при отправке уведомления в чат {item.chat_id}: {e}")
+                if not item.future.done():
+                    item.future.set_result(DeliveryReport(item.chat_id, False, item.attempts, str(e)))
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, item: _Notification) -> DeliveryReport:
+        while True:
+            item.attempts += 1
+            await self.limiter.acquire(item.chat_id)
+            try:
+                await self._bot.send_message(item.chat_id, item.text, **item.kwargs)
+                self.stats.sent += 1
+                return DeliveryReport(item.chat_id, True, item.attempts)
+            except TelegramRetryAfter as e:
+                # Telegram сам говорит, сколько ждать: лимитер не пустит раньше ни в этот чат, ни в другие
+                self.limiter.penalize(item.chat_id, e.retry_after)
+                error, delay = e, 0
+            except (TelegramNetworkError, TelegramServerError) as e:
+                error, delay = e, min(2 ** item.attempts, 30)
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # Бот заблокирован или запрос некорректен - повтор не поможет
+                self.stats.failed += 1
+                return DeliveryReport(item.chat_id, False, item.attempts, str(e))
+
+            if item.attempts >= self.max_attempts:
+                self.stats.failed += 1
+                return DeliveryReport(item.chat_id, False, item.attempts, str(error))
+            self.stats.retried += 1
+            if delay:
+                await asyncio.sleep(delay)
+
+
+notifier = NotificationDispatcher()
@@ -0,0 +1,201 @@
+import asyncio
+import cProfile
+import datetime
+import io
+import logging
+import pstats
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from aiogram import BaseMiddleware, Dispatcher
+
+from .config import runtime
+
+# Ограничение для cProfile: он замедляет весь процесс в разы
+CPROFILE_MAX_SECONDS = 300
+CPROFILE_DEFAULT_SECONDS = 30
+
+# Вызов обработчика, который сейчас выполняется в этой задаче (для подсчета запросов к API)
+_current_call: ContextVar["CallStats | None"] = ContextVar("profiler_current_call", default=None)
+
+
+@dataclass(slots=True)
+class CallStats:
+    """Запросы к Bot API, сделанные во время одного вызова обработчика."""
+    api_calls: int = 0
+    api_seconds: float = 0.0
+
+
+@dataclass(slots=True)
+class HandlerStats:
+    """Накопленные показатели одного обработчика."""
+    calls: int = 0
+    errors: int = 0
+    wall: float = 0.0
+    wall_max: float = 0.0
+    cpu: float = 0.0
+    api_calls: int = 0
+    api_seconds: float = 0.0
+
+
+class HandlerProfiler:
+    """
+    Профилирование обработчиков, включаемое на лету.
+    Middleware регистрируется на диспетчере только на время профилирования,
+    поэтому в выключенном состоянии цепочка обработки апдейта не меняется.
+
+    CPU считается по потоку событийного цикла: если во время await обработчика
+    выполнялись другие задачи, их время тоже попадет в его показатель.
+    Время ожидания Bot API учитывается отдельно.
+    """
+
+    def __init__(self):
+        self.stats: dict[tuple[str, str], HandlerStats] = {}
+        self.started_at: float | None = None
+        self.stopped_at: float | None = None
+        # Длительность сеанса с автоматической остановкой (None - до /profile stop)
+        self.duration: float | None = None
+        self.top_n = runtime.profiling.top_n
+        self._dispatcher: Dispatcher | None = None
+        self._middleware: BaseMiddleware | None = None
+        self._cprofile: cProfile.Profile | None = None
+        self._cprofile_report = ""
+        self._timer: asyncio.TimerHandle | None = None
+        self._on_timeout: Callable[[str], Awaitable[None]] | None = None
+        self._report_task: asyncio.Task | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.started_at is not None and self.stopped_at is None
+
+    @property
+    def cprofile_active(self) -> bool:
+        return self._cprofile is not None
+
+    def attach(self, dp: Dispatcher, middleware: BaseMiddleware):
+        self._dispatcher = dp
+        self._middleware = middleware
+
+    def _observers(self):
+        for event_name, observer in self._dispatcher.observers.items():
+            if event_name not in ("update", "error"):
+                yield observer
+
+    def start(
+        self,
+        duration: float | None = None,
+        with_cprofile: bool = False,
+        on_timeout: Callable[[str], Awaitable[None]] | None = None,
+    ) -> bool:
+        """
+        Начинает сбор статистики с нуля. Возвращает False, если профилирование уже идет.
+        Если задан duration, через столько секунд профилирование остановится само,
+        а отчет будет передан в on_timeout. cProfile работает не дольше CPROFILE_MAX_SECONDS.
+        """
+        if self.active:
+            return False
+        self.stats = {}
+        self._cprofile_report = ""
+        self.started_at, self.stopped_at = time.time(), None
+        for observer in self._observers():
+            observer.middleware(self._middleware)
+        if with_cprofile:
+            duration = min(duration or CPROFILE_DEFAULT_SECONDS, CPROFILE_MAX_SECONDS)
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self.duration = duration
+        if duration:
+            self._on_timeout = on_timeout
+            self._timer = asyncio.get_running_loop().call_later(duration, self._finish)
+        logging.info(f"Профилирование обработчиков включено (cProfile: {'да' if with_cprofile else 'нет'})")
+        return True
+
+    def stop(self) -> bool:
+        if not self.active:
+            return False
+        for observer in self._observers():
+            observer.middleware.unregister(self._middleware)
+        self.stopped_at = time.time()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            stream = io.StringIO()
+            pstats.Stats(self._cprofile, stream=stream).sort_stats("cumulative").print_stats(self.top_n)
+            self._cprofile_report = stream.getvalue()
+            self._cprofile = None
+        logging.info("Профилирование обработчиков выключено")
+        return True
+
+    def _finish(self):
+        self._timer = None
+        on_timeout, self._on_timeout = self._on_timeout, None
+        self.stop()
+        if on_timeout is not None:
+            self._report_task = asyncio.create_task(on_timeout(self.report()), name="profiler-report")
+
+    def begin_call(self) -> tuple[CallStats, object]:
+        call = CallStats()
+        return call, _current_call.set(call)
+
+    @staticmethod
+    def end_call(token):
+        _current_call.reset(token)
+
+    def record(self, key: tuple[str, str], wall: float, cpu: float, call: CallStats, failed: bool):
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = HandlerStats()
+        stats.calls += 1
+        stats.errors += failed
+        stats.wall += wall
+        stats.wall_max = max(stats.wall_max, wall)
+        stats.cpu += cpu
+        stats.api_calls += call.api_calls
+        stats.api_seconds += call.api_seconds
+
+    @staticmethod
+    def record_api_call(seconds: float):
+        """Вызывается сессией Bot API; засчитывает запрос текущему обработчику."""
+        call = _current_call.get()
+        if call is not None:
+            call.api_calls += 1
+            call.api_seconds += seconds
+
+    # --- Отчет ---
+
+    def report(self, top_n: int | None = None) -> str:
+        """Текстовый отчет: обработчики по убыванию суммарного времени и последний вывод cProfile."""
+        top_n = top_n or self.top_n
+        lines = []
+        if self.started_at is not None:
+            started = datetime.datetime.fromtimestamp(self.started_at)
+            duration = (self.stopped_at or time.time()) - self.started_at
+            state = "завершено" if self.stopped_at else "идет"
+            lines.append(f"Профилирование с {started:%d.%m.%Y %H:%M:%S}, {duration:.1f} с ({state})")
+        total_calls = sum(stats.calls for stats in self.stats.values())
+        lines.append(f"Вызовов обработчиков: {total_calls}")
+        lines.append("")
+
+        header = (f"{'роутер':<14} {'обработчик':<34} {'вызовов':>8} {'всего, мс':>11} {'сред., мс':>10} "
+                  f"{'макс., мс':>10} {'CPU, мс':>10} {'API':>6} {'API, мс':>10} {'ошибок':>7}")
+        lines += [header, "-" * len(header)]
+        ranked = sorted(self.stats.items(), key=lambda item: item[1].wall, reverse=True)
+        for (router_name, handler_name), stats in ranked[:top_n]:
+            lines.append(
+                f"{router_name:<14} {handler_name:<34} {stats.calls:>8} {stats.wall * 1000:>11.1f} "
+                f"{stats.wall / stats.calls * 1000:>10.2f} {stats.wall_max * 1000:>10.1f} "
+                f"{stats.cpu * 1000:>10.1f} {stats.api_calls:>6} {stats.api_seconds * 1000:>10.1f} {stats.errors:>7}"
+            )
+        if len(ranked) > top_n:
+            lines.append(f"... и еще {len(ranked) - top_n}")
+
+        if self._cprofile_report:
+            lines += ["", "cProfile (по суммарному времени):", self._cprofile_report]
+        return "\n".join(lines)
+
+
+profiler = HandlerProfiler()
@@ -0,0 +1,127 @@
+import asyncio
+import csv
+import datetime
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+from .config import CurrencyRates, runtime
+
+# Одна запись: порядковый номер даты (uint32) + курс CNY + курс EUR (float64) = 20 байт
+RECORD = struct.Struct("<Idd")
+
+
+class RateHistory:
+    """
+    Хранилище дневных курсов ЦБ (CNY и EUR к рублю).
+    На диске - файл, в который записи только дописываются; в памяти - отсортированные
+    массивы, поэтому поиск курса на дату выполняется бинарным поиском за O(log n).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._dates = array("I")
+        self._cny = array("d")
+        self._eur = array("d")
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """Читает файл; при повторе даты побеждает последняя запись."""
+        by_date = {}
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                data = f.read()
+            # Недописанный хвост (например, после сбоя) отбрасываем
+            usable = len(data) - len(data) % RECORD.size
+            for ordinal, cny, eur in RECORD.iter_unpack(data[:usable]):
+                by_date[ordinal] = (cny, eur)
+        self._dates = array("I", sorted(by_date))
+        self._cny = array("d", (by_date[d][0] for d in self._dates))
+        self._eur = array("d", (by_date[d][1] for d in self._dates))
+        self._loaded = True
+
+    async def open(self):
+        """Читает файл истории вне цикла событий (вызывается при старте бота)."""
+        await asyncio.to_thread(self._ensure_loaded)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._dates)
+
+    def _insert(self, ordinal: int, cny: float, eur: float) -> bool:
+        """Вставляет запись в массивы. Возвращает False, если такие курсы уже есть."""
+        index = bisect_left(self._dates, ordinal)
+        if index < len(self._dates) and self._dates[index] == ordinal:
+            if self._cny[index] == cny and self._eur[index] == eur:
+                return False
+            self._cny[index] = cny
+            self._eur[index] = eur
+            return True
+        self._dates.insert(index, ordinal)
+        self._cny.insert(index, cny)
+        self._eur.insert(index, eur)
+        return True
+
+    def add_many(self, rows) -> int:
+        """
+        Добавляет курсы [(date, cny, eur), ...] одной записью в файл.
+        Возвращает количество новых или измененных дат.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            payload = bytearray()
+            for date, cny, eur in rows:
+                ordinal = date.toordinal()
+                if self._insert(ordinal, float(cny), float(eur)):
+                    payload += RECORD.pack(ordinal, float(cny), float(eur))
+            if payload:
+                with open(self.path, "ab") as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+            return len(payload) // RECORD.size
+
+    def add(self, date: datetime.date, cny: float, eur: float) -> bool:
+        """Добавляет курсы на одну дату."""
+        return self.add_many([(date, cny, eur)]) > 0
+
+    def rates_on(self, date: datetime.date) -> CurrencyRates | None:
+        """Курсы, действовавшие на дату (последние опубликованные не позже нее)."""
+        self._ensure_loaded()
+        with self._lock:
+            index = bisect_right(self._dates, date.toordinal()) - 1
+            if index < 0:
+                return None
+            return CurrencyRates(cny_to_rub=self._cny[index], eur_to_rub=self._eur[index])
+
+    def date_range(self) -> tuple[datetime.date, datetime.date] | None:
+        """Первая и последняя даты в истории."""
+        self._ensure_loaded()
+        if not self._dates:
+            return None
+        return datetime.date.fromordinal(self._dates[0]), datetime.date.fromordinal(self._dates[-1])
+
+    def import_csv(self, path: str) -> int:
+        """Загружает курсы из CSV с колонками date (ДД.ММ.ГГГГ), cny, eur."""
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = [
+                (
+                    datetime.datetime.strptime(row["date"].strip(), "%d.%m.%Y").date(),
+                    float(row["cny"].replace(",", ".")),
+                    float(row["eur"].replace(",", ".")),
+                )
+                for row in csv.DictReader(f)
+            ]
+        return self.add_many(rows)
+
+
+rate_history = RateHistory(runtime.storage.rates_history_path)
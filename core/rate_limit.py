@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+# Ограничения Telegram Bot API: около 30 сообщений в секунду всего
+# и не больше одного сообщения в секунду в один чат
+TELEGRAM_GLOBAL_RATE = 30.0
+TELEGRAM_PER_CHAT_RATE = 1.0
+
+
+class TokenBucket:
+    """Классический "ведро токенов": rate токенов в секунду, не больше capacity про запас."""
+
+    __slots__ = ("rate", "capacity", "_tokens", "_updated_at")
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self) -> float:
+        """Берет токен. Возвращает 0, если получилось, иначе - сколько секунд ждать."""
+        now = time.monotonic()
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        """Ждет, пока не появится свободный токен."""
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+
+    def penalize(self, seconds: float):
+        """Запрещает отправку на seconds секунд (после ответа 429 от Telegram)."""
+        self._refill(time.monotonic())
+        # Ровно через seconds секунд накопится один токен
+        self._tokens = min(self._tokens, 1.0 - seconds * self.rate)
+
+    @property
+    def idle(self) -> bool:
+        """Ведро полное - лимитер для этого чата можно забыть."""
+        self._refill(time.monotonic())
+        return self._tokens >= self.capacity
+
+
+class ChatRateLimiter:
+    """Общий лимит на бота плюс отдельный лимит на каждый чат."""
+
+    def __init__(
+        self,
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        per_chat_rate: float = TELEGRAM_PER_CHAT_RATE,
+        per_chat_capacity: float = 1.0,
+        global_bucket: TokenBucket | None = None,
+    ):
+        self.global_bucket = global_bucket or TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_capacity = per_chat_capacity
+        self._chats: dict[int, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Забываем давно неактивные чаты, чтобы словарь не рос бесконечно
+            if len(self._chats) >= 10000:
+                self._chats = {key: value for key, value in self._chats.items() if not value.idle}
+            bucket = self._chats[chat_id] = TokenBucket(self.per_chat_rate, self.per_chat_capacity)
+        return bucket
+
+    async def acquire(self, chat_id: int):
+        """Ждет разрешения на отправку сообщения в чат."""
+        await self._chat_bucket(chat_id).acquire()
+        await self.global_bucket.acquire()
+
+    def penalize(self, chat_id: int | None, seconds: float):
+        """
+        Учитывает RetryAfter. По ответу 429 нельзя понять, превышен лимит чата или
+        всего бота, поэтому пауза действует и на чат, и на общий лимит.
+        """
+        self.global_bucket.penalize(seconds)
+        if chat_id is not None:
+            self._chat_bucket(chat_id).penalize(seconds)
+
+
+# Общий лимит бота на процесс: из него берут токены и уведомления, и рассылки,
+# поэтому вместе они не превышают TELEGRAM_GLOBAL_RATE
+telegram_global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE)
@@ -0,0 +1,9 @@
+from zoneinfo import ZoneInfo
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+# Часовой пояс, в котором администраторы указывают время задач
+SCHEDULER_TIMEZONE = ZoneInfo("Europe/Moscow")
+
+# Общий планировщик задач процесса: обновление курсов, отложенные сообщения и т.д.
+scheduler = AsyncIOScheduler(timezone="Europe/Moscow")
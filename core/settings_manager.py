@@ -1,11 +1,21 @@
+import asyncio
 import json
+import logging
 import os
+import tempfile
 from dataclasses import asdict, is_dataclass
 from typing import Any
 
 from core.config import settings, Settings
+from core.tariff_tables import rebuild_tariff_tables
 
 SETTINGS_FILE = "settings.json"
+# Окно, в течение которого несколько сохранений объединяются в одну запись
+SAVE_DEBOUNCE_SECONDS = 0.5
+
+_pending_save: asyncio.TimerHandle | None = None
+_write_lock = asyncio.Lock()
+_background_writes: set[asyncio.Task] = set()
 
 def _update_dataclass_from_dict(dc_instance: Any, data: dict):
     """Рекурсивно обновляет поля вложенных датаклассов из словаря."""
@@ -19,17 +29,105 @@ def _update_dataclass_from_dict(dc_instance: Any, data: dict):
                 # Иначе просто устанавливаем значение
                 setattr(dc_instance, key, value)
 
-def save_settings():
-    """Сохраняет текущие настройки в JSON-файл."""
+def _serialize_settings() -> str:
+    """Снимок текущих настроек в JSON (делается в цикле событий, до передачи в поток)."""
+    # asdict рекурсивно преобразует датаклассы в словари
+    return json.dumps(asdict(settings), ensure_ascii=False, indent=4)
+
+def _write_settings_file(payload: str):
+    """
+    Атомарно записывает настройки: временный файл -> fsync -> rename.
+    При падении процесса на диске остается либо старый, либо новый файл целиком.
+    """
+    directory = os.path.dirname(os.path.abspath(SETTINGS_FILE))
+    fd, tmp_path = tempfile.mkstemp(prefix=".settings.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, SETTINGS_FILE)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # Фиксируем на диске и сам факт переименования
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def _save_settings_now() -> bool:
+    """Синхронно сохраняет настройки (используется вне цикла событий)."""
     try:
-        with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-            # asdict рекурсивно преобразует датаклассы в словари
-            json.dump(asdict(settings), f, ensure_ascii=False, indent=4)
+        _write_settings_file(_serialize_settings())
         return True
     except (IOError, TypeError) as e:
-        print(f"Ошибка при сохранении настроек: {e}")
+        logging.error(f"Ошибка при сохранении настроек: {e}")
         return False
 
+async def flush_settings(force: bool = True) -> bool:
+    """
+    Немедленно записывает настройки в файл в рабочем потоке и отменяет отложенную запись.
+    С force=False (при остановке бота) пишет только если есть несохраненные изменения.
+    """
+    global _pending_save
+    if not force and _pending_save is None:
+        # Дожидаемся уже начатых записей, чтобы процесс не завершился посреди них
+        if _background_writes:
+            await asyncio.gather(*_background_writes, return_exceptions=True)
+        return True
+    if _pending_save is not None:
+        _pending_save.cancel()
+        _pending_save = None
+    async with _write_lock:
+        # Снимок делается под блокировкой, поэтому последняя запись всегда самая свежая
+        try:
+            payload = _serialize_settings()
+            await asyncio.to_thread(_write_settings_file, payload)
+            return True
+        except (IOError, TypeError) as e:
+            logging.error(f"Ошибка при сохранении настроек: {e}")
+            return False
+
+def _start_background_save():
+    global _pending_save
+    _pending_save = None
+    task = asyncio.create_task(flush_settings())
+    _background_writes.add(task)
+    task.add_done_callback(_background_writes.discard)
+
+def save_settings():
+    """
+    Сохраняет текущие настройки в JSON-файл.
+    Внутри цикла событий запись откладывается на SAVE_DEBOUNCE_SECONDS: несколько
+    изменений подряд объединяются в одну запись, которая выполняется в рабочем потоке.
+    Результат записи здесь еще неизвестен, поэтому функция ничего не возвращает:
+    ошибки фоновой записи попадают в лог. Кому нужен результат - save_settings_and_wait().
+    """
+    global _pending_save
+    # Таблицы ставок пересобираются сразу, запись на диск может быть отложена
+    rebuild_tariff_tables(settings)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _save_settings_now()
+        return
+    if _pending_save is None:
+        _pending_save = loop.call_later(SAVE_DEBOUNCE_SECONDS, _start_background_save)
+
+async def save_settings_and_wait() -> bool:
+    """
+    Сохраняет настройки сразу, без отложенной записи, и возвращает результат.
+    Для явных сохранений из админки, где администратору нужно знать, записались ли изменения.
+    """
+    rebuild_tariff_tables(settings)
+    return await flush_settings()
+
 def load_settings() -> Settings:
     """
     Загружает настройки из JSON-файла.
@@ -50,4 +148,5 @@ def load_settings() -> Settings:
         # Если файла нет, создаем его с настройками по умолчанию
         save_settings()
 
+    rebuild_tariff_tables(settings)
     return settings 
\ No newline at end of file
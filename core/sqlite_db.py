@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class SQLiteDatabase:
+    """
+    Соединение с SQLite в режиме WAL.
+    Все запросы выполняются в одном выделенном потоке, поэтому обращения
+    к базе не блокируют цикл событий и не требуют дополнительных блокировок.
+    """
+
+    def __init__(self, path: str, schema: str = ""):
+        self.path = path
+        self._schema = schema
+        self._conn: sqlite3.Connection | None = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix=f"sqlite-{os.path.basename(path)}"
+        )
+        self._open_lock = asyncio.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # В режиме WAL NORMAL безопасен при падении процесса и заметно быстрее FULL
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        if self._schema:
+            conn.executescript(self._schema)
+        conn.commit()
+        return conn
+
+    @property
+    def is_open(self) -> bool:
+        return self._conn is not None
+
+    async def open(self):
+        """Открывает соединение и создает схему (повторный вызов ничего не делает)."""
+        if self._conn is not None:
+            return
+        async with self._open_lock:
+            if self._conn is None:
+                loop = asyncio.get_running_loop()
+                self._conn = await loop.run_in_executor(self._executor, self._connect)
+                logging.info(f"База данных SQLite открыта: {self.path}")
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Выполняет fn(conn, *args) в потоке базы данных и возвращает результат."""
+        if self._conn is None:
+            await self.open()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, self._conn, *args)
+
+    async def close(self):
+        """Закрывает соединение и останавливает поток базы данных."""
+        if self._conn is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
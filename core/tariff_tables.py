@@ -0,0 +1,98 @@
+from bisect import bisect_left
+from dataclasses import dataclass
+from itertools import count
+
+from .config import Settings
+
+# Верхние границы возраста авто (включительно) для выбора категории пошлины:
+# до 2 лет включительно -> "до 3 лет", 3-5 лет -> "3-5 лет", старше 5 лет -> "старше 5 лет"
+DUTY_AGE_BOUNDS = (2, 5)
+DUTY_AGE_UNDER_3 = 0
+DUTY_AGE_3_5 = 1
+DUTY_AGE_OLDER_5 = 2
+
+# Верхняя граница возраста (включительно) для льготного утилизационного сбора
+RECYCLING_AGE_BOUNDS = (3,)
+
+_versions = count(1)
+
+
+@dataclass(frozen=True)
+class DutyTable:
+    """Ставки пошлины (€/см³), отсортированные по верхней границе объема двигателя."""
+    max_volumes: tuple[int, ...]
+    rates: tuple[float, ...]
+
+    @classmethod
+    def from_mapping(cls, rate_map: dict) -> "DutyTable":
+        # Ключи приходят как int из админки и как str из settings.json
+        items = sorted((int(max_volume), float(rate)) for max_volume, rate in rate_map.items())
+        return cls(
+            max_volumes=tuple(max_volume for max_volume, _ in items),
+            rates=tuple(rate for _, rate in items),
+        )
+
+    def rate_for(self, engine_volume: float) -> float | None:
+        """Ставка для первой границы, которая не меньше объема, или None."""
+        index = bisect_left(self.max_volumes, engine_volume)
+        if index < len(self.rates):
+            return self.rates[index]
+        return None
+
+
+@dataclass(frozen=True)
+class TariffTables:
+    """Неизменяемый снимок скомпилированных таможенных таблиц."""
+    version: int
+    # Индекс совпадает с номером возрастной категории; для "до 3 лет" таблицы нет
+    duty_by_age: tuple[DutyTable | None, ...]
+    # Утильсбор: [до 3 лет включительно, старше 3 лет]
+    recycling_by_age: tuple[float, ...]
+
+    def duty_category(self, car_age: int) -> int:
+        return bisect_left(DUTY_AGE_BOUNDS, car_age)
+
+    def recycling_fee(self, car_age: int) -> float:
+        return self.recycling_by_age[bisect_left(RECYCLING_AGE_BOUNDS, car_age)]
+
+
+def compile_tariffs(settings: Settings) -> TariffTables:
+    """Строит таблицы поиска из текущих настроек."""
+    duty = settings.customs.duty
+    recycling = settings.customs.recycling
+    return TariffTables(
+        version=next(_versions),
+        duty_by_age=(
+            None,
+            DutyTable.from_mapping(duty.age_3_5_years),
+            DutyTable.from_mapping(duty.age_older_5_years),
+        ),
+        recycling_by_age=(float(recycling.under_3_years), float(recycling.over_3_years)),
+    )
+
+
+_current: TariffTables | None = None
+_current_source: Settings | None = None
+
+
+def rebuild_tariff_tables(settings: Settings) -> TariffTables:
+    """
+    Перекомпилирует таблицы после изменения настроек.
+    Вызывается из load_settings() и save_settings(), то есть после правок в админке
+    и обновления курсов. Номер версии растет при каждой пересборке.
+    """
+    global _current, _current_source
+    tables = compile_tariffs(settings)
+    _current, _current_source = tables, settings
+    return tables
+
+
+def get_tariff_tables(settings: Settings) -> TariffTables:
+    """Возвращает скомпилированные таблицы для объекта настроек."""
+    tables = _current
+    if tables is not None and _current_source is settings:
+        return tables
+    if _current_source is None or _current_source is settings:
+        return rebuild_tariff_tables(settings)
+    # Чужой объект настроек (например, в скриптах) компилируем без подмены общего снимка
+    return compile_tariffs(settings)
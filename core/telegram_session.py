@@ -0,0 +1,36 @@
+import time
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from .health import health
+from .metrics import API_ERRORS, API_REQUEST_SECONDS
+from .profiler import profiler
+
+
+class InstrumentedAiohttpSession(AiohttpSession):
+    """Сессия Bot API, которая замеряет длительность и ошибки каждого запроса к Telegram."""
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[TelegramType], timeout: Optional[int] = None
+    ) -> TelegramType:
+        method_name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            result = await super().make_request(bot, method, timeout)
+            if method_name == "getUpdates":
+                # Успешный long polling - признак того, что бот получает апдейты
+                health.mark_poll()
+            return result
+        except Exception as e:
+            API_ERRORS.inc(method=method_name, error=type(e).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            API_REQUEST_SECONDS.observe(elapsed, method=method_name)
+            if profiler.active:
+                # Запрос засчитывается обработчику, в задаче которого он сделан
+                profiler.record_api_call(elapsed)
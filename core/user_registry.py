@@ -0,0 +1,118 @@
+import sqlite3
+import time
+from typing import Iterable
+
+from .config import runtime
+from .sqlite_db import SQLiteDatabase
+
+USERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    full_name TEXT,
+    username TEXT,
+    language TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    is_blocked INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS users_last_seen ON users (last_seen);
+"""
+
+# Пользователь для записи: (id, полное имя, username, язык, время последнего визита)
+UserRow = tuple[int, str | None, str | None, str | None, float]
+
+
+class UserRegistry:
+    """Постоянный список пользователей бота (получатели рассылок, статистика)."""
+
+    def __init__(self, path: str):
+        self.db = SQLiteDatabase(path, USERS_SCHEMA)
+
+    async def open(self):
+        await self.db.open()
+
+    async def close(self):
+        await self.db.close()
+
+    @staticmethod
+    def _upsert_sync(conn: sqlite3.Connection, rows: list[UserRow]):
+        with conn:
+            conn.executemany(
+                "INSERT INTO users (id, full_name, username, language, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?5, ?5) "
+                "ON CONFLICT(id) DO UPDATE SET full_name = excluded.full_name, username = excluded.username, "
+                "language = excluded.language, last_seen = MAX(users.last_seen, excluded.last_seen), "
+                # Пользователь снова пишет боту - значит, разблокировал его
+                "is_blocked = 0",
+                rows
+            )
+
+    async def upsert_many(self, rows: list[UserRow]):
+        """Добавляет или обновляет пользователей одной транзакцией."""
+        if rows:
+            await self.db.run(self._upsert_sync, rows)
+
+    async def mark_blocked(self, user_ids: Iterable[int]):
+        """Исключает из рассылок пользователей, которые заблокировали бота."""
+        ids = [(user_id,) for user_id in user_ids]
+        if not ids:
+            return
+
+        def update(conn: sqlite3.Connection):
+            with conn:
+                conn.executemany("UPDATE users SET is_blocked = 1 WHERE id = ?", ids)
+
+        await self.db.run(update)
+
+    async def count_recipients(self, after_id: int = 0) -> int:
+        """Количество получателей рассылки с id больше after_id."""
+        return await self.db.run(lambda conn: conn.execute(
+            "SELECT COUNT(*) FROM users WHERE id > ? AND is_blocked = 0", (after_id,)
+        ).fetchone()[0])
+
+    async def iter_recipient_pages(self, after_id: int = 0, page_size: int = 100):
+        """Id получателей по возрастанию, страницами (продолжение с after_id)."""
+        while True:
+            ids = await self.db.run(lambda conn: [row[0] for row in conn.execute(
+                "SELECT id FROM users WHERE id > ? AND is_blocked = 0 ORDER BY id LIMIT ?",
+                (after_id, page_size)
+            )])
+            if not ids:
+                return
+            yield ids
+            after_id = ids[-1]
+
+    async def stats(self) -> dict:
+        """Сводка по пользователям: всего, новые и активные за сутки/неделю/месяц, языки."""
+        now = time.time()
+        day, week, month = now - 86400, now - 7 * 86400, now - 30 * 86400
+
+        def select(conn: sqlite3.Connection) -> dict:
+            row = conn.execute(
+                "SELECT COUNT(*), "
+                "COALESCE(SUM(first_seen >= ?), 0), COALESCE(SUM(first_seen >= ?), 0), COALESCE(SUM(first_seen >= ?), 0), "
+                "COALESCE(SUM(last_seen >= ?), 0), COALESCE(SUM(last_seen >= ?), 0), COALESCE(SUM(last_seen >= ?), 0), "
+                "COALESCE(SUM(is_blocked), 0) FROM users",
+                (day, week, month, day, week, month)
+            ).fetchone()
+            languages = conn.execute(
+                "SELECT COALESCE(language, '?'), COUNT(*) FROM users GROUP BY 1 ORDER BY 2 DESC LIMIT 5"
+            ).fetchall()
+            total, new_day, new_week, new_month, active_day, active_week, active_month, blocked = row
+            return {
+                "total": total,
+                "new": {"day": new_day, "week": new_week, "month": new_month},
+                "active": {"day": active_day, "week": active_week, "month": active_month},
+                "blocked": blocked,
+                "languages": languages,
+            }
+
+        return await self.db.run(select)
+
+
+def user_row(user, seen_at: float | None = None) -> UserRow:
+    """Преобразует aiogram User в строку для записи в реестр."""
+    return (user.id, user.full_name, user.username, user.language_code, seen_at or time.time())
+
+
+user_registry = UserRegistry(runtime.storage.users_db_path)
@@ -0,0 +1,208 @@
+"""
+Заглушка Telegram Bot API на aiohttp для нагрузочного тестирования.
+
+Реализует методы, которыми пользуется бот в пользовательских сценариях
+(getUpdates, sendMessage, editMessageText, deleteMessage, answerCallbackQuery,
+setMyCommands и служебные getMe/deleteWebhook). Умеет добавлять задержку
+к каждому ответу и отвечать 429 на заданную долю исходящих сообщений.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from aiohttp import web
+
+BOT_USER = {"id": 100500, "is_bot": True, "first_name": "LoadTestBot", "username": "loadtest_bot"}
+
+# Методы, которые могут получить искусственный 429 (getUpdates не трогаем,
+# иначе polling уйдет в паузу и тест будет мерить не то)
+THROTTLED_METHODS = {"sendMessage", "editMessageText", "deleteMessage", "answerCallbackQuery"}
+
+
+@dataclass
+class BotEvent:
+    """Исходящий вызов бота, адресованный чату."""
+    method: str
+    chat_id: int
+    message_id: int | None
+    text: str | None
+    reply_markup: dict | None
+    at: float = field(default_factory=time.perf_counter)
+
+
+class FakeBotAPI:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, retry_after: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.calls: Counter = Counter()
+        self.throttled: Counter = Counter()
+        self._updates: list[dict] = []
+        self._next_update_id = 1
+        self._new_updates = asyncio.Event()
+        self._next_message_id = defaultdict(lambda: 1)
+        self._events: dict[int, asyncio.Queue] = defaultdict(asyncio.Queue)
+        # Последнее сообщение бота в чате - к нему "привязываются" нажатия кнопок
+        self.last_bot_message: dict[int, dict] = {}
+        self._callback_query_id = 0
+
+    # --- Входящие апдейты (от "пользователей") ---
+
+    def push_update(self, payload: dict) -> int:
+        update_id = self._next_update_id
+        self._next_update_id += 1
+        self._updates.append({"update_id": update_id, **payload})
+        self._new_updates.set()
+        return update_id
+
+    def _user(self, user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "language_code": "ru"}
+
+    def push_message(self, user_id: int, text: str | None = None, contact_phone: str | None = None) -> int:
+        message_id = self._next_message_id[user_id]
+        self._next_message_id[user_id] += 1
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self._user(user_id),
+        }
+        if text is not None:
+            message["text"] = text
+            if text.startswith("/"):
+                message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        if contact_phone is not None:
+            message["contact"] = {"phone_number": contact_phone, "first_name": f"User{user_id}", "user_id": user_id}
+        return self.push_update({"message": message})
+
+    def push_callback(self, user_id: int, data: str) -> int:
+        self._callback_query_id += 1
+        message = self.last_bot_message.get(user_id) or {
+            "message_id": 0, "date": int(time.time()), "chat": {"id": user_id, "type": "private"}, "text": "",
+        }
+        return self.push_update({"callback_query": {
+            "id": str(self._callback_query_id),
+            "from": self._user(user_id),
+            "chat_instance": str(user_id),
+            "message": {**message, "from": BOT_USER},
+            "data": data,
+        }})
+
+    async def next_event(self, chat_id: int, timeout: float) -> BotEvent | None:
+        try:
+            return await asyncio.wait_for(self._events[chat_id].get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain_events(self, chat_id: int) -> int:
+        queue = self._events[chat_id]
+        drained = 0
+        while not queue.empty():
+            queue.get_nowait()
+            drained += 1
+        return drained
+
+    # --- HTTP ---
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        return app
+
+    @staticmethod
+    def _ok(result) -> web.Response:
+        return web.json_response({"ok": True, "result": result})
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls[method] += 1
+
+        if method != "getUpdates":
+            if self.latency or self.jitter:
+                await asyncio.sleep(self.latency + random.random() * self.jitter)
+            if method in THROTTLED_METHODS and self.error_rate and random.random() < self.error_rate:
+                self.throttled[method] += 1
+                return web.json_response({
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                }, status=429)
+
+        handler = getattr(self, f"_method_{method}", None)
+        if handler is None:
+            return web.json_response({"ok": False, "error_code": 404, "description": "Not Found"}, status=404)
+        return await handler(params)
+
+    def _record(self, method: str, params: dict, message: dict | None = None):
+        chat_id = int(params.get("chat_id") or 0)
+        markup = params.get("reply_markup")
+        event = BotEvent(
+            method=method,
+            chat_id=chat_id,
+            message_id=message["message_id"] if message else None,
+            text=params.get("text"),
+            reply_markup=json.loads(markup) if markup else None,
+        )
+        self._events[chat_id].put_nowait(event)
+
+    def _bot_message(self, chat_id: int, text: str | None, message_id: int | None = None) -> dict:
+        if message_id is None:
+            message_id = self._next_message_id[chat_id]
+            self._next_message_id[chat_id] += 1
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": text or "",
+        }
+        self.last_bot_message[chat_id] = message
+        return message
+
+    async def _method_getMe(self, params: dict) -> web.Response:
+        return self._ok(BOT_USER)
+
+    async def _method_deleteWebhook(self, params: dict) -> web.Response:
+        return self._ok(True)
+
+    async def _method_setMyCommands(self, params: dict) -> web.Response:
+        return self._ok(True)
+
+    async def _method_getUpdates(self, params: dict) -> web.Response:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        # Подтвержденные апдейты больше не нужны
+        if offset:
+            self._updates = [update for update in self._updates if update["update_id"] >= offset]
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._ok(self._updates[:limit])
+
+    async def _method_sendMessage(self, params: dict) -> web.Response:
+        message = self._bot_message(int(params["chat_id"]), params.get("text"))
+        self._record("sendMessage", params, message)
+        return self._ok(message)
+
+    async def _method_editMessageText(self, params: dict) -> web.Response:
+        message = self._bot_message(int(params["chat_id"]), params.get("text"), int(params["message_id"]))
+        self._record("editMessageText", params, message)
+        return self._ok(message)
+
+    async def _method_deleteMessage(self, params: dict) -> web.Response:
+        self._record("deleteMessage", params)
+        return self._ok(True)
+
+    async def _method_answerCallbackQuery(self, params: dict) -> web.Response:
+        # chat_id в запросе нет - ответ на нажатие не считается сообщением в чат
+        return self._ok(True)
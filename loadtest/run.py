@@ -0,0 +1,229 @@
+"""
+Сквозной нагрузочный тест: бот с настоящими роутерами работает через polling
+против локальной заглушки Bot API, виртуальные пользователи проходят сценарии
+калькулятора, FAQ, заявки и deep-link.
+
+Запуск из корня репозитория:
+    python -m loadtest.run [--users 50] [--sessions 10] [--latency 0.02] [--error-rate 0.01] [--json report.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Хранилища теста - во временной папке; настраивается до импорта модулей бота
+_tmpdir = tempfile.TemporaryDirectory(prefix="loadtest_")
+for _name in ("FSM_DB_PATH", "LEADS_DB_PATH", "USERS_DB_PATH", "ANALYTICS_DB_PATH"):
+    os.environ[_name] = os.path.join(_tmpdir.name, _name.lower().replace("_path", ".sqlite3"))
+os.environ["RATES_HISTORY_PATH"] = os.path.join(_tmpdir.name, "rates_history.bin")
+os.environ.setdefault("FSM_STORAGE", "memory")
+# Виртуальные пользователи шлют апдейты быстрее людей - ограничение частоты
+# по умолчанию выключено, включается явным THROTTLE_LIMIT
+os.environ.setdefault("THROTTLE_LIMIT", "0")
+# Уведомления о заявках уходят "администратору" в заглушку
+os.environ.setdefault("ADMIN_IDS", "1")
+
+from aiogram import BaseMiddleware, Bot  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from core.fsm_storage import create_fsm_storage  # noqa: E402
+from core.scheduler import scheduler  # noqa: E402
+from core.telegram_session import InstrumentedAiohttpSession  # noqa: E402
+from loadtest.fake_api import FakeBotAPI  # noqa: E402
+from loadtest.scenarios import DEFAULT_MIX, SCENARIOS, Step  # noqa: E402
+from main import create_dispatcher  # noqa: E402
+
+REPLY_TIMEOUT = 10.0
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Процентиль методом ближайшего ранга (values должны быть отсортированы)."""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(q / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def summarize(values: list[float]) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+class HandlerTimer(BaseMiddleware):
+    """Точные длительности обработчиков (в отличие от корзин гистограмм /metrics)."""
+
+    def __init__(self):
+        self.durations: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    async def __call__(self, handler, event, data):
+        callback = getattr(data.get("handler"), "callback", None)
+        name = f"{callback.__module__}.{callback.__name__}" if callback else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            self.errors[name] += 1
+            raise
+        finally:
+            self.durations[name].append(time.perf_counter() - started)
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.api = FakeBotAPI(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+        self.step_latencies: dict[str, list[float]] = defaultdict(list)
+        self.timeouts = 0
+        self.steps_sent = 0
+        mix = dict(DEFAULT_MIX)
+        for part in filter(None, (args.mix or "").split(",")):
+            name, weight = part.split("=")
+            mix[name.strip()] = float(weight)
+        self.mix_names = [name for name in mix if name in SCENARIOS]
+        self.mix_weights = [mix[name] for name in self.mix_names]
+
+    def _push(self, user_id: int, step: Step):
+        if step.kind == "callback":
+            self.api.push_callback(user_id, step.value)
+        elif step.kind == "contact":
+            self.api.push_message(user_id, contact_phone=step.value)
+        else:
+            self.api.push_message(user_id, text=step.value)
+
+    async def virtual_user(self, user_id: int):
+        think_min, think_max = self.args.think
+        for _ in range(self.args.sessions):
+            scenario = random.choices(self.mix_names, self.mix_weights)[0]
+            for step in SCENARIOS[scenario]():
+                # Ответы на прошлый шаг, пришедшие после паузы, не должны засчитываться этому
+                self.api.drain_events(user_id)
+                started = time.perf_counter()
+                self._push(user_id, step)
+                self.steps_sent += 1
+                event = await self.api.next_event(user_id, REPLY_TIMEOUT)
+                if event is None:
+                    self.timeouts += 1
+                else:
+                    self.step_latencies[scenario].append(event.at - started)
+                await asyncio.sleep(random.uniform(think_min, think_max))
+
+    async def run(self) -> dict:
+        runner = web.AppRunner(self.api.app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        session = InstrumentedAiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}"))
+        bot = Bot("123456:loadtest", session=session)
+        dp = create_dispatcher(create_fsm_storage())
+        timer = HandlerTimer()
+        for event_name, observer in dp.observers.items():
+            if event_name not in ("update", "error"):
+                observer.middleware(timer)
+
+        scheduler.start()
+        polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+        while not self.api.calls["getUpdates"]:
+            await asyncio.sleep(0.01)
+
+        started = time.perf_counter()
+        base_user = 10_000
+        await asyncio.gather(*(self.virtual_user(base_user + i) for i in range(self.args.users)))
+        elapsed = time.perf_counter() - started
+
+        await dp.stop_polling()
+        await polling
+        await bot.session.close()
+        scheduler.shutdown(wait=False)
+        await runner.cleanup()
+
+        handled = sum(len(values) for values in timer.durations.values())
+        all_steps = [value for values in self.step_latencies.values() for value in values]
+        return {
+            "config": {
+                "users": self.args.users,
+                "sessions": self.args.sessions,
+                "latency": self.args.latency,
+                "jitter": self.args.jitter,
+                "error_rate": self.args.error_rate,
+                "think": list(self.args.think),
+                "fsm_storage": os.environ["FSM_STORAGE"],
+            },
+            "duration_s": round(elapsed, 3),
+            "updates_sent": self.steps_sent,
+            "handlers_run": handled,
+            "throughput_updates_per_s": round(self.steps_sent / elapsed, 1),
+            "reply_timeouts": self.timeouts,
+            "response": {"all": summarize(all_steps), **{name: summarize(v) for name, v in self.step_latencies.items()}},
+            "handlers": {name: summarize(values) for name, values in sorted(timer.durations.items())},
+            "handler_errors": dict(timer.errors),
+            "api_calls": dict(self.api.calls),
+            "api_429_injected": dict(self.api.throttled),
+        }
+
+
+def print_report(report: dict):
+    print(f"Длительность: {report['duration_s']} с, апдейтов: {report['updates_sent']}, "
+          f"пропускная способность: {report['throughput_updates_per_s']} апд./с, "
+          f"без ответа: {report['reply_timeouts']}")
+    print(f"\n{'ответ бота (сквозной)':<56} {'n':>7} {'p50, мс':>9} {'p99, мс':>9}")
+    for name, stats in report["response"].items():
+        print(f"{name:<56} {stats['count']:>7} {stats['p50_ms']:>9} {stats['p99_ms']:>9}")
+    print(f"\n{'обработчик':<56} {'n':>7} {'p50, мс':>9} {'p99, мс':>9}")
+    for name, stats in report["handlers"].items():
+        print(f"{name:<56} {stats['count']:>7} {stats['p50_ms']:>9} {stats['p99_ms']:>9}")
+    if report["handler_errors"]:
+        print(f"\nОшибки обработчиков: {report['handler_errors']}")
+    print(f"\nВызовы API: {report['api_calls']}")
+    if report["api_429_injected"]:
+        print(f"Искусственные 429: {report['api_429_injected']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="одновременных виртуальных пользователей")
+    parser.add_argument("--sessions", type=int, default=10, help="сценариев на пользователя")
+    parser.add_argument("--mix", default="", help="доли сценариев, например calculator=0.7,faq=0.3")
+    parser.add_argument("--latency", type=float, default=0.02, help="задержка ответа Bot API, с")
+    parser.add_argument("--jitter", type=float, default=0.01, help="случайная добавка к задержке, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля исходящих вызовов с ответом 429")
+    parser.add_argument("--think", type=float, nargs=2, default=(0.05, 0.2), metavar=("MIN", "MAX"),
+                        help="пауза пользователя между шагами, с")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", help="сохранить отчет в JSON")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    logging.basicConfig(level=logging.WARNING)
+    # Ошибки обработчиков (например, от искусственных 429) попадают в отчет, трассировки не нужны
+    logging.getLogger("aiogram.event").setLevel(logging.CRITICAL)
+    try:
+        report = asyncio.run(LoadTest(args).run())
+    finally:
+        _tmpdir.cleanup()
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Синтетические сессии пользователей: последовательности апдейтов для реальных роутеров бота."""
+import random
+from dataclasses import dataclass
+
+from core.faq_manager import faq_store
+
+# Строки объема так, как их на самом деле пишут пользователи
+ENGINE_VOLUMES = ("1.5", "1,5", "2.0л", "1998", "2.4 T", "1.6", "3.0", "1500", "2,5 л", "0.9")
+FUELS = ("Бензин", "Бензин", "Бензин", "Дизель", "Гибрид", "Электро")
+COMMENTS = ("Li Auto L7 2022", "Интересует Zeekr 001", "Geely Monjaro, бюджет 3.5 млн", "Перезвоните вечером")
+
+
+@dataclass(frozen=True)
+class Step:
+    kind: str  # "text", "callback" или "contact"
+    value: str
+
+
+def calculator_session() -> list[Step]:
+    fuel = random.choice(FUELS)
+    steps = [
+        Step("text", "/start"),
+        Step("callback", "main_menu:calculator"),
+        Step("text", str(random.randrange(50_000, 500_000, 1000))),
+        Step("text", str(random.randint(2012, 2025))),
+        Step("callback", f"fuel_type:{fuel}"),
+    ]
+    if fuel != "Электро":
+        steps.append(Step("text", random.choice(ENGINE_VOLUMES)))
+    return steps
+
+
+def faq_session() -> list[Step]:
+    keys = list(faq_store.get_all()) or ["missing"]
+    steps = [Step("text", "/start"), Step("callback", "main_menu:faq")]
+    for key in random.sample(keys, k=min(len(keys), random.randint(1, 3))):
+        steps += [Step("callback", f"faq_{key}"), Step("callback", "back_to_faq")]
+    return steps
+
+
+def lead_session() -> list[Step]:
+    phone = f"+7999{random.randint(0, 9_999_999):07d}"
+    return [
+        Step("text", "/start"),
+        Step("callback", "main_menu:application"),
+        Step("contact", phone) if random.random() < 0.5 else Step("text", phone),
+        Step("text", random.choice(COMMENTS)),
+    ]
+
+
+def deep_link_session() -> list[Step]:
+    payload = random.choice(("calculator", "faq", "application"))
+    return [Step("text", f"/start {payload}")]
+
+
+SCENARIOS = {
+    "calculator": calculator_session,
+    "faq": faq_session,
+    "lead": lead_session,
+    "deep_link": deep_link_session,
+}
+DEFAULT_MIX = {"calculator": 0.5, "faq": 0.3, "lead": 0.15, "deep_link": 0.05}
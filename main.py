@@ -1,39 +1,119 @@
 import asyncio
+import hashlib
+import hmac
 import logging
-import os
+import time
 
 from aiogram import Bot, Dispatcher, types
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.filters.command import Command, CommandStart
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, BotCommand, BotCommandScopeChat
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
-from core.config import settings
-from core.settings_manager import load_settings, save_settings
-from bot_handlers import calculator, faq, admin, request, deep_links
+from core.config import settings, runtime
+from core.scheduler import scheduler
+from core.settings_manager import load_settings, save_settings, flush_settings
+from core.fsm_storage import create_fsm_storage
+from core.notifier import notifier
+from core.lead_store import lead_store
+from core.analytics import analytics
+from core.user_registry import user_registry
+from core.broadcast import broadcast_engine
+from core.health import health
+from core.metrics import metrics
+from core.telegram_session import InstrumentedAiohttpSession
+from middlewares import user_tracking
+from middlewares.metrics import setup_metrics
+from middlewares.profiling import setup_profiling
+from middlewares.throttling import setup_throttling
+from bot_handlers import calculator, faq, admin, request, deep_links, price_list, rates, leads, broadcast, stats, profiling
 import keyboards as kb
-from core.currency_updater import fetch_currency_rates
+from core.currency_updater import cbr_today, fetch_currency_rates, get_published_date, init_http_session, close_http_session
+from core.rate_history import rate_history
 
 
-# --- КОД ДЛЯ ВЕБ-СЕРВЕРА (KEEP-ALIVE) ---
+# --- КОД ДЛЯ ВЕБ-СЕРВЕРА (KEEP-ALIVE + WEBHOOK) ---
 async def web_server_handler(request):
     """Обработчик, отвечающий на HTTP-запросы для поддержания активности."""
     logging.info("Получен keep-alive запрос.")
     return web.Response(text="Bot is running!")
 
-async def run_web_server():
-    """Запускает фоновый веб-сервер на aiohttp."""
+async def healthz_handler(request):
+    """Процесс жив и цикл событий отвечает."""
+    return web.json_response({"status": "ok", "uptime": round(time.time() - health.started_at, 1)})
+
+async def readyz_handler(request):
+    """Готовность: апдейты приходят, хранилище доступно, очередь уведомлений не забита."""
+    ready, report = health.readiness()
+    return web.json_response(report, status=200 if ready else 503)
+
+async def metrics_handler(request):
+    """Метрики процесса в текстовом формате Prometheus. Доступны только с токеном METRICS_TOKEN."""
+    expected = f"Bearer {runtime.web.metrics_token}"
+    if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected.encode()):
+        raise web.HTTPUnauthorized(headers={"WWW-Authenticate": "Bearer"})
+    return web.Response(text=await metrics.render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+def create_web_app() -> web.Application:
+    """Создает aiohttp-приложение с keep-alive маршрутом, проверками состояния и метриками."""
     app = web.Application()
-    app.add_routes([web.get('/', web_server_handler)])
+    app.add_routes([
+        web.get('/', web_server_handler),
+        web.get('/healthz', healthz_handler),
+        web.get('/readyz', readyz_handler),
+    ])
+    # Сервер публичный (keep-alive, вебхук), поэтому метрики без токена не отдаем вовсе
+    if runtime.web.metrics_token:
+        app.router.add_get('/metrics', metrics_handler)
+    else:
+        logging.info("METRICS_TOKEN не задан, маршрут /metrics отключен")
+    return app
+
+def setup_webhook(app: web.Application, dp: Dispatcher, bot: Bot):
+    """
+    Подключает обработчик вебхука aiogram к веб-приложению.
+    Вебхук устанавливается при старте приложения.
+    """
+    web_config = runtime.web
+    secret = web_config.webhook_secret
+    if not secret:
+        # Секрет должен совпадать у всех процессов за балансировщиком, поэтому
+        # без WEBHOOK_SECRET он выводится из токена бота, а не генерируется случайно
+        secret = hashlib.sha256(f"webhook-secret:{bot.token}".encode()).hexdigest()
+        logging.warning("WEBHOOK_SECRET не задан, секрет вебхука получен из токена бота.")
+
+    async def on_startup(bot: Bot):
+        await bot.set_webhook(
+            url=web_config.webhook_url,
+            secret_token=secret,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logging.info(f"Вебхук установлен: {web_config.webhook_url}")
+
+    # Вебхук при остановке не удаляется: он общий для всех процессов, и остановка
+    # одного из них (например, при поочередном перезапуске) отключила бы остальные.
+    # При переходе на polling вебхук удаляется при запуске.
+    dp.startup.register(on_startup)
+
+    # Запросы без правильного X-Telegram-Bot-Api-Secret-Token отклоняются с 401
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret).register(app, path=web_config.webhook_path)
+    setup_application(app, dp, bot=bot)
+
+async def run_web_server(app: web.Application):
+    """Запускает веб-сервер на aiohttp и работает до отмены задачи."""
     runner = web.AppRunner(app)
     await runner.setup()
-    # Порт для хостингов типа Replit обычно берется из переменной окружения
-    port = int(os.environ.get("PORT", 8080))
-    site = web.TCPSite(runner, '0.0.0.0', port)
+    port = runtime.web.port
+    site = web.TCPSite(runner, runtime.web.host, port)
     await site.start()
-    logging.info(f"Веб-сервер для keep-alive запущен на порту {port}")
-    # Эта конструкция не даст задаче завершиться и будет ждать вечно
-    await asyncio.Event().wait()
+    logging.info(f"Веб-сервер запущен на порту {port}")
+    try:
+        # Эта конструкция не даст задаче завершиться и будет ждать вечно
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
 # --- КОНЕЦ КОДА ДЛЯ ВЕБ-СЕРВЕРА ---
 
 
@@ -46,62 +126,96 @@ async def update_and_save_rates():
         settings.rates.cny_to_rub = cny_rate
         settings.rates.eur_to_rub = eur_rate
         save_settings()
+        # Дописываем курсы в историю, чтобы потом считать "на дату" без запросов к ЦБ
+        published_date = get_published_date() or cbr_today()
+        await asyncio.to_thread(rate_history.add, published_date, cny_rate, eur_rate)
         logging.info(f"Курсы валют успешно обновлены: CNY={cny_rate}, EUR={eur_rate}")
     else:
         logging.warning("Не удалось обновить курсы валют. Используются последние сохраненные значения.")
 
 
-async def main():
-    """Основная функция для запуска бота."""
-    # --- ЗАГРУЗКА НАСТРОЕК ПРИ СТАРТЕ ---
-    load_settings()
+async def close_resources(bot: Bot):
+    """Освобождает ресурсы при остановке бота."""
+    # Дописываем отложенное сохранение настроек, чтобы не потерять последние изменения
+    await flush_settings(force=False)
+    await close_http_session()
+    await bot.session.close()
 
-    # Устанавливаем уровень логирования
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-    )
-    
-    # Первоначальное обновление курсов при запуске
-    await update_and_save_rates()
-    
-    # Настройка и запуск планировщика
-    scheduler = AsyncIOScheduler(timezone="Europe/Moscow")
-    scheduler.add_job(update_and_save_rates, 'cron', hour=11, minute=30)
-    scheduler.start()
 
-    if not settings.bot.token:
-        logging.critical("Не удалось получить токен бота. Проверьте переменную окружения BOT_TOKEN.")
-        return
+def create_dispatcher(storage: BaseStorage) -> Dispatcher:
+    """
+    Создает диспетчер со всеми middleware, обработчиками и хуками запуска/остановки.
+    Используется и ботом, и нагрузочным тестом (loadtest), чтобы проверялась одна и та же сборка.
+    """
+    dp = Dispatcher(storage=storage)
+    setup_metrics(dp, storage)
+    setup_profiling(dp)
+    # Флуд от одного пользователя отбрасывается до фильтров и обработчиков
+    setup_throttling(dp)
 
-    # Инициализация бота и диспетчера
-    bot = Bot(token=settings.bot.token)
-    dp = Dispatcher()
+    @dp.startup()
+    async def on_startup_storage():
+        if hasattr(storage, "start_compaction"):
+            storage.start_compaction()
+        # История курсов читается заранее, чтобы первый /quote_asof не разбирал файл в цикле событий
+        await rate_history.open()
+        health.start()
 
-    # --- Настройка команд в меню (для админов и обычных пользователей) ---
-    # 1. Команды для обычных пользователей (по умолчанию)
-    user_commands = [
-        BotCommand(command='/start', description='▶️ Запустить/Перезапустить бота')
-    ]
-    await bot.set_my_commands(user_commands)
+    @dp.shutdown()
+    async def on_shutdown_health():
+        await health.stop()
 
-    # 2. Расширенные команды для администраторов
-    admin_commands = [
-        BotCommand(command='/start', description='▶️ Запустить/Перезапустить бота'),
-        BotCommand(command='/admin', description='Панель администратора')
-    ]
-    # Устанавливаем персональные команды для каждого админа
-    for admin_id in settings.bot.admin_ids:
-        try:
-            await bot.set_my_commands(admin_commands, scope=BotCommandScopeChat(chat_id=admin_id))
-        except Exception as e:
-            logging.error(f"Не удалось установить команды для админа {admin_id}: {e}")
-    # --- Конец настройки команд ---
+    @dp.startup()
+    async def on_startup_notifier(bot: Bot):
+        await notifier.start(bot)
+
+    @dp.shutdown()
+    async def on_shutdown_notifier():
+        # Дожидаемся отправки уже принятых уведомлений
+        await notifier.stop()
+
+    @dp.startup()
+    async def on_startup_leads():
+        await lead_store.open()
+        await analytics.start()
+
+    # Все пользователи попадают в реестр (запись в базу - пачками в фоне)
+    dp.update.outer_middleware(user_tracking)
+
+    @dp.startup()
+    async def on_startup_broadcasts(bot: Bot):
+        await user_registry.open()
+        user_tracking.start()
+        # Продолжаем прерванные перезапуском рассылки
+        await broadcast_engine.start(bot)
+
+    @dp.shutdown()
+    async def on_shutdown_broadcasts():
+        await broadcast_engine.stop()
+        await user_tracking.stop()
+        await user_registry.close()
+
+    @dp.shutdown()
+    async def on_shutdown_leads():
+        # Записываем накопленные заявки и расчеты
+        await lead_store.close()
+        await analytics.stop()
 
+    @dp.shutdown()
+    async def on_shutdown_storage():
+        # Диспетчер сам хранилище не закрывает: останавливаем уборку и закрываем базу диалогов.
+        # Хук зарегистрирован последним, чтобы остальные хуки остановки успели отработать
+        await storage.close()
 
     # --- РЕГИСТРАЦИЯ ОБРАБОТЧИКОВ ---
     # Подключаем роутеры из других файлов
     dp.include_router(admin.router) # Админ-роутер должен быть первым, чтобы его фильтры проверялись раньше
+    dp.include_router(price_list.router)
+    dp.include_router(rates.router)
+    dp.include_router(leads.router)
+    dp.include_router(broadcast.router)
+    dp.include_router(stats.router)
+    dp.include_router(profiling.router)
     # Этот обработчик должен быть зарегистрирован после admin.router, чтобы не перекрывать его фильтры
     @dp.message(Command("admin"))
     async def admin_panel_command(message: types.Message):
@@ -120,7 +234,8 @@ async def main():
     async def send_welcome(message: types.Message):
         """Отправляет приветственное сообщение с основной клавиатурой."""
         user_id = message.from_user.id
-        
+        # Если /start пришел посреди заявки, отложенная кнопка телефона уже не нужна
+        request.cancel_phone_keyboard(message.chat.id)
         welcome_text = (
             f"Здравствуйте, {message.from_user.full_name}!\n\n"
             "Я ваш личный помощник по заказу автомобилей из Китая. Что мы можем сделать:\n\n"
@@ -136,26 +251,119 @@ async def main():
         keyboard = kb.get_main_inline_keyboard(user_id in settings.bot.admin_ids)
         await message.answer(welcome_text, parse_mode="Markdown", reply_markup=keyboard)
 
-    # ------------------------------------
+    return dp
+
+
+async def setup_bot_commands(bot: Bot):
+    """Настраивает меню команд для пользователей и администраторов."""
+    # 1. Команды для обычных пользователей (по умолчанию)
+    user_commands = [
+        BotCommand(command='/start', description='▶️ Запустить/Перезапустить бота')
+    ]
+    await bot.set_my_commands(user_commands)
+
+    # 2. Расширенные команды для администраторов
+    admin_commands = [
+        BotCommand(command='/start', description='▶️ Запустить/Перезапустить бота'),
+        BotCommand(command='/admin', description='Панель администратора'),
+        BotCommand(command='/cache_stats', description='Статистика кэшей'),
+        BotCommand(command='/quote_asof', description='Расчет по курсам на дату'),
+        BotCommand(command='/requests_new', description='Новые заявки'),
+        BotCommand(command='/request_info', description='Карточка заявки'),
+        BotCommand(command='/request_status', description='Сменить статус заявки'),
+        BotCommand(command='/requests_export', description='Выгрузка заявок (CSV)'),
+        BotCommand(command='/stats_export', description='Выгрузка расчетов (CSV)'),
+        BotCommand(command='/stats_users', description='Статистика пользователей'),
+        BotCommand(command='/stats_activity', description='Активность по часам и дням'),
+        BotCommand(command='/stats_requests', description='Воронки расчетов и заявок'),
+        BotCommand(command='/broadcast_preview', description='Предпросмотр рассылки'),
+        BotCommand(command='/broadcast', description='Рассылка всем пользователям'),
+        BotCommand(command='/broadcast_schedule', description='Запланировать рассылку'),
+        BotCommand(command='/profile', description='Профилирование обработчиков')
+    ]
+    # Устанавливаем персональные команды для каждого админа
+    for admin_id in settings.bot.admin_ids:
+        try:
+            await bot.set_my_commands(admin_commands, scope=BotCommandScopeChat(chat_id=admin_id))
+        except Exception as e:
+            logging.error(f"Не удалось установить команды для админа {admin_id}: {e}")
+
+
+async def main():
+    """Основная функция для запуска бота."""
+    # --- ЗАГРУЗКА НАСТРОЕК ПРИ СТАРТЕ ---
+    load_settings()
+
+    # Устанавливаем уровень логирования
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    )
+    
+    # Общая HTTP-сессия для внешних запросов (курсы ЦБ) живет все время работы бота
+    await init_http_session()
+
+    # Первоначальное обновление курсов при запуске выполняется в фоне,
+    # чтобы медленный ответ ЦБ не задерживал старт бота
+    rates_task = asyncio.create_task(update_and_save_rates())
+    
+    # Настройка и запуск общего планировщика
+    scheduler.add_job(update_and_save_rates, 'cron', hour=11, minute=30)
+    scheduler.start()
+
+    if not settings.bot.token:
+        logging.critical("Не удалось получить токен бота. Проверьте переменную окружения BOT_TOKEN.")
+        await rates_task
+        await close_http_session()
+        return
+
+    # Конфигурацию проверяем до создания бота, чтобы не оставлять открытой его HTTP-сессию
+    if runtime.web.use_webhook and not runtime.web.webhook_base_url:
+        logging.critical("Режим webhook требует переменную окружения WEBHOOK_URL.")
+        await rates_task
+        await close_http_session()
+        return
+
+    # Инициализация бота и диспетчера
+    # Сессия замеряет задержки и ошибки запросов к Bot API для /metrics
+    bot = Bot(token=settings.bot.token, session=InstrumentedAiohttpSession())
+    # Хранилище состояний диалогов (по умолчанию SQLite, переживает перезапуск)
+    storage = create_fsm_storage()
+    dp = create_dispatcher(storage)
+    await setup_bot_commands(bot)
+
+    app = create_web_app()
+
+    if runtime.web.use_webhook:
+        setup_webhook(app, dp, bot)
+        try:
+            logging.info("Бот запускается в режиме webhook...")
+            await run_web_server(app)
+        except Exception as e:
+            logging.error(f"Ошибка при работе бота: {e}")
+        finally:
+            await close_resources(bot)
+        return
 
     # Создаем фоновую задачу для веб-сервера
-    web_server_task = asyncio.create_task(run_web_server())
+    web_server_task = asyncio.create_task(run_web_server(app))
 
     # Запуск бота
     try:
         logging.info("Бот запускается в режиме long polling...")
+        # Если ранее бот работал через вебхук, getUpdates не будет работать до его удаления
+        await bot.delete_webhook()
         await dp.start_polling(bot)
     except Exception as e:
         logging.error(f"Ошибка при запуске бота: {e}")
     finally:
-        await bot.session.close()
+        await close_resources(bot)
         # При остановке бота, отменяем и задачу веб-сервера
         web_server_task.cancel()
 
 
 if __name__ == "__main__":
-    # На Replit, для постоянной работы, нужно будет использовать веб-хуки или keep-alive.
-    # Для начала разработки достаточно простого запуска.
+    # Режим работы задается переменной окружения BOT_MODE: polling (по умолчанию) или webhook.
     try:
         asyncio.run(main())
     except (KeyboardInterrupt, SystemExit):
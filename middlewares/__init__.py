@@ -0,0 +1,3 @@
+from .user_tracking import UserTrackingMiddleware, user_tracking
+
+__all__ = ["UserTrackingMiddleware", "user_tracking"]
@@ -0,0 +1,109 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import TelegramObject, Update
+
+from core.calculation_cache import calculation_cache
+from core.currency_updater import get_rates_age
+from core.faq_manager import faq_store
+from core.health import health
+from core.metrics import (
+    CACHE_HIT_RATIO,
+    CACHE_REQUESTS,
+    CURRENCY_RATES_AGE,
+    FSM_STATES,
+    HANDLER_ERRORS,
+    HANDLER_SECONDS,
+    UPDATE_SECONDS,
+    UPDATES_TOTAL,
+    metrics,
+)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Внешний middleware: количество и полное время обработки апдейтов по типам."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        update_type = event.event_type
+        UPDATES_TOTAL.inc(type=update_type)
+        health.mark_update()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            UPDATE_SECONDS.observe(time.perf_counter() - started, type=update_type)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Внутренний middleware: время выполнения и ошибки конкретных обработчиков."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object: HandlerObject | None = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        name = f"{callback.__module__}.{callback.__name__}" if callback else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, handler=name)
+
+
+def _count_memory_states(storage: MemoryStorage) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for record in storage.storage.values():
+        if record.state is not None:
+            counts[record.state] = counts.get(record.state, 0) + 1
+    return counts
+
+
+def setup_metrics(dp: Dispatcher, storage: BaseStorage):
+    """Подключает сбор метрик к диспетчеру и регистрирует коллекторы для /metrics."""
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    # Внутренние middleware родительского роутера применяются ко всем вложенным роутерам
+    handler_metrics = HandlerMetricsMiddleware()
+    for event_name, observer in dp.observers.items():
+        if event_name not in ("update", "error"):
+            observer.middleware(handler_metrics)
+
+    async def collect_fsm_states():
+        if hasattr(storage, "count_states"):
+            counts = await storage.count_states()
+        elif isinstance(storage, MemoryStorage):
+            counts = _count_memory_states(storage)
+        else:
+            return
+        FSM_STATES.clear()
+        for state, count in counts.items():
+            FSM_STATES.set(count, state=state)
+
+    async def collect_caches():
+        for cache_name, stats in (("calculation", calculation_cache.stats()), ("faq", faq_store.stats())):
+            CACHE_HIT_RATIO.set(stats["hit_ratio"], cache=cache_name)
+            CACHE_REQUESTS.set(stats["hits"], cache=cache_name, result="hit")
+            CACHE_REQUESTS.set(stats["misses"], cache=cache_name, result="miss")
+
+    async def collect_currency():
+        age = get_rates_age()
+        if age is not None:
+            CURRENCY_RATES_AGE.set(age)
+
+    metrics.add_collector(collect_fsm_states)
+    metrics.add_collector(collect_caches)
+    metrics.add_collector(collect_currency)
@@ -0,0 +1,48 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject
+
+from core.config import runtime
+from core.profiler import HandlerProfiler, profiler
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    """Внутренний middleware: время, CPU и запросы к Bot API каждого обработчика."""
+
+    def __init__(self, handler_profiler: HandlerProfiler):
+        self.profiler = handler_profiler
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        callback = getattr(data.get("handler"), "callback", None)
+        # Роутеры в проекте - по одному на модуль, поэтому модуль и есть имя роутера
+        key = (callback.__module__.rsplit(".", 1)[-1], callback.__name__) if callback else ("unknown", "unknown")
+        call, token = self.profiler.begin_call()
+        wall_started, cpu_started = time.perf_counter(), time.thread_time()
+        failed = False
+        try:
+            return await handler(event, data)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.profiler.end_call(token)
+            self.profiler.record(
+                key, time.perf_counter() - wall_started, time.thread_time() - cpu_started, call, failed
+            )
+
+
+def setup_profiling(dp: Dispatcher):
+    """
+    Готовит профилирование для диспетчера. Middleware подключается только
+    командой /profile start или переменной окружения PROFILE_HANDLERS.
+    """
+    profiler.attach(dp, ProfilingMiddleware(profiler))
+    if runtime.profiling.enabled:
+        profiler.start()
@@ -0,0 +1,148 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import CallbackQuery, Message, TelegramObject, User
+
+from core.config import runtime, settings
+from core.metrics import THROTTLE_TRACKED_USERS, THROTTLED_UPDATES
+
+# Как часто забывать пользователей, которые перестали писать
+THROTTLE_EVICT_INTERVAL = 60.0
+THROTTLE_NOTICE = "⏳ Слишком часто. Подождите пару секунд и повторите."
+
+
+class _UserWindow:
+    """
+    Состояние одного пользователя: счетчики скользящего окна (текущее и прошлое окно)
+    и отпечаток последнего нажатия кнопки. Размер не зависит от активности пользователя:
+    вместе с записью в словаре около 250 байт (см. benchmarks/bench_throttling.py).
+    """
+
+    __slots__ = ("window_start", "current", "previous", "notified_at", "callback_key", "callback_at")
+
+    def __init__(self, now: float):
+        self.window_start = now
+        self.current = 0
+        self.previous = 0
+        self.notified_at = 0.0
+        self.callback_key = 0
+        self.callback_at = 0.0
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Внешний middleware сообщений и нажатий кнопок: ограничивает частоту апдейтов
+    от одного пользователя, чтобы флуд не расходовал общий лимит Bot API.
+
+    Частота считается скользящим окном по двум счетчикам (прошлое окно учитывается
+    пропорционально перекрытию), поэтому на пользователя хранится несколько чисел,
+    а не журнал отметок времени. Отброшенный апдейт не доходит до фильтров и
+    обработчиков; о превышении пользователь узнает не чаще раза за окно.
+    Повторное нажатие той же кнопки того же сообщения в течение debounce
+    секунд отбрасывается молча. На отброшенные нажатия кнопок все равно
+    отправляется пустой ответ. Администраторы не ограничиваются.
+    """
+
+    def __init__(self, limit: int, window: float, debounce: float):
+        self.limit = limit
+        self.window = window
+        self.debounce = debounce
+        self._users: dict[int, _UserWindow] = {}
+        self._evicted_at = time.monotonic()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        if user is None or user.id in settings.bot.admin_ids:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        if now - self._evicted_at >= THROTTLE_EVICT_INTERVAL:
+            self.evict(now)
+        state = self._users.get(user.id)
+        if state is None:
+            state = self._users[user.id] = _UserWindow(now)
+
+        if isinstance(event, CallbackQuery):
+            key = hash((event.data, event.message.message_id if event.message else 0))
+            if key == state.callback_key and now - state.callback_at < self.debounce:
+                THROTTLED_UPDATES.inc(reason="duplicate")
+                await self._answer_silently(event)
+                return None
+            state.callback_key, state.callback_at = key, now
+
+        if not self._hit(state, now):
+            THROTTLED_UPDATES.inc(reason="rate")
+            if now - state.notified_at >= self.window:
+                state.notified_at = now
+                await self._notify(event)
+            elif isinstance(event, CallbackQuery):
+                await self._answer_silently(event)
+            return None
+        return await handler(event, data)
+
+    def _hit(self, state: _UserWindow, now: float) -> bool:
+        """Учитывает апдейт, если пользователь укладывается в лимит."""
+        elapsed = now - state.window_start
+        if elapsed >= self.window:
+            passed = int(elapsed // self.window)
+            state.previous = state.current if passed == 1 else 0
+            state.current = 0
+            state.window_start += passed * self.window
+            elapsed -= passed * self.window
+        estimated = state.previous * (1 - elapsed / self.window) + state.current
+        if estimated >= self.limit:
+            return False
+        state.current += 1
+        return True
+
+    @staticmethod
+    async def _notify(event: Message | CallbackQuery):
+        try:
+            # Для кнопки это всплывающая подсказка, а не новое сообщение в чат
+            await event.answer(THROTTLE_NOTICE)
+        except Exception as e:
+            logging.warning(f"Не удалось предупредить пользователя об ограничении частоты: {e}")
+
+    @staticmethod
+    async def _answer_silently(event: CallbackQuery):
+        """Без ответа на нажатие у пользователя до таймаута крутятся "часики" на кнопке."""
+        try:
+            await event.answer()
+        except Exception as e:
+            logging.warning(f"Не удалось ответить на отброшенное нажатие кнопки: {e}")
+
+    def evict(self, now: float | None = None) -> int:
+        """Забывает пользователей без апдейтов дольше двух окон. Возвращает, сколько забыто."""
+        now = time.monotonic() if now is None else now
+        # Через два окна оба счетчика гарантированно обнулились бы
+        idle_before = now - 2 * self.window
+        before = len(self._users)
+        self._users = {
+            user_id: state for user_id, state in self._users.items()
+            if state.window_start >= idle_before or now - state.callback_at < self.debounce
+        }
+        self._evicted_at = now
+        THROTTLE_TRACKED_USERS.set(len(self._users))
+        return before - len(self._users)
+
+    @property
+    def tracked_users(self) -> int:
+        return len(self._users)
+
+
+def setup_throttling(dp: Dispatcher) -> ThrottlingMiddleware | None:
+    """Подключает ограничение частоты к сообщениям и нажатиям кнопок (если оно включено)."""
+    config = runtime.throttling
+    if config.limit <= 0:
+        return None
+    throttling = ThrottlingMiddleware(config.limit, config.window, config.debounce)
+    dp.message.outer_middleware(throttling)
+    dp.callback_query.outer_middleware(throttling)
+    return throttling
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from core.user_registry import UserRegistry, user_registry, user_row
+
+# Как часто сбрасывать накопленных пользователей в базу
+TRACKING_FLUSH_INTERVAL = 10.0
+# Досрочный сброс, если буфер вырос до такого размера
+TRACKING_FLUSH_SIZE = 1000
+# Повторный визит в течение этого времени не обновляет last_seen
+TRACKING_SEEN_TTL = 300.0
+
+
+class UserTrackingMiddleware(BaseMiddleware):
+    """
+    Внешний middleware диспетчера: записывает пользователей в реестр.
+    На обработку апдейта не добавляет обращений к базе - пользователь
+    попадает в буфер (не чаще раза в TRACKING_SEEN_TTL), а буфер сбрасывается
+    в базу пачкой фоновой задачей.
+    """
+
+    def __init__(self, registry: UserRegistry):
+        self.registry = registry
+        # user_id -> когда пользователь последний раз попал в буфер
+        self._seen: dict[int, float] = {}
+        # user_id -> строка для записи (повторные визиты схлопываются)
+        self._buffer: dict[int, tuple] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._early_flush: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        if user is not None and not user.is_bot:
+            self.track(user)
+        return await handler(event, data)
+
+    def track(self, user: User):
+        now = time.time()
+        seen_at = self._seen.get(user.id)
+        if seen_at is not None and now - seen_at < TRACKING_SEEN_TTL:
+            return
+        self._seen[user.id] = now
+        self._buffer[user.id] = user_row(user, now)
+        if len(self._buffer) >= TRACKING_FLUSH_SIZE:
+            self._wake_flush()
+
+    def _wake_flush(self):
+        if self._flush_task is not None and (self._early_flush is None or self._early_flush.done()):
+            self._early_flush = asyncio.create_task(self.flush())
+
+    async def flush(self) -> int:
+        """Записывает буфер в реестр. Возвращает количество записанных пользователей."""
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+            rows, self._buffer = list(self._buffer.values()), {}
+            try:
+                await self.registry.upsert_many(rows)
+            except Exception as e:
+                logging.error(f"Не удалось записать пользователей в реестр: {e}")
+                # Вернем в буфер, чтобы записать при следующем сбросе
+                for row in rows:
+                    self._buffer.setdefault(row[0], row)
+                return 0
+            # Забываем давние визиты, чтобы "недавно виденные" не росли бесконечно
+            expired_before = time.time() - TRACKING_SEEN_TTL
+            self._seen = {user_id: seen for user_id, seen in self._seen.items() if seen >= expired_before}
+            return len(rows)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(TRACKING_FLUSH_INTERVAL)
+            await self.flush()
+
+    def start(self):
+        """Запускает периодический сброс буфера (вызывается при старте бота)."""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop(), name="user-tracking-flush")
+
+    async def stop(self):
+        """Останавливает сброс и записывает остаток буфера."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+
+
+user_tracking = UserTrackingMiddleware(user_registry)
@@ -0,0 +1,18 @@
+from core.csv_export import _calculation_row, _lead_row
+
+
+def test_lead_row_neutralizes_formulas_in_user_text():
+    row = (7, 0.0, 0.0, "new", 42, "=HYPERLINK(\"http://x\")", "@user", "+79990000000", "-1+2", None)
+
+    converted = _lead_row(row)
+
+    assert converted[0] == 7 and converted[4] == 42 and converted[9] is None
+    assert converted[5:9] == ["'=HYPERLINK(\"http://x\")", "'@user", "'+79990000000", "'-1+2"]
+
+
+def test_plain_values_are_unchanged():
+    lead = _lead_row((1, 0.0, 0.0, "new", 42, "Иван", None, "89990000000", "Toyota Camry", 3))
+    calc = _calculation_row((1, 0.0, 42, 100000.0, 2020, 2.0, "Бензин", "\tfiz", -5.0))
+
+    assert lead[5:10] == ["Иван", None, "89990000000", "Toyota Camry", 3]
+    assert calc[2:] == [42, 100000.0, 2020, 2.0, "Бензин", "'\tfiz", -5.0]
@@ -0,0 +1,130 @@
+import asyncio
+import datetime
+import os
+from decimal import Decimal
+
+import pytest
+from aiohttp import web
+
+from core import currency_updater
+from core.currency_updater import CbrDailyStreamParser, parse_cbr_daily
+
+SAMPLE_FEED = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "data", "cbr_daily_sample.xml")
+FEED_DATE = datetime.date(2026, 10, 17)
+
+
+def _feed() -> bytes:
+    with open(SAMPLE_FEED, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(currency_updater, "_feed_state", currency_updater._FeedState())
+    monkeypatch.setattr(currency_updater, "_backoff_delay", lambda attempt: 0)
+    # Дата публикации в образце позже "сегодня", чтобы кэш не мешал запросам
+    monkeypatch.setattr(currency_updater, "cbr_today", lambda: FEED_DATE + datetime.timedelta(days=1))
+
+
+def _serve(responses: list, requests: list):
+    """Заглушка ЦБ: отдает ответы по очереди и запоминает заголовки запросов."""
+
+    async def handler(request):
+        requests.append(dict(request.headers))
+        status, body = responses.pop(0)
+        if status == 200:
+            response = web.StreamResponse(headers={"ETag": '"v1"', "Content-Type": "application/xml"})
+            await response.prepare(request)
+            # Отдаем документ небольшими кусками, как медленный сервер
+            for start in range(0, len(body), 500):
+                await response.write(body[start:start + 500])
+            await response.write_eof()
+            return response
+        return web.Response(status=status)
+
+    app = web.Application()
+    app.router.add_get("/daily", handler)
+    return app
+
+
+async def _with_server(app, scenario):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await scenario(f"http://127.0.0.1:{port}/daily")
+    finally:
+        await currency_updater.close_http_session()
+        await runner.cleanup()
+
+
+def test_200_then_304_with_etag():
+    requests = []
+    app = _serve([(200, _feed()), (304, b"")], requests)
+
+    async def scenario(url):
+        first = await currency_updater.fetch_rates(url=url)
+        confirmed = currency_updater._feed_state.confirmed_at
+        second = await currency_updater.fetch_rates(url=url, force=True)
+        return first, second, confirmed
+
+    first, second, confirmed = asyncio.run(_with_server(app, scenario))
+    assert set(first) == {"CNY", "EUR"}
+    assert second == first
+    assert "If-None-Match" not in requests[0]
+    assert requests[1]["If-None-Match"] == '"v1"'
+    assert currency_updater.get_published_date() == FEED_DATE
+    assert currency_updater._feed_state.confirmed_at >= confirmed
+
+
+def test_retry_after_server_error():
+    requests = []
+    app = _serve([(503, b""), (500, b""), (200, _feed())], requests)
+
+    rates = asyncio.run(_with_server(app, lambda url: currency_updater.fetch_rates(url=url)))
+    assert len(requests) == 3
+    assert rates == parse_cbr_daily(_feed())[1]
+
+
+def test_gives_up_after_max_attempts():
+    requests = []
+    app = _serve([(500, b"")] * currency_updater.MAX_ATTEMPTS, requests)
+
+    rates = asyncio.run(_with_server(app, lambda url: currency_updater.fetch_rates(url=url)))
+    assert rates == {}
+    assert len(requests) == currency_updater.MAX_ATTEMPTS
+
+
+def test_streaming_parse_matches_full_document():
+    data = _feed()
+    published, expected = parse_cbr_daily(data)
+    assert published == FEED_DATE
+    assert all(isinstance(rate, Decimal) and rate > 0 for rate in expected.values())
+
+    parser = CbrDailyStreamParser()
+    fed = 0
+    for fed in range(1, len(data) + 1):
+        if parser.feed(data[fed - 1:fed]):
+            break
+    assert parser.rates == expected
+    # Разбор останавливается на последней нужной валюте, не дочитывая документ
+    assert parser.done and fed < len(data)
+
+
+def test_skip_when_rates_for_today_are_loaded(monkeypatch):
+    state = currency_updater._feed_state
+    state.published_date = FEED_DATE
+    state.rates = {"CNY": Decimal("11.5"), "EUR": Decimal("95.1")}
+    state.confirmed_at = 0.0
+    monkeypatch.setattr(currency_updater, "cbr_today", lambda: FEED_DATE)
+
+    async def no_session():
+        raise AssertionError("запрос к ЦБ не должен выполняться")
+
+    monkeypatch.setattr(currency_updater, "get_http_session", no_session)
+    rates = asyncio.run(currency_updater.fetch_rates())
+    assert rates == state.rates
+    # Свежесть курсов для /readyz обновляется и без запроса
+    assert currency_updater.get_rates_age() < 5
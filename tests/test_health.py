@@ -0,0 +1,24 @@
+import asyncio
+
+from core.health import HealthMonitor
+
+
+def test_storage_pending_until_first_probe(tmp_path, monkeypatch):
+    monitor = HealthMonitor()
+    monitor.mark_poll()
+    monkeypatch.setattr(HealthMonitor, "storage_directories", staticmethod(lambda: [str(tmp_path)]))
+
+    ready, report = monitor.readiness()
+    assert report["checks"]["storage"]["status"] == "pending"
+    assert ready
+
+    asyncio.run(monitor.probe_storage())
+    ready, report = monitor.readiness()
+    assert report["checks"]["storage"]["status"] == "ok"
+    assert ready
+
+    monkeypatch.setattr(HealthMonitor, "storage_directories", staticmethod(lambda: [str(tmp_path / "missing")]))
+    asyncio.run(monitor.probe_storage())
+    ready, report = monitor.readiness()
+    assert report["checks"]["storage"]["status"] == "fail"
+    assert not ready
@@ -0,0 +1,59 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from core.lead_store import LeadStore
+
+
+def test_create_lead_requires_open(tmp_path):
+    store = LeadStore(str(tmp_path / "leads.db"))
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await store.create_lead(user_id=1, phone="+79990000000", comment=None)
+
+    asyncio.run(scenario())
+
+
+def test_lead_ids_come_from_database_and_do_not_collide(tmp_path):
+    path = str(tmp_path / "leads.db")
+
+    async def scenario():
+        # Два процесса с одним файлом базы моделируются двумя хранилищами
+        first, second = LeadStore(path), LeadStore(path)
+        await first.open()
+        await second.open()
+        leads = await asyncio.gather(*(
+            store.create_lead(user_id=index, phone=f"+7999000000{index}", comment="тест")
+            for index, store in enumerate([first, second] * 3)
+        ))
+        await first.close()
+        await second.close()
+        return leads
+
+    leads = asyncio.run(scenario())
+    assert sorted(lead.id for lead in leads) == [1, 2, 3, 4, 5, 6]
+    rows = sqlite3.connect(path).execute("SELECT id, user_id FROM leads ORDER BY id").fetchall()
+    assert {(lead.id, lead.user_id) for lead in leads} == set(rows)
+
+
+def test_failed_record_does_not_drop_batch(tmp_path):
+    store = LeadStore(str(tmp_path / "leads.db"))
+
+    async def scenario():
+        await store.open()
+        store.record_calculation(1, {"car_price_cny": 100000, "year": 2020}, 1_500_000)
+        # phone NOT NULL: эта заявка будет отклонена базой
+        rejected = store.create_lead(user_id=1, phone=None, comment=None)
+        accepted = store.create_lead(user_id=1, phone="+79990000000", comment=None)
+        results = await asyncio.gather(rejected, accepted, return_exceptions=True)
+        lead = await store.get(results[1].id)
+        await store.close()
+        return results, lead
+
+    (rejected, accepted), lead = asyncio.run(scenario())
+    assert isinstance(rejected, sqlite3.IntegrityError)
+    assert accepted.id == 1
+    # Расчет из той же пачки сохранен и привязан к заявке
+    assert lead.calculation["total_rub"] == 1_500_000
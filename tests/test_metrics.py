@@ -0,0 +1,20 @@
+import pytest
+
+from core.metrics import Counter, _Metric
+
+
+def test_metric_base_is_abstract():
+    with pytest.raises(TypeError):
+        _Metric("bot_test", "тест")
+
+
+def test_counter_render():
+    counter = Counter("bot_test_total", "Тестовый счетчик", labels=("kind",))
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+
+    assert counter.render().splitlines() == [
+        "# HELP bot_test_total Тестовый счетчик",
+        "# TYPE bot_test_total counter",
+        'bot_test_total{kind="a"} 3',
+    ]
@@ -0,0 +1,62 @@
+import csv
+import datetime
+import io
+
+import pytest
+
+from bot_handlers.price_list import RESULT_COLUMNS, price_csv
+from core.calculator_logic import calculate_total_cost, calculate_total_cost_batch
+from core.config import settings
+
+CURRENT_YEAR = datetime.date.today().year
+
+
+def _read(priced: bytes) -> list[dict]:
+    return list(csv.DictReader(io.StringIO(priced.decode("utf-8-sig"))))
+
+
+def test_bad_rows_are_marked_and_good_rows_priced():
+    data = (
+        "price_cny,year,engine_volume,fuel_type\n"
+        "100000,2020,1.5,\n"
+        "200000,abc,2.0,\n"
+        "nan,2020,1.5,\n"
+        "inf,2020,1.5,\n"
+        "150000,2021,много,\n"
+        "300000,2023,,Электро\n"
+    ).encode()
+
+    priced, computed, failed = price_csv(data)
+    rows = _read(priced)
+
+    assert (computed, failed) == (2, 4)
+    assert [row["error"] for row in rows] == [
+        "", "некорректный год", "некорректная стоимость", "некорректная стоимость", "некорректный объем", "",
+    ]
+    assert rows[0]["total_cost_rub"] and rows[5]["total_cost_rub"]
+    assert all(row["total_cost_rub"] == "" for row in rows[1:5])
+
+
+@pytest.mark.parametrize("fuel", ["Бензин", "Электро"])
+@pytest.mark.parametrize("payer", ["Физическое лицо", "Юридическое лицо"])
+def test_batch_matches_single_calculation(fuel, payer):
+    prices = [50_000.0, 120_000.0, 300_000.0, 800_000.0]
+    years = [CURRENT_YEAR, CURRENT_YEAR - 2, CURRENT_YEAR - 4, CURRENT_YEAR - 9]
+    volumes = [998.0, 1800.0, 2999.0, 3600.0]
+    size = len(prices)
+
+    batch = calculate_total_cost_batch(prices, years, volumes, [fuel] * size, [payer] * size, settings)
+
+    for i in range(size):
+        single = calculate_total_cost({
+            "car_price_cny": prices[i],
+            "year": years[i],
+            "engine_volume": 0 if fuel == "Электро" else volumes[i],
+            "fuel_type": fuel,
+            "payer_type": payer,
+        }, settings)
+        for name in RESULT_COLUMNS:
+            single_value = getattr(single.customs, name, None)
+            if single_value is None:
+                single_value = getattr(single, name)
+            assert getattr(batch, name)[i] == pytest.approx(single_value), name
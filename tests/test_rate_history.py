@@ -0,0 +1,83 @@
+import asyncio
+import datetime
+
+from core.rate_history import RECORD, RateHistory
+
+
+def test_record_is_20_bytes_and_appended_as_is(tmp_path):
+    path = tmp_path / "rates.bin"
+    history = RateHistory(str(path))
+    history.add(datetime.date(2024, 3, 1), 12.5, 99.25)
+
+    data = path.read_bytes()
+    assert RECORD.size == 20
+    assert data == RECORD.pack(datetime.date(2024, 3, 1).toordinal(), 12.5, 99.25)
+
+
+def test_reload_skips_truncated_tail_and_keeps_last_duplicate(tmp_path):
+    path = tmp_path / "rates.bin"
+    history = RateHistory(str(path))
+    history.add(datetime.date(2024, 3, 1), 12.5, 99.0)
+    history.add(datetime.date(2024, 3, 1), 12.6, 99.5)
+    # Недописанная запись после сбоя
+    with open(path, "ab") as f:
+        f.write(RECORD.pack(datetime.date(2024, 3, 2).toordinal(), 1.0, 1.0)[:7])
+
+    reloaded = RateHistory(str(path))
+    assert len(reloaded) == 1
+    rates = reloaded.rates_on(datetime.date(2024, 3, 1))
+    assert (rates.cny_to_rub, rates.eur_to_rub) == (12.6, 99.5)
+
+
+def test_import_csv_and_rates_on(tmp_path):
+    csv_path = tmp_path / "rates.csv"
+    csv_path.write_text(
+        "date,cny,eur\n"
+        "01.03.2024,\"12,5\",\"99,25\"\n"
+        "05.03.2024,12.7,100.1\n"
+        "01.03.2024,12.5,99.25\n",
+        encoding="utf-8",
+    )
+    history = RateHistory(str(tmp_path / "rates.bin"))
+
+    # Повтор уже известных курсов не считается новой записью
+    assert history.import_csv(str(csv_path)) == 2
+    assert history.date_range() == (datetime.date(2024, 3, 1), datetime.date(2024, 3, 5))
+    assert history.rates_on(datetime.date(2024, 2, 29)) is None
+    # Между датами действуют последние опубликованные курсы
+    assert history.rates_on(datetime.date(2024, 3, 4)).cny_to_rub == 12.5
+    assert history.rates_on(datetime.date(2024, 3, 5)).eur_to_rub == 100.1
+    assert (tmp_path / "rates.bin").stat().st_size == 2 * RECORD.size
+
+
+def test_open_loads_history(tmp_path):
+    path = tmp_path / "rates.bin"
+    RateHistory(str(path)).add(datetime.date(2024, 3, 1), 12.5, 99.25)
+
+    history = RateHistory(str(path))
+    asyncio.run(history.open())
+    assert history._loaded
+    assert len(history) == 1
+
+
+def test_quote_as_of_uses_age_on_that_date(tmp_path, monkeypatch):
+    from core import calculator_logic
+    from core.config import settings
+    from core.tariff_tables import get_tariff_tables
+
+    history = RateHistory(str(tmp_path / "rates.bin"))
+    as_of = datetime.date(2022, 6, 1)
+    history.add(as_of, 9.5, 60.0)
+    monkeypatch.setattr(calculator_logic, "rate_history", history)
+    user_data = {
+        "car_price_cny": 150_000, "year": 2020, "engine_volume": 1500,
+        "fuel_type": "Бензин", "payer_type": "Физическое лицо",
+    }
+
+    result = calculator_logic.calculate_total_cost(user_data, settings, as_of=as_of)
+
+    # В 2022 году машине 2 года: пошлина от стоимости, утильсбор как для новой
+    tariffs = get_tariff_tables(settings)
+    price_eur = 150_000 * 9.5 / 60.0
+    assert result.customs.duty_rub == max(price_eur * 0.48, 2.5 * 1500) * 60.0
+    assert result.customs.recycling_fee_rub == tariffs.recycling_fee(2)
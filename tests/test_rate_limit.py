@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from core.broadcast import BroadcastEngine
+from core.notifier import NotificationDispatcher
+from core.rate_limit import ChatRateLimiter, TokenBucket
+
+
+class _CountingBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(time.monotonic())
+
+
+def test_broadcast_and_notifications_share_global_limit():
+    shared = TokenBucket(10)
+    bot = _CountingBot()
+    notifier = NotificationDispatcher(workers=4, limiter=ChatRateLimiter(per_chat_rate=100, global_bucket=shared))
+    engine = BroadcastEngine(registry=None, rate=8, global_bucket=shared)
+    engine._bot = bot
+
+    async def scenario():
+        await notifier.start(bot)
+        notifier.submit_many(range(1000, 1100), "уведомление")
+        broadcast = asyncio.gather(*(engine._send(user_id, "рассылка") for user_id in range(100)))
+        await asyncio.sleep(1.0)
+        broadcast.cancel()
+        await asyncio.gather(broadcast, return_exceptions=True)
+        for task in notifier._workers:
+            task.cancel()
+
+    asyncio.run(scenario())
+    # Запас ведра (10) плюс 10 в секунду; с раздельными лимитами вышло бы около 36
+    assert len(bot.sent) <= 21
+
+
+def test_retry_after_pauses_global_bucket():
+    limiter = ChatRateLimiter(global_rate=100, per_chat_rate=100)
+    limiter.penalize(1, 0.2)
+
+    async def scenario():
+        started = time.monotonic()
+        # Другой чат тоже ждет: 429 мог относиться ко всему боту
+        await limiter.acquire(2)
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.15
@@ -0,0 +1,58 @@
+import asyncio
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Chat, Message, User
+
+from bot_handlers import request
+from core.lead_store import lead_store
+
+
+def _run_process_comment(monkeypatch, create_lead):
+    answers, notifications = [], []
+
+    async def answer(self, text, **kwargs):
+        answers.append(text)
+
+    def submit_many(chat_ids, text):
+        notifications.append(text)
+        return []
+
+    monkeypatch.setattr(Message, "answer", answer)
+    monkeypatch.setattr(lead_store, "create_lead", create_lead)
+    monkeypatch.setattr(request.notifier, "submit_many", submit_many)
+    monkeypatch.setattr(request, "LEAD_SAVE_TIMEOUT", 0.05)
+
+    user = User.model_construct(id=5, is_bot=False, first_name="Иван", username=None)
+    message = Message.model_construct(
+        message_id=1, date=0, chat=Chat.model_construct(id=5, type="private"), from_user=user, text="Camry",
+    )
+
+    async def scenario():
+        state = FSMContext(MemoryStorage(), StorageKey(bot_id=1, chat_id=5, user_id=5))
+        await state.update_data(phone="+79990000000")
+        await request.process_comment(message, state)
+
+    asyncio.run(scenario())
+    return answers, notifications
+
+
+def test_lead_is_sent_to_admins_when_database_hangs(monkeypatch):
+    async def hanging_create_lead(**kwargs):
+        await asyncio.sleep(3600)
+
+    answers, notifications = _run_process_comment(monkeypatch, hanging_create_lead)
+
+    assert answers and answers[0].startswith("✅")
+    assert len(notifications) == 1 and "номер не присвоен" in notifications[0]
+
+
+def test_lead_is_sent_to_admins_when_database_fails(monkeypatch):
+    async def failing_create_lead(**kwargs):
+        raise RuntimeError("Хранилище заявок не открыто")
+
+    answers, notifications = _run_process_comment(monkeypatch, failing_create_lead)
+
+    assert answers and answers[0].startswith("✅")
+    assert len(notifications) == 1 and "+79990000000" in notifications[0]
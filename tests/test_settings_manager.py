@@ -0,0 +1,31 @@
+import asyncio
+import json
+
+from core import settings_manager
+from core.config import settings
+
+
+def test_save_settings_and_wait_reports_write_result(tmp_path, monkeypatch):
+    path = tmp_path / "settings.json"
+    monkeypatch.setattr(settings_manager, "SETTINGS_FILE", str(path))
+
+    assert asyncio.run(settings_manager.save_settings_and_wait()) is True
+    assert json.loads(path.read_text(encoding="utf-8"))["rates"]["cny_to_rub"] == settings.rates.cny_to_rub
+
+    monkeypatch.setattr(settings_manager, "SETTINGS_FILE", str(tmp_path / "missing" / "settings.json"))
+    assert asyncio.run(settings_manager.save_settings_and_wait()) is False
+
+
+def test_debounced_save_writes_later(tmp_path, monkeypatch):
+    path = tmp_path / "settings.json"
+    monkeypatch.setattr(settings_manager, "SETTINGS_FILE", str(path))
+    monkeypatch.setattr(settings_manager, "SAVE_DEBOUNCE_SECONDS", 0.01)
+
+    async def scenario():
+        assert settings_manager.save_settings() is None
+        assert not path.exists()
+        await asyncio.sleep(0.05)
+        await settings_manager.flush_settings(force=False)
+
+    asyncio.run(scenario())
+    assert path.exists()
@@ -0,0 +1,38 @@
+import asyncio
+
+from aiogram.types import CallbackQuery, User
+
+from middlewares.throttling import THROTTLE_NOTICE, ThrottlingMiddleware
+
+
+def _callback(user: User, data: str = "calc:start") -> CallbackQuery:
+    return CallbackQuery.model_construct(id="1", from_user=user, chat_instance="0", data=data)
+
+
+def test_dropped_callbacks_are_answered(monkeypatch):
+    answers = []
+
+    async def answer(self, text=None, **kwargs):
+        answers.append(text)
+
+    monkeypatch.setattr(CallbackQuery, "answer", answer)
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event)
+
+    user = User.model_construct(id=10, is_bot=False, first_name="user")
+    throttling = ThrottlingMiddleware(limit=1, window=60, debounce=60)
+
+    async def scenario():
+        data = {"event_from_user": user}
+        await throttling(handler, _callback(user), data)
+        # Повтор той же кнопки - молча
+        await throttling(handler, _callback(user), data)
+        # Другая кнопка сверх лимита - подсказка, затем снова молча
+        for button in ("faq", "request"):
+            await throttling(handler, _callback(user, button), data)
+
+    asyncio.run(scenario())
+    assert len(handled) == 1
+    assert answers == [None, THROTTLE_NOTICE, None]